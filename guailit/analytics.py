@@ -0,0 +1,216 @@
+# Path: guailit/analytics.py
+# -*- coding: utf-8 -*-
+"""
+Live image analytics and autofocus for the guailit library.
+
+frame_statistics() computes a histogram, the fraction of saturated pixels,
+the mean and max intensity and a focus score of a raw frame, with numpy on
+a strided subsample so a large frame costs a few milliseconds. A
+FrameAnalyzer runs it in a background thread, a few times per second, on a
+copy of the newest frame of a publisher: the display path never waits for
+it. autofocus() sweeps the motor with a ScanEngine and returns the position
+where the focus score peaks.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from guailit.metrics import METRICS
+from guailit.scan import ScanEngine
+from guailit.telemetry import TimeSeriesBuffer
+
+FrameStats = namedtuple("FrameStats", ["seq", "timestamp", "mean", "max", "saturated_fraction", "focus",
+                                       "histogram", "full_scale", "analysis_ms"])
+
+AutofocusResult = namedtuple("AutofocusResult", ["best_position", "positions", "scores"])
+
+
+def full_scale(frame: np.ndarray, bit_depth: int = None, from_peak: bool = False) -> float:
+    """
+    Saturation level of frame: from bit_depth if given, else the range of
+    its integer dtype. With from_peak, 10 to 14 bit data stored in 16 bits
+    is told apart by the peak value instead, which is too low for dark
+    frames. Float frames use their peak.
+    """
+    if bit_depth:
+        return float((1 << int(bit_depth)) - 1)
+    if np.issubdtype(frame.dtype, np.integer):
+        if from_peak and frame.dtype.itemsize > 1 and frame.size:
+            return float((1 << max(1, int(frame.max()).bit_length())) - 1)
+        return float(np.iinfo(frame.dtype).max)
+    return max(float(frame.max()) if frame.size else 0.0, 1e-12)
+
+
+def focus_score(frame: np.ndarray, step: int = 4) -> float:
+    """
+    Variance of the Laplacian, evaluated at every step-th pixel of every
+    step-th row. Each sample uses its four direct neighbours, so the score
+    stays sensitive to the finest detail of the full-resolution frame.
+    """
+    if frame.ndim == 3:
+        frame = frame[..., 0]
+    centre = frame[1:-1:step, 1:-1:step].astype(np.float32)
+    laplacian = (4.0 * centre - frame[:-2:step, 1:-1:step] - frame[2::step, 1:-1:step]
+                 - frame[1:-1:step, :-2:step] - frame[1:-1:step, 2::step])
+    return float(laplacian.var()) if laplacian.size else 0.0
+
+
+def frame_statistics(frame: np.ndarray, step: int = 4, bins: int = 64, bit_depth: int = None,
+                     seq: int = -1, timestamp: float = None) -> FrameStats:
+    """
+    FrameStats of frame, from every step-th pixel of every step-th row. The
+    histogram has bins bins from 0 to the full scale (see full_scale() for
+    bit_depth); values below 0 count in the first bin and values above the
+    full scale in the last. NaN and inf pixels of float frames are left out.
+    """
+    start = time.perf_counter()
+    sample = frame[::step, ::step]
+    if sample.ndim == 3:
+        sample = sample[..., 0]
+    if not np.issubdtype(sample.dtype, np.integer):
+        sample = sample[np.isfinite(sample)]
+    scale = full_scale(sample, bit_depth)
+    if np.issubdtype(sample.dtype, np.integer):
+        indices = sample.astype(np.int64) * bins // (int(scale) + 1)
+    else:
+        indices = (sample * (bins / scale)).astype(np.int64)
+    histogram = np.bincount(np.clip(indices, 0, bins - 1).ravel(), minlength=bins)
+    if sample.size == 0:
+        mean = peak = saturated = 0.0
+    else:
+        mean, peak = float(sample.mean()), float(sample.max())
+        saturated = np.count_nonzero(sample >= scale) / sample.size
+    return FrameStats(seq, timestamp, mean, peak, saturated, focus_score(frame, step), histogram, scale,
+                      (time.perf_counter() - start) * 1000.0)
+
+
+class FrameAnalyzer:
+    """
+    Compute the FrameStats of the newest frame at most rate_hz times per
+    second in a background thread.
+
+    read_frame() returns a GrabbedFrame the analyzer may keep, e.g. the
+    raw_snapshot() of a publisher, or None; a frame is analyzed only once.
+    The latest result is in stats and the focus score history in
+    focus_history. Errors are counted and kept in last_error. The analyzer
+    stops by itself when nobody called touch() for idle_timeout seconds.
+    """
+
+    def __init__(self, read_frame, rate_hz: float = 4.0, step: int = 4, bins: int = 64, bit_depth: int = None,
+                 capacity: int = 10_000, idle_timeout: float = 30.0):
+        self.read_frame = read_frame
+        self.rate_hz = rate_hz
+        self.step = step
+        self.bins = bins
+        self.bit_depth = bit_depth
+        self.idle_timeout = idle_timeout
+        self.stats = None
+        self.focus_history = TimeSeriesBuffer(capacity)
+        self.frames_analyzed = 0
+        self.errors = 0
+        self.last_error = None
+        self._last_touch = time.monotonic()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def touch(self):
+        """
+        Tell the analyzer that somebody is still watching.
+        """
+        self._last_touch = time.monotonic()
+
+    def start(self):
+        self.touch()
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="guailit-frame-analyzer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def analyze_once(self):
+        """
+        Analyze the newest frame if it was not analyzed yet. Returns its
+        FrameStats, None if there was no new frame.
+        """
+        grabbed = self.read_frame()
+        if grabbed is None or (self.stats is not None and grabbed.seq == self.stats.seq):
+            return None
+        with METRICS.timed("analytics"):
+            stats = frame_statistics(grabbed.frame, self.step, self.bins, self.bit_depth,
+                                     grabbed.seq, grabbed.timestamp)
+        self.stats = stats
+        self.focus_history.append(grabbed.timestamp, stats.focus)
+        self.frames_analyzed += 1
+        return stats
+
+    def _run(self):
+        next_run = time.monotonic()
+        while not self._stop_event.is_set():
+            if time.monotonic() - self._last_touch > self.idle_timeout:
+                break
+            try:
+                self.analyze_once()
+            except Exception as e:
+                self.errors += 1
+                self.last_error = e
+            next_run = max(next_run + 1.0 / self.rate_hz, time.monotonic())
+            self._stop_event.wait(max(0.0, next_run - time.monotonic()))
+
+
+def peak_position(positions, scores) -> float:
+    """
+    Position of the highest score, refined by a parabola through the best
+    point and its two neighbours when the peak is inside the sweep.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    scores = np.asarray(scores, dtype=np.float64)
+    if len(positions) == 0:
+        raise ValueError("No focus scores to pick a position from.")
+    best = int(np.argmax(scores))
+    if 0 < best < len(positions) - 1:
+        around = slice(best - 1, best + 2)
+        curvature, slope, _ = np.polyfit(positions[around], scores[around], 2)
+        if curvature < 0:
+            vertex = -slope / (2.0 * curvature)
+            low, high = sorted((positions[best - 1], positions[best + 1]))
+            return float(np.clip(vertex, low, high))
+    return float(positions[best])
+
+
+def autofocus(motor, camera_instance, positions, tolerance: float = None, settle_time: float = 0.0,
+              step: int = 4, move_to_best: bool = True, **scan_options) -> AutofocusResult:
+    """
+    Sweep the motor through positions, score the focus of the frame taken at
+    each, and move to the position where the score peaks.
+
+    motor and camera_instance are as for ScanEngine; scores are computed on
+    the scan worker while the motor travels to the next point.
+    """
+    def score(index, target, position, timestamp, frame):
+        return focus_score(frame, step)
+
+    results = ScanEngine(motor, camera_instance, positions, tolerance=tolerance, settle_time=settle_time,
+                         process=score, **scan_options).run()
+    measured = np.array([r.position for r in results], dtype=np.float64)
+    scores = np.array([r.output for r in results], dtype=np.float64)
+    best = peak_position(measured, scores)
+    if move_to_best:
+        motor.move_motor(best)
+    return AutofocusResult(best, measured, scores)
@@ -11,59 +11,268 @@ __author__ = "Marco Bonaglia"
 __version__ = "0.1.0"
 __date__ = "2023-10-27" # Placeholder: Update with actual creation date
 
-from fastlabio import camera
 import streamlit as st
 import time # Import time for periodic updates
-import io # Import io for image handling
-from PIL import Image # Import Image from Pillow
-import asyncio # Import asyncio
+import os
+import functools
+import uuid
 
-# Import the synchronous camera getter from fastlabio
-from fastlabio.camera import get_pysilico_camera_sync
+import numpy as np
 
-try:
-    from fastlabio import motor # Import both motor and camera modules
-except ImportError as e:
-    st.error(f"Could not import fastlabio modules. Make sure fastlabio is accessible in the Python path. Error: {e}")
-    motor = None # Set motor to None if import fails
-    camera = None # Set camera to None if import fails
+from guailit.analytics import FrameAnalyzer, autofocus
+from guailit.averaging import FrameAverager
+from guailit.connections import DevicePool, probe_camera
+from guailit.device_state import CameraStateMirror
+from guailit.devices import (CAMERA_BACKENDS, MOTOR_BACKENDS, CameraConfig, DeviceRegistry, MotorConfig,
+                             connect_camera, load_device_config, parse_device_config, save_device_config)
+from guailit.display_map import DisplayMapper
+from guailit.encoding import describe_encoded_frame, make_encoder
+from guailit.grabber import frame_from_result
+from guailit.live_server import CONTENT_TYPES, LiveStreamServer, mjpeg_html, websocket_html
+from guailit.metrics import METRICS, start_metrics_server
+from guailit.motor_queue import MotorCommandQueue, describe_command
+from guailit.preprocess import FramePreprocessor
+from guailit.rate import RateController
+from guailit.recording import FrameRecorder
+from guailit.replay import ReplayMotor, ReplaySession, parse_replay_speed
+from guailit.runtime import AsyncCamera, AsyncMotor, DeviceRuntime
+from guailit.scan import ScanEngine, scan_positions
+from guailit.telemetry import MotorPoller, minmax_decimate
+from guailit.publisher import build_frame_publisher
+from guailit.shm_ring import ProcessFramePublisher
+
+# --- Lazily imported device backends ---
+# fastlabio and its camera stack are slow to import and may be missing on a
+# motor-only station, so they are imported on first use rather than at startup.
+# Tests patch these module attributes directly.
+motor = None
+camera = None
+BACKEND_ERRORS = {} # Backend name -> exception raised by its import
+
+def load_motor():
+    """
+    fastlabio.motor, imported on first use. None if it cannot be imported.
+    """
+    global motor
+    if motor is None and "motor" not in BACKEND_ERRORS:
+        try:
+            if os.environ.get("GUAILIT_REPLAY"):
+                # Offline: the motor positions of a recording
+                motor_module = ReplayMotor(get_replay_session())
+            else:
+                from fastlabio import motor as motor_module
+        except Exception as e: # Not only ImportError: a broken dependency may raise anything
+            BACKEND_ERRORS["motor"] = e
+        else:
+            motor = motor_module
+    return motor
+
+def load_camera():
+    """
+    fastlabio.camera, imported on first use. None if it cannot be imported.
+    """
+    global camera
+    if camera is None and "camera" not in BACKEND_ERRORS:
+        try:
+            if os.environ.get("GUAILIT_REPLAY"):
+                # Offline: the frames of a recording instead of the camera server
+                camera_module = get_replay_session()
+            else:
+                from fastlabio import camera as camera_module
+        except Exception as e:
+            BACKEND_ERRORS["camera"] = e
+        else:
+            camera = camera_module
+    return camera
+
+def backend_warning(name: str) -> str:
+    """
+    Message explaining why the backend called name is not available.
+    """
+    error = BACKEND_ERRORS.get(name)
+    if error is None:
+        return f"{name.capitalize()} module not loaded."
+    if os.environ.get("GUAILIT_REPLAY"):
+        return f"Could not open the replayed recording {os.environ['GUAILIT_REPLAY']}. Error: {error}"
+    return (f"Could not import fastlabio.{name}. Make sure fastlabio is accessible "
+            f"in the Python path. Error: {error}")
+
+# --- Shared device connections ---
+@st.cache_resource
+def get_replay_session():
+    """
+    Process-wide replay of the recording named by GUAILIT_REPLAY, played at
+    GUAILIT_REPLAY_SPEED times real time ("max" for as fast as possible).
+    """
+    return ReplaySession(os.environ["GUAILIT_REPLAY"],
+                         parse_replay_speed(os.environ.get("GUAILIT_REPLAY_SPEED", "1")))
+
+@st.cache_resource
+def get_camera_pool():
+    """
+    Process-wide pool of camera connections, shared by all sessions.
+    """
+    return DevicePool("camera", lambda: load_camera().get_pysilico_camera_sync(),
+                      probe=probe_camera, max_handles=4)
+
+@st.cache_resource
+def get_device_registry():
+    """
+    Process-wide registry of the bench cameras and motor axes listed in the
+    device file (GUAILIT_DEVICES, guailit_devices.json by default).
+    """
+    return DeviceRegistry(*load_device_config())
+
+def camera_connector(camera: CameraConfig = None):
+    """
+    Picklable function opening a new connection to the camera (the
+    fastlabio camera, or the bench camera configured by camera), for the
+    acquisition process.
+    """
+    if camera is not None:
+        return functools.partial(connect_camera, camera)
+    if os.environ.get("GUAILIT_REPLAY"):
+        # A replay in the acquisition process would run on its own clock,
+        # out of step with the motor positions replayed here
+        raise RuntimeError("Separate-process acquisition is not available while replaying.")
+    return load_camera().get_pysilico_camera_sync
+
+@st.cache_resource
+def get_frame_publisher(encoder_name: str, jpeg_quality: int, roi, binning: int, display_width: int,
+                        change_threshold: float = None, contrast_window=None, averaging=None,
+                        encode_workers: int = 1, separate_process: bool = False, camera: CameraConfig = None):
+    """
+    Process-wide stream publisher for one set of display settings.
+
+    Sessions watching with the same settings share it, so each frame is
+    acquired, preprocessed and encoded only once whatever the number of viewers
+    (see build_frame_publisher for the settings). With separate_process the
+    pipeline runs in its own process and frames come back through shared
+    memory. camera selects a camera of the device registry instead of the
+    fastlabio camera; every camera has its own publisher and grabber thread.
+    Its whole CameraConfig is part of the cache key, so a camera moved to
+    another host or backend gets a new publisher on the new connection pool.
+    """
+    settings = (encoder_name, jpeg_quality, roi, binning, display_width, change_threshold,
+                contrast_window, averaging, encode_workers)
+    if separate_process:
+        return ProcessFramePublisher(camera_connector(camera), settings)
+    camera_pool = get_camera_pool() if camera is None else get_device_registry().camera_pool(camera.name)
+    return build_frame_publisher(camera_pool, *settings)
+
+@st.cache_resource
+def get_frame_analyzer(settings: tuple, bit_depth: int = None):
+    """
+    Process-wide analyzer of the raw frames of the stream publisher matching
+    settings, shared by all sessions viewing that stream.
+    """
+    return FrameAnalyzer(get_frame_publisher(*settings).raw_snapshot, bit_depth=bit_depth)
+
+@st.cache_resource
+def get_motor_poller():
+    """
+    Process-wide motor position poller, shared by all sessions.
+    """
+    return MotorPoller(motor.get_motor_position)
+
+@st.cache_resource
+def get_motor_queue():
+    """
+    Process-wide motor command queue, shared by all sessions.
+    """
+    # Look the module up on each command, so the queue follows app.motor
+    return MotorCommandQueue(lambda: motor)
+
+@st.cache_resource
+def get_runtime():
+    """
+    Process-wide event loop thread and executor for blocking device calls.
+    """
+    return DeviceRuntime()
+
+@st.cache_resource
+def get_async_camera():
+    """
+    Process-wide async camera facade, on the shared runtime.
+    """
+    # Look the module up on each call, so the facade follows app.camera
+    return AsyncCamera(get_runtime(), lambda: camera, get_camera_pool())
+
+@st.cache_resource
+def get_camera_state():
+    """
+    Process-wide mirror of the camera settings, shared by all sessions.
+    """
+    return CameraStateMirror()
+
+@st.cache_resource
+def get_async_motor():
+    """
+    Process-wide async motor facade over the motor command queue.
+    """
+    return AsyncMotor(get_motor_queue())
+
+@st.cache_resource
+def get_live_server(port: int, host: str = "127.0.0.1"):
+    """
+    Process-wide live view side channel, serving the stream publishers
+    straight to the browser on its own port. It has no authentication, so
+    it only listens on the local host unless host says otherwise.
+    """
+    return LiveStreamServer().start(host=host, port=port)
+
+@st.cache_resource
+def get_metrics_server(port: int):
+    """
+    Process-wide HTTP endpoint serving the stage metrics on /metrics.
+    """
+    return start_metrics_server(port)
 
 # --- Helper functions for interacting with fastlabio (more testable) ---
 def move_motor_action(position: float):
     """
     Action to move the motor to a specified position.
+
+    The command is queued and a newer move replaces it if it was not sent
+    yet. Returns the command future, None if it could not be queued; its
+    outcome is shown by render_command_status.
     """
-    if motor is not None:
+    if load_motor() is not None:
         try:
             st.write(f"Attempting to move motor to {position}...")
-            motor.move_motor(position)
-            st.success(f"Motor move command sent for position: {position}")
+            future = get_motor_queue().move(position)
+            st.info(f"Motor move command queued for position: {position}")
+            return future
         except Exception as e:
             st.error(f"Error moving motor: {e}")
     else:
         st.error("Motor module not loaded.")
+    return None
 
 def set_motor_speed_action(speed: float):
     """
-    Action to set the motor speed.
+    Action to set the motor speed. Queued like move_motor_action.
     """
-    if motor is not None:
+    if load_motor() is not None:
         try:
             st.write(f"Attempting to set motor speed to {speed}...")
-            motor.set_motor_speed(speed)
-            st.success(f"Motor speed set to: {speed}")
+            future = get_motor_queue().set_speed(speed)
+            st.info(f"Motor speed change queued: {speed}")
+            return future
         except Exception as e:
             st.error(f"Error setting motor speed: {e}")
     else:
         st.error("Motor module not loaded.")
+    return None
 
 def get_motor_position_action():
     """
     Action to get and display the current motor position.
     """
-    if motor is not None:
+    if load_motor() is not None:
         try:
-            current_position = motor.get_motor_position()
+            # Served from the queue's short-lived cache when fresh enough
+            current_position = get_runtime().run(get_async_motor().get_position(), timeout=5.0)
             st.info(f"Current Motor Position: {current_position}")
         except Exception as e:
             st.error(f"Error getting motor position: {e}")
@@ -72,12 +281,12 @@ def get_motor_position_action():
 
 def set_exposure_action(exposure_time: float):
     """
-    Action to set the camera exposure time.
+    Action to set the camera exposure time alone, through the settings mirror.
     """
-    if camera is not None:
+    if load_camera() is not None:
         try:
             st.write(f"Attempting to set exposure time to {exposure_time} us...")
-            camera.set_exposure(exposure_time)
+            get_camera_state().apply(get_runtime(), get_async_camera(), {"exposure": exposure_time})
             st.success(f"Exposure time set to: {exposure_time} us")
         except Exception as e:
             st.error(f"Error setting exposure time: {e}")
@@ -86,54 +295,522 @@ def set_exposure_action(exposure_time: float):
 
 def set_gain_action(gain_value: float):
     """
-    Action to set the camera gain.
+    Action to set the camera gain alone, through the settings mirror.
     """
-    if camera is not None:
+    if load_camera() is not None:
         try:
             st.write(f"Attempting to set gain to {gain_value}...")
-            camera.set_gain(gain_value)
+            get_camera_state().apply(get_runtime(), get_async_camera(), {"gain": gain_value})
             st.success(f"Gain set to: {gain_value}")
         except Exception as e:
             st.error(f"Error setting gain: {e}")
     else:
         st.error("Camera module not loaded.")
 
-async def get_single_frame_action():
+def apply_camera_settings_action(exposure_time: float = None, gain_value: float = None):
     """
-    Action to acquire and display a single frame from the camera.
+    Action to apply the camera settings together, skipping unchanged ones.
     """
-    # Get the camera instance using the new synchronous function
-    camera_instance = get_pysilico_camera_sync()
-
-    if camera_instance is not None:
+    if load_camera() is not None:
         try:
-            st.write("Acquiring single frame...")
-            # Use getFutureFrames(1) to get a frame
-            frame_object = await asyncio.to_thread(camera_instance.getFutureFrames, 1)
-
-            if frame_object:
-                # Assuming the frame object has a toNumpyArray() method
-                frame = frame_object.toNumpyArray()
-
-                # Encode the frame to JPEG format (using a basic approach for now)
-                # This might need adjustment based on the actual frame object type and content
-                # If the frame is already a numpy array, cv2.imencode should work.
-                import cv2
-                is_success, buffer = cv2.imencode(".jpg", frame)
-                if is_success:
-                    jpeg_bytes = buffer.tobytes()
-                    image = Image.open(io.BytesIO(jpeg_bytes))
-                    st.image(image, caption="Single Frame")
-                    st.success("Single frame acquired and displayed.")
-                else:
-                    st.error("Could not encode frame to JPEG.")
-
+            changed = get_camera_state().apply(get_runtime(), get_async_camera(),
+                                               {"exposure": exposure_time, "gain": gain_value})
+            if changed:
+                st.success("Applied: " + ", ".join(f"{name} {value}" for name, value in changed.items()))
             else:
-                st.warning("No frames received.")
+                st.info("Camera settings unchanged.")
+            return changed
         except Exception as e:
-            st.error(f"Error acquiring or displaying frame: {e}")
+            st.error(f"Error applying camera settings: {e}")
+    else:
+        st.error("Camera module not loaded.")
+    return None
+
+def describe_camera_state() -> str:
+    """
+    Last camera settings written through guailit and their age, for
+    display without a device call.
+    """
+    state = get_camera_state().last_written()
+
+    def describe(name: str, unit: str = "") -> str:
+        if name not in state:
+            return "unknown"
+        value, age = state[name]
+        return f"{value}{unit} (written {age:.0f} s ago)"
+
+    return f"Last exposure: {describe('exposure', ' us')}, gain: {describe('gain')}"
+
+def get_stream_roi():
+    """
+    Stream region of interest selected in the UI, or None for the full frame.
+    """
+    roi = tuple(int(st.session_state.get(key, 0)) for key in
+                ('roi_x_input', 'roi_y_input', 'roi_width_input', 'roi_height_input'))
+    return roi if any(roi) else None
+
+def get_contrast_window():
+    """
+    Fixed (black, white) display window selected in the UI, None for auto-contrast.
+    """
+    if st.session_state.get('contrast_select', "Auto Contrast") == "Auto Contrast":
+        return None
+    return (st.session_state.get('contrast_black_input', 0), st.session_state.get('contrast_white_input', 4095))
+
+def get_averaging_settings():
+    """
+    Live averaging selected in the UI: None, ("mean", window) or
+    ("ema", window, alpha), as taken by FrameAverager.
+    """
+    if not st.session_state.get('average_stream_toggle', False):
+        return None
+    if st.session_state.get('average_mode_select', "Sliding Mean") == "EMA":
+        return ("ema", 16, st.session_state.get('average_alpha_input', 0.1))
+    return ("mean", st.session_state.get('average_window_input', 16))
+
+def get_display_settings():
+    """
+    Display settings selected in the UI, as a hashable tuple.
+    """
+    return (st.session_state.get('encoder_select', "JPEG"),
+            st.session_state.get('jpeg_quality_input', 85),
+            get_stream_roi(),
+            st.session_state.get('binning_select', 1),
+            st.session_state.get('display_width_input', 960),
+            st.session_state.get('change_threshold_input', 0.1) / 100.0
+            if st.session_state.get('skip_unchanged_toggle', False) else None,
+            get_contrast_window(),
+            get_averaging_settings(),
+            st.session_state.get('encode_workers_input', 1),
+            separate_process_enabled())
+
+def separate_process_enabled() -> bool:
+    """
+    Whether the stream is acquired in a separate process, as selected in
+    the UI. Never while replaying (see camera_connector).
+    """
+    return st.session_state.get('separate_process_toggle', False) and not os.environ.get("GUAILIT_REPLAY")
+
+def get_frame_encoder():
+    """
+    Create the frame encoder selected in the UI (JPEG by default).
+    """
+    encoder_name, jpeg_quality = get_display_settings()[:2]
+    if encoder_name == "JPEG":
+        return make_encoder("JPEG", quality=jpeg_quality)
+    return make_encoder(encoder_name)
+
+def show_encoded_frame(target, encoded, caption: str = None):
+    """
+    Send an encoded frame to the browser without decoding or re-encoding it.
+    """
+    if encoded.format == "RAW":
+        # Streamlit encodes raw arrays itself, once
+        target.image(encoded.data, caption=caption)
     else:
-        st.error("Camera connection not available.") # Update error message
+        # Passing the pixel width stops Streamlit from resizing (and so
+        # re-encoding) frames wider than its default content width. Frames
+        # from shared memory are views, copied here into the message
+        data = bytes(encoded.data) if isinstance(encoded.data, memoryview) else encoded.data
+        target.image(data, caption=caption, width=encoded.width, output_format=encoded.format)
+
+def get_single_frame_action():
+    """
+    Action to acquire and display a single frame from the camera.
+    """
+    try:
+        st.write("Acquiring single frame...")
+        # Leases a pooled camera connection on the device runtime
+        frame = get_runtime().run(get_async_camera().grab_frame())
+    except ConnectionError as e:
+        st.error(f"Camera connection not available: {e}")
+        return
+    except Exception as e:
+        # The pool drops the connection and reconnects on the next request
+        st.error(f"Error acquiring or displaying frame: {e}")
+        return
+
+    if frame is None:
+        st.warning("No frames received.")
+        return
+    # Encode the frame once and send the bytes straight to the browser
+    encoded = get_frame_encoder().encode(DisplayMapper(get_contrast_window())(frame))
+    if encoded is not None:
+        show_encoded_frame(st, encoded, caption=f"Single Frame ({describe_encoded_frame(encoded)})")
+        st.success("Single frame acquired and displayed.")
+    else:
+        st.error("Could not encode frame to JPEG.")
+
+def get_averaged_frame_action(count: int):
+    """
+    Action to average count frames, pulled from the camera in a single call.
+    """
+    try:
+        st.write(f"Acquiring and averaging {count} frames...")
+        average = get_runtime().run(get_async_camera().grab_average(count))
+    except ConnectionError as e:
+        st.error(f"Camera connection not available: {e}")
+        return
+    except Exception as e:
+        st.error(f"Error acquiring or averaging frames: {e}")
+        return
+    # Kept at full precision for saving
+    st.session_state.averaged_frame = average
+    encoded = get_frame_encoder().encode(DisplayMapper(get_contrast_window())(average))
+    if encoded is not None:
+        show_encoded_frame(st, encoded, caption=f"Average of {count} frames ({describe_encoded_frame(encoded)})")
+
+def save_average_action(average, path_prefix: str):
+    """
+    Action to save an averaged frame as float32 .npy.
+    """
+    path = path_prefix + time.strftime("_%Y%m%d_%H%M%S") + ".npy"
+    try:
+        if isinstance(average, FrameAverager):
+            average.save(path)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            np.save(path, average)
+    except Exception as e:
+        st.error(f"Error saving averaged frame: {e}")
+        return
+    st.success(f"Averaged frame saved to {path}")
+
+def latest_motor_position():
+    """
+    Newest motor position from the telemetry poller, without a motor round trip.
+    """
+    if load_motor() is None:
+        return None
+    poller = get_motor_poller()
+    poller.touch() # Keep the poller alive while frames are being recorded
+    sample = poller.buffer.latest()
+    return sample[1] if sample is not None else None
+
+def start_recording_action(path_prefix: str, max_frames: int):
+    """
+    Action to start recording raw frames from the acquisition path.
+    """
+    path = path_prefix + time.strftime("_%Y%m%d_%H%M%S")
+    try:
+        if load_motor() is not None:
+            get_motor_poller().start()
+        recorder = FrameRecorder(path, max_frames, motor_position=latest_motor_position)
+        publisher = get_frame_publisher(*get_display_settings())
+        publisher.add_frame_listener(recorder, keeps_frames=True) # Frames wait in the recorder queue
+    except Exception as e:
+        st.error(f"Error starting recording: {e}")
+        return
+    st.session_state.frame_recorder = recorder
+    st.session_state.recording_publisher = publisher
+    st.success(f"Recording to {recorder.paths['frames']}")
+
+def stop_recording_action():
+    """
+    Action to stop recording and flush the files.
+    """
+    recorder = st.session_state.pop('frame_recorder', None)
+    publisher = st.session_state.pop('recording_publisher', None)
+    if recorder is None:
+        return
+    if publisher is not None:
+        publisher.remove_frame_listener(recorder)
+    recorder.close()
+    if recorder.error is not None:
+        st.error(f"Error while recording: {recorder.error}")
+    st.success(f"Recorded {recorder.frames_written} frames to {recorder.paths['frames']} "
+               f"({recorder.frames_dropped} dropped).")
+
+def run_scan_action(positions, tolerance: float, settle_time: float, path_prefix: str):
+    """
+    Action to run a pipelined motor scan, saving one raw frame per position.
+    """
+    camera_pool = get_camera_pool()
+    try:
+        camera_instance = camera_pool.acquire()
+    except ConnectionError as e:
+        st.error(f"Camera connection not available: {e}")
+        return
+
+    path = path_prefix + time.strftime("_%Y%m%d_%H%M%S")
+    recorder = FrameRecorder(path, len(positions))
+    encoder = get_frame_encoder()
+    display_map = DisplayMapper(get_contrast_window())
+    preprocessor = FramePreprocessor(display_width=st.session_state.get('display_width_input', 960))
+
+    def process(index, target, position, timestamp, frame):
+        # Runs on a worker while the motor moves to the next position
+        recorder.submit(index, timestamp, frame, motor_position=position)
+        return encoder.encode(display_map(preprocessor(frame)), index, timestamp)
+
+    engine = ScanEngine(motor, camera_instance, positions, tolerance=tolerance,
+                        settle_time=settle_time, process=process)
+    progress = st.progress(0.0, text="Scanning...")
+    image_placeholder = st.empty()
+    try:
+        engine.start()
+        for result in engine.results():
+            progress.progress(engine.points_done / len(positions),
+                              text=f"Point {result.index + 1}/{len(positions)} at {result.position:.4f}")
+            if result.output is not None:
+                show_encoded_frame(image_placeholder, result.output,
+                                   caption=f"Target {result.target:.4f}, position {result.position:.4f}")
+    finally:
+        # Also reached when a rerun interrupts the scan
+        engine.cancel()
+        engine.wait()
+        recorder.close()
+        camera_pool.release(camera_instance, broken=engine.error is not None)
+
+    if engine.error is not None:
+        st.error(f"Error during scan: {engine.error}")
+    else:
+        st.success(f"Scanned {engine.points_done} points in {engine.elapsed:.1f} s "
+                   f"({engine.elapsed / max(1, engine.points_done) * 1000:.0f} ms per point). "
+                   f"Frames saved to {recorder.paths['frames']}")
+
+def autofocus_action(positions, tolerance: float, settle_time: float):
+    """
+    Action to sweep the motor, score the focus at each position and move to the sharpest one.
+    """
+    camera_pool = get_camera_pool()
+    try:
+        camera_instance = camera_pool.acquire()
+    except ConnectionError as e:
+        st.error(f"Camera connection not available: {e}")
+        return None
+    error = None
+    try:
+        with st.spinner(f"Autofocus over {len(positions)} positions..."):
+            result = autofocus(motor, camera_instance, positions, tolerance=tolerance, settle_time=settle_time)
+    except Exception as e:
+        error = e
+    finally:
+        camera_pool.release(camera_instance, broken=error is not None)
+    if error is not None:
+        st.error(f"Error during autofocus: {error}")
+        return None
+    st.success(f"Best focus at {result.best_position:.4f}; the motor was moved there.")
+    st.line_chart({"position": result.positions, "focus score": result.scores}, x="position", y="focus score")
+    return result
+
+def render_frame_stats(analyzer):
+    """
+    Latest live analytics of analyzer: intensity, saturation, focus, histogram.
+    """
+    analyzer.start() # Also keeps it alive while it is being watched
+    stats = analyzer.stats
+    if analyzer.last_error is not None:
+        st.warning(f"Analytics error: {analyzer.last_error}")
+    if stats is None:
+        st.caption("Waiting for a frame to analyze...")
+        return
+    columns = st.columns(4)
+    columns[0].metric("Mean", f"{stats.mean:.1f}")
+    columns[1].metric("Max", f"{stats.max:.0f} / {stats.full_scale:.0f}")
+    columns[2].metric("Saturated", f"{stats.saturated_fraction * 100:.2f} %")
+    columns[3].metric("Focus", f"{stats.focus:.4g}")
+    chart_columns = st.columns(2)
+    edges = np.arange(len(stats.histogram)) * (stats.full_scale + 1) / len(stats.histogram)
+    chart_columns[0].bar_chart({"level": edges, "pixels": stats.histogram}, x="level", y="pixels", height=200)
+    _, focus = analyzer.focus_history.snapshot()
+    chart_columns[1].line_chart({"focus": focus[-200:]}, height=200)
+    st.caption(f"Frame {stats.seq}, analyzed in {stats.analysis_ms:.1f} ms at up to {analyzer.rate_hz:g} Hz")
+
+@st.fragment(run_every=1.0)
+def render_analytics_panel(analyzer):
+    """
+    Live analytics refreshed on its own, next to a side channel live view.
+    """
+    render_frame_stats(analyzer)
+
+def get_analyzer():
+    """
+    Analyzer of this session's stream, None if live analytics are off.
+    """
+    if not st.session_state.get('analytics_toggle', False):
+        return None
+    bit_depth = st.session_state.get('analytics_bit_depth_select', "Data Type")
+    return get_frame_analyzer(get_display_settings(), bit_depth if isinstance(bit_depth, int) else None)
+
+def subscribe_to_stream():
+    """
+    Subscribe this session to the stream publisher matching its display settings.
+
+    Switches publisher when the settings changed since the last rerun, and
+    subscribes again if the publisher dropped this session's mailbox.
+    Raises ConnectionError if the camera cannot be reached.
+    """
+    publisher = get_frame_publisher(*get_display_settings())
+    if st.session_state.get('frame_publisher') is not publisher \
+            or not publisher.is_subscribed(st.session_state.frame_mailbox):
+        unsubscribe_from_stream()
+        st.session_state.frame_mailbox = publisher.subscribe()
+        st.session_state.frame_publisher = publisher
+    # The publisher never acquires faster than its fastest viewer wants
+    st.session_state.frame_mailbox.max_fps = st.session_state.get('max_fps_input', 30.0)
+    return publisher, st.session_state.frame_mailbox
+
+def unsubscribe_from_stream():
+    """
+    Remove this session from its stream publisher.
+    """
+    publisher = st.session_state.pop('frame_publisher', None)
+    mailbox = st.session_state.pop('frame_mailbox', None)
+    if publisher is not None and mailbox is not None:
+        publisher.unsubscribe(mailbox)
+
+@st.fragment(run_every=1.0)
+def render_motor_telemetry():
+    """
+    Live chart of the motor position. Refreshes on its own, without
+    rerunning the whole script.
+    """
+    poller = get_motor_poller()
+    poller.touch()
+    t, positions = poller.buffer.snapshot()
+    if len(t) == 0:
+        st.info("Waiting for motor position samples...")
+    else:
+        # Min/max decimation keeps the chart cheap after hours of history
+        t, positions = minmax_decimate(t, positions, buckets=500)
+        st.metric("Current Motor Position", f"{positions[-1]:.4f}")
+        st.line_chart({"time (s)": t - t[-1], "position": positions}, x="time (s)", y="position")
+    if poller.last_error is not None:
+        st.warning(f"{poller.errors} position read errors, last: {poller.last_error}")
+
+def render_live_view(kind: str, publisher=None, width: int = None, key: str = "stream"):
+    """
+    Embed the stream served by the live view side channel (MJPEG or WebSocket).
+
+    Shows this session's stream, or publisher (e.g. one camera of the grid)
+    at width pixels if given; key names the view in the session, so the
+    publisher it showed before is unregistered when it changes. The browser
+    reports the latency of this session's WebSocket stream, shown below it.
+    """
+    session = None
+    if publisher is None:
+        if 'live_session_id' not in st.session_state:
+            st.session_state.live_session_id = uuid.uuid4().hex
+        session = st.session_state.live_session_id if kind == "WebSocket" else None
+        publisher = get_frame_publisher(*get_display_settings())
+        # The browser reads frames from the side channel, not from this session
+        unsubscribe_from_stream()
+        width = st.session_state.get('display_width_input') or None
+    content_type = CONTENT_TYPES.get(publisher.encoder.format)
+    if content_type is None:
+        st.warning(f"The side channel cannot show {publisher.encoder.format} frames, choose JPEG or PNG.")
+        return
+    try:
+        server = get_live_server(int(st.session_state.get('live_port_input', 8765)),
+                                 st.session_state.get('live_host_input') or "127.0.0.1")
+    except OSError as e:
+        st.error(f"Could not start live view server: {e}")
+        return
+    # One registration per view of the session, dropped once it shows another publisher
+    live_streams = st.session_state.setdefault('live_streams', {})
+    registered = live_streams.get(key)
+    if registered is not None and (registered[0] is not server or registered[1] is not publisher):
+        registered[0].unregister(registered[2])
+        registered = None
+    if registered is None:
+        registered = live_streams[key] = (server, publisher, server.register(publisher))
+    name = registered[2]
+    url = server.url(name, "ws" if kind == "WebSocket" else "mjpg",
+                     base_url=st.session_state.get('live_url_input') or None,
+                     fps=st.session_state.get('max_fps_input', 30.0), session=session)
+    # Size the frame from the last frame shown, 4:3 until there is one
+    latest = publisher.latest
+    aspect = latest.height / latest.width if latest is not None else 0.75
+    height = int((width or (latest.width if latest is not None else 960)) * aspect) + 10
+    page = websocket_html(url, content_type, width) if kind == "WebSocket" else mjpeg_html(url, width)
+    if hasattr(st, "iframe"):
+        st.iframe(page, height=height)
+    else: # Streamlit releases before st.iframe
+        import streamlit.components.v1 as components
+        components.html(page, height=height)
+    st.caption(f"Live view served from {url}")
+    if session is not None:
+        render_latency_panel(server.latency_tracker(session))
+
+@st.fragment(run_every=1.0)
+def render_latency_panel(tracker):
+    """
+    Rolling glass-to-glass latency and displayed frame rate reported by the browser.
+    """
+    summary = tracker.summary()
+    if summary["latency_p50_ms"] is None:
+        st.caption("Waiting for the browser to report painted frames...")
+        return
+    columns = st.columns(4)
+    columns[0].metric("Glass-to-Glass p50", f"{summary['latency_p50_ms']:.0f} ms")
+    columns[1].metric("Glass-to-Glass p95", f"{summary['latency_p95_ms']:.0f} ms")
+    fps = summary["displayed_fps"]
+    columns[2].metric("Displayed FPS", "-" if fps is None else f"{fps:.1f}")
+    columns[3].metric("Dropped in Browser", summary["frames_dropped"])
+
+@st.fragment(run_every=2.0)
+def render_metrics_panel():
+    """
+    Sidebar panel with the per-stage timing histograms.
+    """
+    st.header("Pipeline Metrics")
+    summary = METRICS.summary()
+    if not summary:
+        st.caption("No timings recorded yet.")
+        return
+    st.dataframe(
+        {"stage": list(summary),
+         "count": [s["count"] for s in summary.values()],
+         "mean (ms)": [s["mean_ms"] for s in summary.values()],
+         "p50 (ms)": [s["p50_ms"] for s in summary.values()],
+         "p99 (ms)": [s["p99_ms"] for s in summary.values()]},
+        hide_index=True,
+    )
+
+def render_metrics_sidebar():
+    """
+    Renders the metrics panel and its export controls in the sidebar.
+    """
+    with st.sidebar:
+        render_metrics_panel()
+
+        metrics_path = st.text_input("Metrics File:", value="guailit_metrics.prom", key='metrics_path_input')
+        if st.button("Export Metrics", key='export_metrics_button'):
+            try:
+                METRICS.write_prometheus_file(metrics_path)
+                st.success(f"Metrics written to {metrics_path}")
+            except OSError as e:
+                st.error(f"Error writing metrics file: {e}")
+
+        metrics_port = st.number_input("Metrics Port:", min_value=1024, max_value=65535,
+                                       value=9108, key='metrics_port_input')
+        if st.toggle("Serve /metrics", key='metrics_server_toggle'):
+            try:
+                get_metrics_server(int(metrics_port))
+                st.caption(f"Serving on http://127.0.0.1:{int(metrics_port)}/metrics")
+            except OSError as e:
+                st.error(f"Could not start metrics endpoint: {e}")
+
+        if st.button("Reset Metrics", key='reset_metrics_button'):
+            METRICS.reset()
+
+@st.fragment(run_every=0.5)
+def render_command_status(label: str, key: str):
+    """
+    Show the state of the motor command future stored in session_state[key],
+    refreshed until the command was sent or failed.
+    """
+    future = st.session_state.get(key)
+    if future is None:
+        return
+    status = f"{label}: {describe_command(future)}"
+    if not future.done() or future.cancelled():
+        st.caption(status)
+    elif future.exception() is not None:
+        st.error(status)
+    else:
+        st.success(status)
 
 def render_motor_control():
     """
@@ -141,13 +818,14 @@ def render_motor_control():
     """
     st.header("Motor Control")
 
-    if motor is not None:
+    if load_motor() is not None:
         # Input for target position
         target_position = st.number_input("Enter Target Position:", step=0.01, key='motor_pos_input')
 
         # Button to move motor
         if st.button("Move Motor", key='move_motor_button'):
-            move_motor_action(target_position)
+            st.session_state['motor_move_command'] = move_motor_action(target_position)
+        render_command_status("Last move", 'motor_move_command')
 
         st.markdown("---") # Separator
 
@@ -156,7 +834,8 @@ def render_motor_control():
 
         # Button to set speed
         if st.button("Set Motor Speed", key='set_speed_button'):
-            set_motor_speed_action(target_speed)
+            st.session_state['motor_speed_command'] = set_motor_speed_action(target_speed)
+        render_command_status("Last speed change", 'motor_speed_command')
 
         st.markdown("---") # Separator
 
@@ -164,39 +843,135 @@ def render_motor_control():
         if st.button("Get Current Position", key='get_position_button'):
             get_motor_position_action()
 
+        # Live position telemetry, polled in the background
+        if st.toggle("Live Position Telemetry", key='telemetry_toggle'):
+            poll_rate = st.number_input("Poll Rate (Hz):", min_value=0.1, max_value=100.0,
+                                        value=10.0, key='telemetry_rate_input')
+            poller = get_motor_poller()
+            poller.rate_hz = poll_rate
+            poller.start()
+            render_motor_telemetry()
+
     else:
-        st.warning("Motor module not loaded due to import error.")
+        st.warning(backend_warning("motor"))
 
-async def render_camera_control():
+def render_scan_control():
+    """
+    Renders the motor scan section in the Streamlit app.
+    """
+    st.markdown("===") # Larger separator
+    st.header("Motor Scan")
+
+    if load_motor() is None or load_camera() is None:
+        st.warning("Motor scan needs both the motor and the camera modules.")
+        return
+
+    range_columns = st.columns(3)
+    scan_start = range_columns[0].number_input("Scan Start:", step=0.01, key='scan_start_input')
+    scan_stop = range_columns[1].number_input("Scan Stop:", value=1.0, step=0.01, key='scan_stop_input')
+    scan_step = range_columns[2].number_input("Scan Step:", value=0.1, step=0.01, key='scan_step_input')
+
+    settle_mode = st.radio("Settle Criterion:", ["Position Tolerance", "Time Delay"],
+                           horizontal=True, key='scan_settle_mode')
+    if settle_mode == "Position Tolerance":
+        tolerance = st.number_input("Position Tolerance:", min_value=0.0, value=0.001,
+                                    step=0.001, format="%.4f", key='scan_tolerance_input')
+        settle_time = st.number_input("Extra Settle Delay (s):", min_value=0.0, value=0.0,
+                                      key='scan_extra_settle_input')
+    else:
+        tolerance = None
+        settle_time = st.number_input("Settle Delay (s):", min_value=0.0, value=0.1,
+                                      key='scan_settle_time_input')
+
+    scan_path = st.text_input("Scan File Prefix:", value="scans/guailit_scan", key='scan_path_input')
+
+    # Same sweep, scoring the focus of each frame instead of saving it
+    if st.button("Autofocus over Scan Range", key='autofocus_button'):
+        try:
+            positions = scan_positions(scan_start, scan_stop, scan_step)
+        except ValueError as e:
+            st.error(f"Invalid scan range: {e}")
+        else:
+            autofocus_action(positions, tolerance, settle_time)
+
+    if st.button("Run Scan", key='run_scan_button'):
+        try:
+            positions = scan_positions(scan_start, scan_stop, scan_step)
+        except ValueError as e:
+            st.error(f"Invalid scan range: {e}")
+        else:
+            run_scan_action(positions, tolerance, settle_time, scan_path)
+
+def render_camera_control():
     """
     Renders the camera control section and stream in the Streamlit app.
     """
     st.markdown("===") # Larger separator
     st.header("Camera Control")
 
-    if camera is not None:
-        # Input for exposure time
-        exposure_time = st.number_input("Set Exposure Time (us):", min_value=0.0, key='exposure_input')
+    if load_camera() is not None:
+        # Exposure time and gain, applied together in one device executor job
+        settings_columns = st.columns(2)
+        exposure_time = settings_columns[0].number_input("Set Exposure Time (us):", min_value=0.0,
+                                                         key='exposure_input')
+        gain_value = settings_columns[1].number_input("Set Gain:", min_value=0.0, key='gain_input')
 
-        # Button to set exposure time
-        if st.button("Set Exposure", key='set_exposure_button'):
-            set_exposure_action(exposure_time)
+        # Only the values that differ from the mirrored state are sent
+        if st.button("Apply Camera Settings", key='apply_camera_settings_button'):
+            apply_camera_settings_action(exposure_time, gain_value)
+        st.caption(describe_camera_state())
 
         st.markdown("---") # Separator
 
-        # Input for gain
-        gain_value = st.number_input("Set Gain:", min_value=0.0, key='gain_input')
+        # Display encoding, shared by the single frame and the stream
+        encoder_name = st.selectbox("Frame Encoding:", ["JPEG", "PNG", "RAW"], key='encoder_select')
+        if encoder_name == "JPEG":
+            st.slider("JPEG Quality:", min_value=10, max_value=100, value=85, key='jpeg_quality_input')
+        # High bit depth frames are mapped to 8 bits for display only
+        contrast = st.selectbox("Display Contrast:", ["Auto Contrast", "Fixed Window"], key='contrast_select')
+        if contrast == "Fixed Window":
+            contrast_columns = st.columns(2)
+            contrast_columns[0].number_input("Black Level:", min_value=0, value=0, step=16,
+                                             key='contrast_black_input')
+            contrast_columns[1].number_input("White Level:", min_value=1, value=4095, step=16,
+                                             key='contrast_white_input')
 
-        # Button to set gain
-        if st.button("Set Gain", key='set_gain_button'):
-            set_gain_action(gain_value)
+        # Button to get a single frame
+        if st.button("Get Single Frame", key='get_frame_button'):
+            # Runs on the shared device runtime and waits for the frame
+            get_single_frame_action()
+
+        # Low-light: average several frames pulled in a single getFutureFrames(n) call
+        average_columns = st.columns(2)
+        average_count = average_columns[0].number_input("Frames to Average:", min_value=2, max_value=1000,
+                                                        value=16, step=1, key='average_count_input')
+        average_path = average_columns[1].text_input("Average File Prefix:", value="averages/guailit",
+                                                     key='average_path_input')
+        if st.button("Get Averaged Frame", key='get_average_button'):
+            get_averaged_frame_action(int(average_count))
+        if st.session_state.get('averaged_frame') is not None:
+            if st.button("Save Averaged Frame", key='save_average_button'):
+                save_average_action(st.session_state.averaged_frame, average_path)
 
         st.markdown("---") # Separator
 
-        # Button to get a single frame
-        if st.button("Get Single Frame", key='get_frame_button'):
-            # Await the async function directly within the running event loop
-            await get_single_frame_action()
+        # --- Recording Section ---
+        st.subheader("Recording")
+        record_path = st.text_input("Recording File Prefix:", value="recordings/guailit",
+                                    key='record_path_input')
+        record_max_frames = st.number_input("Max Frames:", min_value=1, value=1000, step=100,
+                                            key='record_max_frames_input')
+        recorder = st.session_state.get('frame_recorder')
+        if recorder is None:
+            if st.button("Start Recording", key='start_record_button'):
+                start_recording_action(record_path, int(record_max_frames))
+        else:
+            st.write(f"Recording: {recorder.frames_written} frames written, "
+                     f"{recorder.frames_dropped} dropped.")
+            if recorder.is_full:
+                st.info("Recording reached its maximum number of frames.")
+            if st.button("Stop Recording", key='stop_record_button'):
+                stop_recording_action()
 
         st.markdown("---") # Separator
 
@@ -207,122 +982,380 @@ async def render_camera_control():
         if 'streaming' not in st.session_state:
             st.session_state.streaming = False
 
-        # Note: Camera instance for streaming is now handled by get_pysilico_camera_sync
-        # in the while loop to ensure it's acquired within the loop's context.
-        # The start button primarily toggles the 'streaming' state.
+        # Stream-only preprocessing; single frames keep the full resolution
+        with st.expander("Stream Preprocessing"):
+            roi_columns = st.columns(4)
+            roi_columns[0].number_input("ROI X:", min_value=0, step=1, key='roi_x_input')
+            roi_columns[1].number_input("ROI Y:", min_value=0, step=1, key='roi_y_input')
+            roi_columns[2].number_input("ROI Width (0 = full):", min_value=0, step=1, key='roi_width_input')
+            roi_columns[3].number_input("ROI Height (0 = full):", min_value=0, step=1, key='roi_height_input')
+            st.selectbox("Binning:", [1, 2, 4, 8], key='binning_select')
+            st.number_input("Display Width (px, 0 = no downscaling):", min_value=0, step=64,
+                            value=960, key='display_width_input')
+            # Live noise reduction; the average includes every acquired frame
+            if st.toggle("Average Frames", key='average_stream_toggle'):
+                average_mode = st.selectbox("Averaging:", ["Sliding Mean", "EMA"], key='average_mode_select')
+                if average_mode == "EMA":
+                    st.number_input("EMA Weight of the Newest Frame:", min_value=0.001, max_value=1.0,
+                                    value=0.1, step=0.01, format="%.3f", key='average_alpha_input')
+                else:
+                    st.number_input("Frames in Window:", min_value=2, max_value=1000, value=16,
+                                    key='average_window_input')
+            # Static views: only send frames where something changed, plus a keep-alive
+            if st.toggle("Skip Unchanged Frames", key='skip_unchanged_toggle'):
+                st.number_input("Change Threshold (% of sampled pixels):", min_value=0.0, max_value=100.0,
+                                value=0.1, step=0.05, format="%.2f", key='change_threshold_input')
+            # Large frames: encode several frames at once, on as many cores
+            st.number_input("Encode Workers:", min_value=1, max_value=16, value=1, key='encode_workers_input')
+            # Keeps encoding off the GIL of this process, at the cost of a slower start
+            st.toggle("Acquire in a Separate Process", key='separate_process_toggle',
+                      disabled=bool(os.environ.get("GUAILIT_REPLAY")),
+                      help="Not available while replaying a recording.")
+
+        # Live view rate control
+        rate_columns = st.columns(2)
+        rate_columns[0].number_input("Max Stream FPS:", min_value=1.0, value=30.0, step=1.0, key='max_fps_input')
+        rate_columns[1].number_input("Latency Target (ms):", min_value=10, value=200, step=10, key='latency_target_input')
+
+        # The side channel streams to the browser outside Streamlit's delta protocol
+        live_view = st.radio("Live View:", ["Streamlit", "MJPEG", "WebSocket"], horizontal=True,
+                             key='live_view_select')
+        if live_view != "Streamlit":
+            live_columns = st.columns(3)
+            # The side channel has no authentication: 0.0.0.0 exposes it to the whole network
+            live_columns[0].text_input("Side Channel Host:", value="127.0.0.1", key='live_host_input')
+            live_columns[1].number_input("Side Channel Port:", min_value=1024, max_value=65535, value=8765,
+                                         key='live_port_input')
+            live_columns[2].text_input("Side Channel URL (as seen by the browser, empty = localhost):",
+                                       key='live_url_input')
+
+        # Note: Frames are acquired and encoded by a FramePublisher shared by all
+        # sessions, which keeps running in background threads across reruns.
+        # The start button subscribes this session and toggles the 'streaming' state.
         if st.button('Start Streaming', key='start_stream_button'):
-            # Get the camera instance for streaming and store in session state
-            st.session_state.camera_instance_stream = get_pysilico_camera_sync()
-            if st.session_state.camera_instance_stream:
+            try:
+                subscribe_to_stream()
+            except ConnectionError as e:
+                st.error(f"Could not connect to camera for streaming: {e}")
+            else:
                 st.session_state.streaming = True
                 # Trigger the first frame acquisition by rerunning the script
                 st.rerun()
-            else:
-                st.error("Could not connect to camera for streaming.")
 
         if st.button('Stop Streaming', key='stop_stream_button'):
             st.session_state.streaming = False
-            # Close the camera connection when stopping stream
-            if 'camera_instance_stream' in st.session_state and st.session_state.camera_instance_stream:
-                try:
-                    st.session_state.camera_instance_stream.close()
-                except AttributeError:
-                    pass
-                finally:
-                    del st.session_state.camera_instance_stream
+            unsubscribe_from_stream()
             # Rerun to update the UI and stop the streaming loop
             st.rerun()
 
+        if st.session_state.streaming and get_averaging_settings() is not None \
+                and not separate_process_enabled():
+            if st.button("Save Live Average", key='save_live_average_button'):
+                save_average_action(get_frame_publisher(*get_display_settings()).averager,
+                                    st.session_state.average_path_input)
+
+        # Computed from the raw frames on a worker, at a lower rate than the display
+        analytics_columns = st.columns(2)
+        analytics_columns[0].toggle("Live Analytics", key='analytics_toggle')
+        if st.session_state.get('analytics_toggle', False):
+            # Without it, saturation is the full range of the frame data type
+            analytics_columns[1].selectbox("Sensor Bit Depth:", ["Data Type", 8, 10, 12, 14, 16],
+                                           key='analytics_bit_depth_select')
+
         # Create a placeholder for the camera stream image
         image_placeholder = st.empty()
+        analytics_placeholder = st.empty()
 
-        # Separate async function to stream a single frame
-        async def stream_single_frame():
+        # Separate function to show frames from the shared publisher
+        def stream_single_frame():
             # The streaming loop will now be inside this function
-            if 'camera_instance_stream' not in st.session_state or not st.session_state.camera_instance_stream:
-                 st.error("Streaming is active but camera instance is not available.")
+            try:
+                # Follows display setting changes made since the last rerun
+                publisher, mailbox = subscribe_to_stream()
+            except ConnectionError as e:
+                 st.error(f"Streaming is active but camera instance is not available: {e}")
                  st.session_state.streaming = False
                  return # Exit if no camera instance
 
             st.write("Streaming... (Click 'Stop Streaming' to end)")
 
-            camera_instance_stream = st.session_state.camera_instance_stream
-
-            # Create a placeholder for the camera stream image
-            # This placeholder should ideally be created once outside this loop
-            # We will update the existing placeholder created in render_camera_control
-            image_placeholder = st.empty() # This line is actually redundant here if created outside
+            # Adapts the display rate to what encoding and delivery can sustain
+            rate = RateController(max_fps=st.session_state.max_fps_input,
+                                  latency_target=st.session_state.latency_target_input / 1000.0)
+            analyzer = get_analyzer()
+            next_analytics = time.monotonic()
 
             while st.session_state.streaming:
                 try:
-                    # Use getFutureFrames(1) for streaming
-                    # Await the async function directly
-                    result = await asyncio.to_thread(camera_instance_stream.getFutureFrames, 1)
-
-                    frame_object = None
-                    if isinstance(result, list) and result:
-                        frame_object = result[0]
-                    elif result is not None:
-                        frame_object = result
-
-                    if frame_object:
-                        frame = frame_object.toNumpyArray()
-
-                        # Encode and display frame
-                        import cv2
-                        is_success, buffer = cv2.imencode(".jpg", frame)
-                        if is_success:
-                            jpeg_bytes = buffer.tobytes()
-                            image = Image.open(io.BytesIO(jpeg_bytes))
-                            # Update the image in the placeholder
-                            image_placeholder.image(image)
-                        else:
-                            st.error("Could not encode frame to JPEG in stream.")
-
-                    # Add a small delay
-                    await asyncio.sleep(0.01) # Reduce delay for potentially smoother stream
+                    if publisher.error is not None:
+                        raise publisher.error
+
+                    # Latest frame wins: a slow session drops frames, never delays others
+                    encoded = mailbox.get(1.0)
+
+                    # Stale frames are dropped rather than queued behind newer ones
+                    if encoded is not None and not rate.should_drop(encoded.timestamp):
+                        delivery_start = time.perf_counter()
+                        # Update the image in the placeholder
+                        show_encoded_frame(image_placeholder, encoded,
+                                           caption=f"{describe_encoded_frame(encoded)}, "
+                                                   f"{rate.target_fps:.1f} fps, {rate.latency * 1000:.0f} ms latency")
+                        delivery_time = time.perf_counter() - delivery_start
+                        METRICS.observe("display", delivery_time)
+                        rate.frame_shown(encoded.encode_ms / 1000.0 + delivery_time,
+                                         time.time() - encoded.timestamp)
+                        # Acquisition follows the measured rate instead of the cap
+                        mailbox.max_fps = rate.target_fps
+
+                    # Only shows the analyzer's latest results, once a second
+                    if analyzer is not None and time.monotonic() >= next_analytics:
+                        with analytics_placeholder.container():
+                            render_frame_stats(analyzer)
+                        next_analytics = time.monotonic() + 1.0
+
+                    # Pace the display instead of sleeping a fixed delay
+                    time.sleep(rate.next_delay())
 
                 except Exception as e:
                     st.error(f"Error during streaming: {e}")
                     st.session_state.streaming = False # Stop streaming on error
-                    # Close the camera connection when stopping stream
-                    if 'camera_instance_stream' in st.session_state and st.session_state.camera_instance_stream:
-                         try:
-                             camera_instance_stream.close()
-                         except AttributeError:
-                             pass
-                         finally:
-                             del st.session_state.camera_instance_stream
+                    unsubscribe_from_stream()
 
             # This part is reached when st.session_state.streaming becomes False
             st.write("Streaming stopped.")
-            # Rerun to update the UI after stopping the stream (optional but can clean up state)
-            # st.rerun() # We might need one final rerun here to clean up state if necessary
 
-        # Removed the direct await call here
-        # Call the async single frame streaming function if streaming is active
+        # The frame loop blocks this script run until streaming stops; the
+        # next rerun (e.g. the Stop button) interrupts it
         if st.session_state.streaming:
-            # We need to run the async streaming function in a way that doesn't block
-            # the main Streamlit event loop. This is tricky.
-            # Option 1: Use a separate thread/process to run the loop and communicate back (complex)
-            # Option 2: Use Streamlit's native update mechanism if possible (st.image returns an updatable object)
-            # Option 3: A simple non-blocking loop might require custom components or different framework.
+            if live_view == "Streamlit":
+                stream_single_frame()
+            else:
+                render_live_view(live_view)
+                analyzer = get_analyzer()
+                if analyzer is not None:
+                    render_analytics_panel(analyzer)
 
-            # For now, let's call the async function, but understand it might not stream continuously this way
-            # without a mechanism to keep it running without blocking or rerunning excessively.
-            # Let's revert to the previous state for now, but keep the placeholder concept.
+    else:
+        st.warning(backend_warning("camera"))
 
-            # Let's go back to the state where the single frame capture works
-            # and the streaming is attempted via rerun, while we figure out the non-blocking loop.
-            # This means restoring the st.rerun() in the stream_single_frame logic
-            # and the await call here.
+# --- Multi-device dashboard ---
+def apply_device_config_action(camera_rows, motor_rows, path: str):
+    """
+    Validate the edited device lists, apply them to the registry and save them to path.
+    """
+    try:
+        cameras, motors = parse_device_config({"cameras": camera_rows, "motors": motor_rows})
+    except ValueError as e:
+        st.error(f"Invalid device list: {e}")
+        return
+    get_device_registry().configure(cameras, motors)
+    try:
+        save_device_config(path, cameras, motors)
+    except OSError as e:
+        st.warning(f"Devices applied but not saved to {path}: {e}")
+        return
+    st.success(f"{len(cameras)} cameras and {len(motors)} motor axes configured, saved to {path}")
 
-            # Reverting to the previous state where await stream_single_frame() is called here
-            # and st.rerun() is inside stream_single_frame to cause loop continuation.
-            await stream_single_frame()
+def grab_all_cameras_action(names):
+    """
+    Grab one frame from every camera in names, concurrently on the device runtime.
 
-    else:
-        st.warning("Camera module not loaded due to import error.")
+    Returns {name: frame or exception}.
+    """
+    registry = get_device_registry()
+    runtime = get_runtime()
+    # Grabs only: bench camera settings do not go through the fastlabio module
+    grabs = [AsyncCamera(runtime, None, registry.camera_pool(name)).grab_frame() for name in names]
+    return dict(zip(names, runtime.run_all(*grabs)))
+
+def read_all_positions_action(names):
+    """
+    Read the position of every motor axis in names concurrently.
+
+    Returns {name: position or exception}.
+    """
+    registry = get_device_registry()
+    reads = [AsyncMotor(registry.motor_queue(name)).get_position() for name in names]
+    return dict(zip(names, get_runtime().run_all(*reads, timeout=5.0)))
+
+def editor_rows(table) -> list:
+    """
+    Rows of an edited device table as dicts. Rows without a name are
+    ignored and empty cells left out, so they take their default.
+    """
+    rows = []
+    for row in table.to_dict("records"):
+        row = {key: value for key, value in row.items() if value is not None and value == value} # NaN != NaN
+        if row.get("name"):
+            rows.append(row)
+    return rows
+
+def grid_containers(count: int, per_row: int) -> list:
+    """
+    count containers laid out in rows of per_row columns.
+    """
+    containers = []
+    for start in range(0, count, per_row):
+        containers.extend(st.columns(per_row)[:count - start])
+    return containers
+
+def render_device_config():
+    """
+    Editable lists of the bench cameras and motor axes.
+    """
+    registry = get_device_registry()
+    with st.expander("Bench Devices", expanded=not (registry.cameras or registry.motors)):
+        st.caption("Cameras are reached with pysilico and motor axes with plico_motor; "
+                   "the simulated backend needs no hardware.")
+        import pandas as pd # Typed, editable tables even when a list is empty
+        camera_rows = st.data_editor(
+            pd.DataFrame([c._asdict() for c in registry.cameras.values()], columns=CameraConfig._fields),
+            num_rows="dynamic", key='device_cameras_editor',
+            column_config={"name": st.column_config.TextColumn("Camera"),
+                           "host": st.column_config.TextColumn("Host", default="localhost"),
+                           "port": st.column_config.NumberColumn("Port", min_value=1, max_value=65535, step=1),
+                           "backend": st.column_config.SelectboxColumn("Backend", options=CAMERA_BACKENDS,
+                                                                       default="pysilico")})
+        motor_rows = st.data_editor(
+            pd.DataFrame([m._asdict() for m in registry.motors.values()], columns=MotorConfig._fields),
+            num_rows="dynamic", key='device_motors_editor',
+            column_config={"name": st.column_config.TextColumn("Axis"),
+                           "host": st.column_config.TextColumn("Host", default="localhost"),
+                           "port": st.column_config.NumberColumn("Port", min_value=1, max_value=65535, step=1),
+                           "axis": st.column_config.NumberColumn("Axis Number", min_value=1, step=1, default=1),
+                           "backend": st.column_config.SelectboxColumn("Backend", options=MOTOR_BACKENDS,
+                                                                       default="plico_motor")})
+        path = st.text_input("Device File:", value=os.environ.get("GUAILIT_DEVICES", "guailit_devices.json"),
+                             key='device_file_input')
+        if st.button("Apply Devices", key='apply_devices_button'):
+            apply_device_config_action(editor_rows(camera_rows), editor_rows(motor_rows), path)
+
+def stream_camera_grid(names, containers):
+    """
+    Show the streams of the cameras in names, one per container, until the
+    grid is stopped. Every camera is acquired and encoded by its own
+    publisher thread; this loop only picks up the latest frame of each.
+    """
+    settings = get_display_settings()
+    max_fps = st.session_state.get('max_fps_input', 30.0)
+    placeholders = {name: container.empty() for name, container in zip(names, containers)}
+    subscriptions = {}
+    for name in names:
+        publisher = get_frame_publisher(*settings, camera=get_device_registry().cameras[name])
+        try:
+            subscriptions[name] = (publisher, publisher.subscribe(max_fps))
+        except ConnectionError as e:
+            placeholders[name].error(f"{name}: could not connect: {e}")
+    try:
+        while st.session_state.grid_streaming and subscriptions:
+            for name, (publisher, mailbox) in subscriptions.items():
+                if publisher.error is not None:
+                    placeholders[name].error(f"{name}: {publisher.error}")
+                    continue
+                encoded = mailbox.get(0) # Never wait on one camera while others have frames
+                if encoded is not None:
+                    show_encoded_frame(placeholders[name], encoded,
+                                       caption=f"{name}: {describe_encoded_frame(encoded)}")
+            time.sleep(1.0 / max_fps)
+    finally:
+        # Also reached when a rerun interrupts the loop
+        for publisher, mailbox in subscriptions.values():
+            publisher.unsubscribe(mailbox)
+
+def render_camera_grid():
+    """
+    Grid of the streams of all bench cameras.
+    """
+    registry = get_device_registry()
+    names = list(registry.cameras)
+    st.subheader("Cameras")
+    grid_columns = st.columns(2)
+    per_row = grid_columns[0].number_input("Cameras per Row:", min_value=1, max_value=6, value=2,
+                                           key='grid_per_row_input')
+    grid_view = grid_columns[1].radio("Grid View:", ["Streamlit", "MJPEG", "WebSocket"], horizontal=True,
+                                      key='grid_view_select')
+    if 'grid_streaming' not in st.session_state:
+        st.session_state.grid_streaming = False
+
+    button_columns = st.columns(3)
+    if button_columns[0].button("Start Grid", key='start_grid_button'):
+        st.session_state.grid_streaming = True
+        st.rerun()
+    if button_columns[1].button("Stop Grid", key='stop_grid_button'):
+        st.session_state.grid_streaming = False
+        st.rerun()
+    grab_all = button_columns[2].button("Grab All Cameras", key='grab_all_button')
+
+    containers = grid_containers(len(names), int(per_row))
+    if grab_all:
+        frames = grab_all_cameras_action(names)
+        encoder = get_frame_encoder()
+        for container, name in zip(containers, names):
+            frame = frames[name]
+            if isinstance(frame, Exception):
+                container.error(f"{name}: {frame}")
+            elif frame is None:
+                container.warning(f"{name}: no frame received.")
+            else:
+                show_encoded_frame(container, encoder.encode(DisplayMapper(get_contrast_window())(frame)),
+                                   caption=name)
+    elif st.session_state.grid_streaming:
+        if grid_view == "Streamlit":
+            stream_camera_grid(names, containers)
+        else:
+            settings = get_display_settings()
+            width = max(160, 960 // int(per_row))
+            for container, name in zip(containers, names):
+                with container:
+                    publisher = get_frame_publisher(*settings, camera=registry.cameras[name])
+                    render_live_view(grid_view, publisher, width, key=f"grid_{name}")
+
+def render_axis_panel(name: str):
+    """
+    Move, speed and position controls of one bench motor axis.
+    """
+    command_queue = get_device_registry().motor_queue(name)
+    st.markdown(f"**{name}**")
+    target_position = st.number_input("Target Position:", step=0.01, key=f'axis_{name}_pos_input')
+    if st.button("Move", key=f'axis_{name}_move_button'):
+        st.session_state[f'axis_{name}_move_command'] = command_queue.move(target_position)
+    render_command_status("Last move", f'axis_{name}_move_command')
+    target_speed = st.number_input("Speed:", step=0.01, min_value=0.0, key=f'axis_{name}_speed_input')
+    if st.button("Set Speed", key=f'axis_{name}_speed_button'):
+        st.session_state[f'axis_{name}_speed_command'] = command_queue.set_speed(target_speed)
+    render_command_status("Last speed change", f'axis_{name}_speed_command')
+
+def render_motor_axes():
+    """
+    One control panel per bench motor axis.
+    """
+    registry = get_device_registry()
+    names = list(registry.motors)
+    st.subheader("Motor Axes")
+    for container, name in zip(grid_containers(len(names), min(len(names), 4)), names):
+        with container:
+            render_axis_panel(name)
+    if st.button("Read All Positions", key='read_all_positions_button'):
+        positions = read_all_positions_action(names)
+        for container, name in zip(grid_containers(len(names), min(len(names), 4)), names):
+            position = positions[name]
+            if isinstance(position, Exception):
+                container.error(f"{name}: {position}")
+            else:
+                container.metric(name, f"{position:.4f}")
+
+def render_dashboard():
+    """
+    Renders the multi-device section: device lists, camera grid and motor axes.
+    """
+    st.markdown("===") # Larger separator
+    st.header("Bench Dashboard")
+    render_device_config()
+    registry = get_device_registry()
+    if registry.motors:
+        render_motor_axes()
+    if registry.cameras:
+        render_camera_grid()
 
 def main():
     """
@@ -332,9 +1365,12 @@ def main():
     st.write("Welcome to the fastlabio web interface built with Streamlit.")
     st.write("Use the sections below to control the motor and camera.")
 
+    render_metrics_sidebar()
     render_motor_control()
-    # Run the async camera control rendering function
-    asyncio.run(render_camera_control())
+    render_scan_control()
+    # Device calls run on the shared runtime loop, not on a loop per rerun
+    render_camera_control()
+    render_dashboard()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,174 @@
+# Path: guailit/averaging.py
+# -*- coding: utf-8 -*-
+"""
+Frame averaging for low-light work.
+
+A FrameAverager keeps a running sliding-window mean or exponential moving
+average of the frames it is given, in a float32 accumulator that is
+allocated once and then updated in place. It can be fed frame by frame,
+e.g. as a FrameGrabber listener for a live averaged view, or with a whole
+stack pulled from the camera in a single getFutureFrames(n) call.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import os
+import threading
+
+import numpy as np
+
+from guailit.grabber import frame_from_result
+
+AVERAGING_MODES = ("mean", "ema")
+
+
+def split_frame_stack(result, n: int) -> list:
+    """
+    The n frames of a getFutureFrames(n) result, as numpy arrays.
+
+    Backends return either a list of frame objects or one frame object
+    whose array holds the n frames stacked along its last axis.
+    """
+    if isinstance(result, list):
+        return [frame.toNumpyArray() for frame in result]
+    frame_object = frame_from_result(result)
+    if frame_object is None:
+        return []
+    array = frame_object.toNumpyArray()
+    if n == 1:
+        return [array]
+    if array.shape[-1] != n:
+        raise ValueError(f"Expected {n} frames stacked on the last axis, got shape {array.shape}.")
+    return [array[..., i] for i in range(n)]
+
+
+class FrameAverager:
+    """
+    Running average of frames.
+
+    mode="mean" averages the last window frames: the sum is updated by
+    adding the new frame and subtracting the one leaving the window, which
+    is kept in a ring of window preallocated slots. mode="ema" is an
+    exponential moving average with weight alpha for the new frame, and
+    needs no ring. Calling the averager as fn(seq, timestamp, frame) adds
+    the frame, so it can be registered as a frame listener.
+    """
+
+    # Integer sums are exact in float32 up to 2**24: the window sum is
+    # recomputed from the ring regularly so rounding cannot build up
+    RESYNC_EVERY = 1024
+
+    def __init__(self, mode: str = "mean", window: int = 16, alpha: float = 0.1):
+        if mode not in AVERAGING_MODES:
+            raise ValueError(f"Unknown averaging mode {mode!r}, expected one of {AVERAGING_MODES}.")
+        self.mode = mode
+        self.window = max(1, int(window))
+        self.alpha = float(alpha)
+        self.frames_added = 0
+        self._accumulator = None
+        self._ring = None
+        self._work = None
+        self._mean = None
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        """Number of frames in the current average."""
+        if self.mode == "ema":
+            return self.frames_added
+        return min(self.frames_added, self.window)
+
+    def reset(self):
+        with self._lock:
+            self.frames_added = 0
+
+    def _allocate(self, frame: np.ndarray):
+        self._accumulator = np.zeros(frame.shape, dtype=np.float32)
+        self._work = np.empty(frame.shape, dtype=np.float32)
+        self._mean = np.empty(frame.shape, dtype=np.float32)
+        self._ring = np.empty((self.window,) + frame.shape, dtype=frame.dtype) if self.mode == "mean" else None
+
+    def add(self, frame: np.ndarray):
+        """
+        Add one frame to the average. A frame of another shape restarts it.
+        """
+        with self._lock:
+            if self._accumulator is None or self._accumulator.shape != frame.shape \
+                    or (self._ring is not None and self._ring.dtype != frame.dtype):
+                self._allocate(frame)
+                self.frames_added = 0
+            if self.frames_added == 0:
+                np.copyto(self._accumulator, frame, casting="unsafe")
+            elif self.mode == "ema":
+                # accumulator += alpha * (frame - accumulator), without temporaries
+                np.subtract(frame, self._accumulator, out=self._work, casting="unsafe")
+                np.multiply(self._work, self.alpha, out=self._work)
+                np.add(self._accumulator, self._work, out=self._accumulator)
+            else:
+                slot = self._ring[self.frames_added % self.window]
+                if self.frames_added >= self.window:
+                    np.subtract(self._accumulator, slot, out=self._accumulator, casting="unsafe")
+                np.add(self._accumulator, frame, out=self._accumulator, casting="unsafe")
+            if self.mode == "mean":
+                np.copyto(self._ring[self.frames_added % self.window], frame)
+            self.frames_added += 1
+            if self.mode == "mean" and self.frames_added >= self.window \
+                    and self.frames_added % self.RESYNC_EVERY == 0:
+                self._ring.sum(axis=0, dtype=np.float32, out=self._accumulator)
+
+    def add_stack(self, frames):
+        """
+        Add several frames, e.g. the result of split_frame_stack().
+        """
+        for frame in frames:
+            self.add(frame)
+
+    def __call__(self, seq: int, timestamp: float, frame: np.ndarray):
+        # Frame listener signature
+        self.add(frame)
+
+    def mean(self, out: np.ndarray = None) -> np.ndarray:
+        """
+        Current average as float32, None before the first frame.
+
+        Without out the result is a buffer owned by the averager, overwritten
+        by the next call.
+        """
+        with self._lock:
+            if self.frames_added == 0:
+                return None
+            out = self._mean if out is None else out
+            if self.mode == "ema":
+                np.copyto(out, self._accumulator)
+            else:
+                np.multiply(self._accumulator, 1.0 / self.count, out=out)
+            return out
+
+    def save(self, path: str) -> str:
+        """
+        Save the current average at full (float32) precision as a .npy file.
+        """
+        average = self.mean(out=None if self._mean is None else np.empty_like(self._mean))
+        if average is None:
+            raise ValueError("No frames averaged yet.")
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        np.save(path, average)
+        return path if path.endswith(".npy") else path + ".npy"
+
+
+def grab_average(camera_instance, n: int, averager: FrameAverager = None) -> np.ndarray:
+    """
+    Average n frames pulled with a single getFutureFrames(n) call.
+
+    Returns the float32 average, a copy that the caller owns.
+    """
+    frames = split_frame_stack(camera_instance.getFutureFrames(int(n)), int(n))
+    if not frames:
+        raise RuntimeError("No frames received.")
+    if averager is None:
+        averager = FrameAverager("mean", window=len(frames))
+    averager.add_stack(frames)
+    return averager.mean(out=np.empty(frames[0].shape, dtype=np.float32))
@@ -0,0 +1,285 @@
+# Path: guailit/benchmark.py
+# -*- coding: utf-8 -*-
+"""
+Offline benchmark of the guailit frame pipeline.
+
+Runs the same acquire / preprocess / encode / fan-out pipeline that the
+Streamlit app uses, headless and against the simulated devices of
+guailit.simulated, and reports throughput, per-frame latency, CPU time per
+frame and memory as JSON. Typical use:
+
+    python -m guailit.benchmark --width 5472 --height 3648 --json run.json
+    python -m guailit.benchmark --compare run.json
+    python -m guailit.benchmark --replay recordings/run --replay-speed 2
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import argparse
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+
+from guailit.change_detect import ChangeDetector
+from guailit.connections import DevicePool
+from guailit.display_map import DisplayMapper
+from guailit.encoding import make_encoder
+from guailit.preprocess import FramePreprocessor
+from guailit.publisher import FramePublisher
+from guailit.replay import ReplayMotor, ReplaySession, parse_replay_speed
+from guailit.simulated import SimulatedCamera, SimulatedMotor
+
+try:
+    import resource
+except ImportError: # Not available on Windows
+    resource = None
+
+# Metrics where a higher value is better; for all the others lower is better
+HIGHER_IS_BETTER = {"delivered_fps", "acquired_fps"}
+
+
+def _percentiles(values) -> dict:
+    if not values:
+        return {"p50": None, "p99": None}
+    values = np.asarray(values, dtype=np.float64)
+    return {"p50": float(np.percentile(values, 50)), "p99": float(np.percentile(values, 99))}
+
+
+def max_rss_mb() -> float:
+    """
+    Peak resident memory of this process in MB, None where unsupported.
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def benchmark_stream(camera, duration: float = 5.0, viewers: int = 1, encoder_name: str = "JPEG",
+                     quality: int = 85, roi=None, binning: int = 1, display_width: int = 0,
+                     change_threshold: float = None, auto_contrast: bool = True, encode_workers: int = 1) -> dict:
+    """
+    Stream from camera for duration seconds to `viewers` simulated sessions.
+    """
+    encoder = make_encoder(encoder_name, quality=quality) if encoder_name == "JPEG" \
+        else make_encoder(encoder_name)
+    preprocessor = FramePreprocessor(roi, binning, display_width)
+    change_detector = ChangeDetector(threshold=change_threshold) if change_threshold is not None else None
+    publisher = FramePublisher(DevicePool("camera", lambda: camera), encoder,
+                               preprocess=None if preprocessor.is_identity else preprocessor,
+                               change_detector=change_detector,
+                               display_map=DisplayMapper() if auto_contrast else None,
+                               encode_workers=encode_workers)
+
+    latencies = [[] for _ in range(viewers)]
+    encode_ms = []
+    stop = threading.Event()
+
+    def viewer(mailbox, samples):
+        while not stop.is_set():
+            encoded = mailbox.get(timeout=0.2)
+            if encoded is None:
+                continue
+            samples.append((time.time() - encoded.timestamp) * 1000.0)
+            if samples is latencies[0]:
+                encode_ms.append(encoded.encode_ms)
+
+    mailboxes = [publisher.subscribe() for _ in range(viewers)]
+    threads = [threading.Thread(target=viewer, args=(mailbox, samples), daemon=True)
+               for mailbox, samples in zip(mailboxes, latencies)]
+    cpu_start = time.process_time()
+    wall_start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    wall = time.monotonic() - wall_start
+    cpu = time.process_time() - cpu_start
+    frames_acquired = publisher.frames_acquired
+    publisher.stop()
+    if publisher.error is not None:
+        raise publisher.error
+
+    delivered = sum(len(samples) for samples in latencies)
+    frames_encoded = publisher.frames_encoded
+    return {
+        "frames_acquired": frames_acquired,
+        "frames_encoded": frames_encoded,
+        "frames_delivered": delivered,
+        "acquired_fps": frames_acquired / wall,
+        "delivered_fps": delivered / viewers / wall,
+        "latency_ms": _percentiles([value for samples in latencies for value in samples]),
+        "encode_ms": _percentiles(encode_ms),
+        "cpu_ms_per_frame": cpu * 1000.0 / frames_encoded if frames_encoded else None,
+        "dropped_per_viewer": [mailbox.dropped for mailbox in mailboxes],
+        "frames_unchanged": change_detector.frames_skipped if change_detector is not None else 0,
+    }
+
+
+def benchmark_cameras(cameras, duration: float = 5.0, **options) -> dict:
+    """
+    Stream from several cameras at once, each through its own publisher, as
+    the dashboard does. Aggregate throughput should grow with the number of
+    cameras until the CPU is saturated.
+    """
+    results = [None] * len(cameras)
+
+    def stream(index, camera):
+        try:
+            results[index] = benchmark_stream(camera, duration, **options)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=stream, args=(i, camera), daemon=True) for i, camera in enumerate(cameras)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    return {
+        "cameras": len(cameras),
+        "total_acquired_fps": sum(result["acquired_fps"] for result in results),
+        "total_delivered_fps": sum(result["delivered_fps"] for result in results),
+        "acquired_fps_per_camera": [result["acquired_fps"] for result in results],
+    }
+
+
+def benchmark_motor(motor, moves: int = 20, step: float = 1.0) -> dict:
+    """
+    Time move commands and position reads against a motor.
+    """
+    move_ms = []
+    read_ms = []
+    position = motor.get_motor_position()
+    for i in range(moves):
+        start = time.perf_counter()
+        motor.move_motor(position + step * (1 if i % 2 == 0 else -1))
+        move_ms.append((time.perf_counter() - start) * 1000.0)
+        start = time.perf_counter()
+        motor.get_motor_position()
+        read_ms.append((time.perf_counter() - start) * 1000.0)
+    return {"move_command_ms": _percentiles(move_ms), "position_read_ms": _percentiles(read_ms)}
+
+
+def run_benchmark(args) -> dict:
+    if args.replay:
+        # Recorded frames at their recorded rate (or --replay-speed times it)
+        session = ReplaySession(args.replay, parse_replay_speed(args.replay_speed))
+        camera = session.get_pysilico_camera_sync()
+        motor = ReplayMotor(session) if session.motor_positions_recorded else SimulatedMotor(
+            command_latency=args.motor_latency)
+    else:
+        camera = SimulatedCamera(args.width, args.height, args.bit_depth, args.fps, args.jitter)
+        motor = SimulatedMotor(command_latency=args.motor_latency)
+    roi = tuple(args.roi) if args.roi else None
+    results = {
+        "config": vars(args).copy(),
+        "stream": benchmark_stream(camera, args.duration, args.viewers, args.encoder,
+                                   args.quality, roi, args.binning, args.display_width,
+                                   args.change_threshold, not args.no_auto_contrast, args.encode_workers),
+        "motor": benchmark_motor(motor, args.moves),
+    }
+    if args.cameras > 1:
+        cameras = [SimulatedCamera(args.width, args.height, args.bit_depth, args.fps, args.jitter, seed=i)
+                   for i in range(args.cameras)]
+        results["multi_camera"] = benchmark_cameras(
+            cameras, args.duration, viewers=args.viewers, encoder_name=args.encoder, quality=args.quality,
+            roi=roi, binning=args.binning, display_width=args.display_width,
+            change_threshold=args.change_threshold, auto_contrast=not args.no_auto_contrast,
+            encode_workers=args.encode_workers)
+    results["max_rss_mb"] = max_rss_mb()
+    return results
+
+
+def _flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare_results(baseline: dict, current: dict, tolerance: float = 0.1) -> list:
+    """
+    List the metrics of current that are worse than baseline by more than tolerance.
+    """
+    regressions = []
+    base = _flatten(baseline.get("stream", {}), "stream.")
+    base.update(_flatten(baseline.get("motor", {}), "motor."))
+    now = _flatten(current.get("stream", {}), "stream.")
+    now.update(_flatten(current.get("motor", {}), "motor."))
+    for name, old in base.items():
+        new = now.get(name)
+        if new is None or not old or name.startswith("stream.frames_"):
+            continue
+        change = (new - old) / abs(old)
+        if name.split(".")[1] in HIGHER_IS_BETTER:
+            change = -change
+        if change > tolerance:
+            regressions.append({"metric": name, "baseline": old, "current": new,
+                                "change": f"{change * 100:+.1f}% worse"})
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the guailit frame pipeline offline.")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--bit-depth", type=int, default=8)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--jitter", type=float, default=0.05, help="Frame interval jitter, fraction of the interval.")
+    parser.add_argument("--duration", type=float, default=5.0, help="Streaming time in seconds.")
+    parser.add_argument("--viewers", type=int, default=1)
+    parser.add_argument("--encode-workers", type=int, default=1, help="Frames encoded in parallel.")
+    parser.add_argument("--cameras", type=int, default=1,
+                        help="Also stream from this many cameras at once and report the total throughput.")
+    parser.add_argument("--encoder", default="JPEG", choices=["JPEG", "PNG", "RAW"])
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--roi", type=int, nargs=4, metavar=("X", "Y", "W", "H"))
+    parser.add_argument("--binning", type=int, default=1)
+    parser.add_argument("--display-width", type=int, default=0)
+    parser.add_argument("--change-threshold", type=float,
+                        help="Skip frames with less than this fraction of changed pixels.")
+    parser.add_argument("--no-auto-contrast", action="store_true",
+                        help="Encode frames as acquired, without the 8-bit display mapping.")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="Stream this recording (file prefix) instead of a simulated camera.")
+    parser.add_argument("--replay-speed", default="1",
+                        help="Replay speed as a factor of real time, or 'max' for as fast as possible.")
+    parser.add_argument("--motor-latency", type=float, default=0.005, help="Motor command latency in seconds.")
+    parser.add_argument("--moves", type=int, default=20)
+    parser.add_argument("--json", help="Write the results to this file.")
+    parser.add_argument("--compare", help="Baseline results file; exit with status 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed regression, as a fraction.")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args)
+    status = 0
+    if args.compare:
+        with open(args.compare) as f:
+            results["regressions"] = compare_results(json.load(f), results, args.tolerance)
+        status = 1 if results["regressions"] else 0
+
+    output = json.dumps(results, indent=2, default=str)
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(output)
+    print(output)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# Path: guailit/change_detect.py
+# -*- coding: utf-8 -*-
+"""
+Change detection for the guailit live view.
+
+Most camera views are static for long stretches, yet every new frame used to
+be encoded and pushed to every viewer. A ChangeDetector compares a strided
+subsample of each frame with the same pixels of the last frame that was
+sent, so the stream can skip frames that show nothing new while still
+updating on the first frame where something moves.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import time
+
+import numpy as np
+
+from guailit.analytics import full_scale
+
+
+class ChangeDetector:
+    """
+    Decide whether a frame differs enough from the last frame sent.
+
+    Only every step-th pixel of every step-th row is compared. A sampled
+    pixel counts as changed when it moved by more than noise (a fraction of
+    full scale, so sensor noise does not count), and the frame is sent when
+    more than threshold of the sampled pixels changed. threshold=0 sends
+    the frame as soon as one sampled pixel changed. At least one frame is
+    sent every keep_alive seconds, so viewers can tell the stream is alive.
+    """
+
+    def __init__(self, threshold: float = 0.001, noise: float = 0.02, step: int = 8,
+                 keep_alive: float = 1.0):
+        self.threshold = threshold
+        self.noise = noise
+        self.step = max(1, int(step))
+        self.keep_alive = keep_alive
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.last_score = None # Fraction of sampled pixels changed in the last frame
+        self._reference = None
+        self._work = None
+        self._noise_counts = 0
+        self._last_sent = None
+
+    def reset(self):
+        """
+        Forget the reference frame, so the next frame is always sent.
+        """
+        self._reference = None
+
+    def _set_reference(self, sample: np.ndarray, now: float):
+        if self._reference is None or self._reference.shape != sample.shape:
+            self._reference = np.empty(sample.shape, dtype=np.float32)
+            self._work = np.empty(sample.shape, dtype=np.float32)
+        np.copyto(self._reference, sample)
+        # Sensor noise scales with the bit depth the data uses, not with its dtype
+        self._noise_counts = self.noise * full_scale(sample, from_peak=True)
+        self._last_sent = now
+        self.frames_sent += 1
+
+    def should_send(self, frame: np.ndarray, now: float = None) -> bool:
+        """
+        True if frame must be sent; it then becomes the new reference.
+        """
+        now = time.monotonic() if now is None else now
+        sample = frame[::self.step, ::self.step]
+        if self._reference is None or self._reference.shape != sample.shape:
+            self.last_score = 1.0
+            self._set_reference(sample, now)
+            return True
+        np.subtract(sample, self._reference, out=self._work)
+        np.abs(self._work, out=self._work)
+        self.last_score = np.count_nonzero(self._work > self._noise_counts) / self._work.size
+        if self.last_score > self.threshold or now - self._last_sent >= self.keep_alive:
+            self._set_reference(sample, now)
+            return True
+        self.frames_skipped += 1
+        return False
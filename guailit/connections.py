@@ -0,0 +1,197 @@
+# Path: guailit/connections.py
+# -*- coding: utf-8 -*-
+"""
+Pooled, health-checked device connections for the guailit library.
+
+A DevicePool keeps device handles open for the whole process, so all
+Streamlit sessions share them instead of connecting on every action. Idle
+handles are probed before reuse, failed connections are retried with
+exponential backoff, and the number of open handles is capped so several
+operators cannot exhaust the fastlabio servers.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+def probe_camera(camera_instance):
+    """
+    Cheap liveness check for a pysilico camera handle. Raises if it is dead.
+    """
+    if hasattr(camera_instance, "exposureTime"):
+        camera_instance.exposureTime()
+    else:
+        camera_instance.getFutureFrames(1)
+
+
+def close_handle(handle):
+    """
+    Close a device handle, ignoring handles without a close() method.
+    """
+    try:
+        handle.close()
+    except AttributeError:
+        pass
+
+
+class DevicePool:
+    """
+    Process-wide pool of handles to one device.
+
+    connect() creates a new handle (returning None counts as a failure),
+    probe(handle) raises if the handle is no longer usable, close(handle)
+    releases it. Handles idle for more than probe_interval seconds are probed
+    before being handed out again.
+    """
+
+    def __init__(self, name: str, connect, probe=None, close=close_handle,
+                 max_handles: int = 4, probe_interval: float = 10.0,
+                 backoff_initial: float = 0.5, backoff_max: float = 30.0):
+        if max_handles < 1:
+            raise ValueError("DevicePool needs at least one handle.")
+        self.name = name
+        self._connect_fn = connect
+        self._probe_fn = probe
+        self._close_fn = close
+        self.max_handles = max_handles
+        self.probe_interval = probe_interval
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+
+        self._idle = [] # (handle, last used monotonic time)
+        self._open = 0
+        self._failures = 0
+        self._next_attempt = 0.0
+        self.last_error = None
+        self._cond = threading.Condition()
+
+    @property
+    def open_handles(self) -> int:
+        return self._open
+
+    @property
+    def idle_handles(self) -> int:
+        return len(self._idle)
+
+    def _connect(self):
+        now = time.monotonic()
+        with self._cond:
+            if now < self._next_attempt:
+                raise ConnectionError(
+                    f"{self.name} unavailable, retrying in {self._next_attempt - now:.1f} s "
+                    f"(last error: {self.last_error})")
+        try:
+            handle = self._connect_fn()
+            if handle is None:
+                raise ConnectionError(f"could not connect to {self.name}")
+        except Exception as e:
+            with self._cond:
+                self._failures += 1
+                delay = min(self.backoff_initial * 2 ** (self._failures - 1), self.backoff_max)
+                self._next_attempt = time.monotonic() + delay
+                self.last_error = e
+            raise ConnectionError(f"{self.name} unavailable: {e}") from e
+        with self._cond:
+            self._failures = 0
+            self._next_attempt = 0.0
+            self.last_error = None
+        return handle
+
+    def _is_alive(self, handle) -> bool:
+        if self._probe_fn is None:
+            return True
+        try:
+            self._probe_fn(handle)
+            return True
+        except Exception as e:
+            self.last_error = e
+            return False
+
+    def acquire(self, timeout: float = 5.0):
+        """
+        Get a handle for exclusive use. It must be given back with release().
+
+        Raises ConnectionError if the device cannot be reached, or if all
+        handles stay in use for longer than timeout seconds.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    # Most recently used first: it is the least likely to be stale
+                    handle, last_used = self._idle.pop()
+                    break
+                if self._open < self.max_handles:
+                    handle, last_used = None, None
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    raise ConnectionError(
+                        f"All {self.max_handles} {self.name} connections are in use.")
+
+        try:
+            if handle is not None and time.monotonic() - last_used > self.probe_interval \
+                    and not self._is_alive(handle):
+                self._safe_close(handle)
+                handle = None
+            if handle is None:
+                handle = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        return handle
+
+    def release(self, handle, broken: bool = False):
+        """
+        Give a handle back to the pool. Broken handles are closed and dropped.
+        """
+        if broken:
+            self._safe_close(handle)
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append((handle, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self, timeout: float = 5.0):
+        """
+        Context manager around acquire()/release(). The handle is dropped if
+        the block raises.
+        """
+        handle = self.acquire(timeout)
+        try:
+            yield handle
+        except Exception:
+            self.release(handle, broken=True)
+            raise
+        self.release(handle)
+
+    def close_all(self):
+        """
+        Close all idle handles. Handles in use are closed when released broken.
+        """
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for handle, _ in idle:
+            self._safe_close(handle)
+
+    def _safe_close(self, handle):
+        if self._close_fn is None:
+            return
+        try:
+            self._close_fn(handle)
+        except Exception:
+            pass
@@ -0,0 +1,129 @@
+# Path: guailit/device_state.py
+# -*- coding: utf-8 -*-
+"""
+Process-wide mirror of the camera settings for the guailit library.
+
+fastlabio.camera only writes settings, so without a mirror the UI cannot
+show the current exposure and gain, and every widget change costs its own
+round trip to the camera server. A CameraStateMirror remembers the values
+written through guailit, and trusts them for a short time. Settings are
+diffed against it before they are applied: unchanged values are not sent, and the changed
+ones are written back to back in one job on the device executor. fastlabio
+has no batch setter, so each changed value is still one server round trip.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import threading
+import time
+
+# Camera settings and the fastlabio.camera function writing each of them
+CAMERA_SETTERS = {"exposure": "set_exposure", "gain": "set_gain"}
+
+
+class CameraStateMirror:
+    """
+    Last values of the camera settings, shared by every session.
+
+    Values are trusted for ttl seconds after they were written, since
+    another client of the camera server may change them: an expired or
+    unknown setting is always sent again. last_written() still reports
+    expired values, with their age, for display.
+    """
+
+    def __init__(self, ttl: float = 5.0):
+        self.ttl = ttl
+        self.writes_sent = 0
+        self.writes_skipped = 0
+        self._values = {} # name -> (monotonic time, value)
+        self._lock = threading.Lock()
+
+    def get(self, name: str, max_age: float = None):
+        """
+        Mirrored value of setting name, None if unknown or older than
+        max_age seconds (ttl by default).
+        """
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            entry = self._values.get(name)
+        if entry is None or time.monotonic() - entry[0] > max_age:
+            return None
+        return entry[1]
+
+    def snapshot(self) -> dict:
+        """
+        Every fresh setting, as {name: value}.
+        """
+        values = {name: self.get(name) for name in CAMERA_SETTERS}
+        return {name: value for name, value in values.items() if value is not None}
+
+    def last_written(self) -> dict:
+        """
+        Every setting written through the mirror and not invalidated since,
+        fresh or not, as {name: (value, age in seconds)}.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {name: (value, now - written) for name, (written, value) in self._values.items()}
+
+    def record(self, name: str, value):
+        """
+        Remember that setting name was written with value.
+        """
+        if name not in CAMERA_SETTERS:
+            raise KeyError(f"Unknown camera setting: {name}")
+        with self._lock:
+            self._values[name] = (time.monotonic(), value)
+
+    def invalidate(self, *names):
+        """
+        Forget the given settings, or all of them, e.g. after a failed write.
+        """
+        with self._lock:
+            for name in names or list(self._values):
+                self._values.pop(name, None)
+
+    def changes(self, settings: dict) -> dict:
+        """
+        The entries of settings that need writing: None values are left
+        out, and so are values the mirror already holds.
+        """
+        changed = {}
+        for name, value in settings.items():
+            if name not in CAMERA_SETTERS:
+                raise KeyError(f"Unknown camera setting: {name}")
+            if value is None:
+                continue
+            if self.get(name) == value:
+                self.writes_skipped += 1
+            else:
+                changed[name] = value
+        return changed
+
+    def apply(self, runtime, async_camera, settings: dict, timeout: float = 30.0) -> dict:
+        """
+        Write the settings that changed, in one executor job on runtime and
+        one server round trip each, and return them ({} if nothing had to be
+        sent). Settings written before a failure stay mirrored; the failed
+        one is forgotten.
+        """
+        changed = self.changes(settings)
+        if not changed:
+            return changed
+        written = []
+
+        def applied(name, value):
+            # Called from the device thread after each successful write
+            self.record(name, value)
+            written.append(name)
+
+        try:
+            runtime.run(async_camera.apply_settings(changed, on_applied=applied), timeout)
+        except Exception:
+            self.invalidate(*(name for name in changed if name not in written))
+            raise
+        finally:
+            self.writes_sent += len(written)
+        return changed
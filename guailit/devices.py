@@ -0,0 +1,197 @@
+# Path: guailit/devices.py
+# -*- coding: utf-8 -*-
+"""
+Multi-device configuration for the guailit library.
+
+fastlabio talks to one camera and one motor. A bench usually has several of
+each, so the dashboard reads a device list (name, host and port of each
+camera and motor axis, from a JSON file) and connects to every device
+directly, through pysilico for cameras and plico_motor for motors. Each
+camera gets its own connection pool and acquisition thread, so frames from
+different cameras are acquired in parallel, and each axis its own command
+queue. The "simulated" backend uses guailit.simulated instead of hardware.
+
+Example guailit_devices.json:
+
+    {"cameras": [{"name": "top", "host": "lab-pc", "port": 7100}],
+     "motors": [{"name": "x", "host": "lab-pc", "port": 7300, "axis": 1}]}
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import json
+import os
+import threading
+from collections import namedtuple
+
+from guailit.connections import DevicePool, probe_camera
+from guailit.motor_queue import MotorCommandQueue
+
+CameraConfig = namedtuple("CameraConfig", ["name", "host", "port", "backend"], defaults=("pysilico",))
+MotorConfig = namedtuple("MotorConfig", ["name", "host", "port", "axis", "backend"],
+                         defaults=(1, "plico_motor"))
+
+CAMERA_BACKENDS = ("pysilico", "simulated")
+MOTOR_BACKENDS = ("plico_motor", "simulated")
+
+# Device list used when GUAILIT_DEVICES is not set
+DEFAULT_CONFIG_PATH = "guailit_devices.json"
+
+
+def _parse_list(entries, config_type, backends: tuple) -> list:
+    configs = []
+    for entry in entries or []:
+        try:
+            config = config_type(**entry)
+        except TypeError as e:
+            raise ValueError(f"Invalid {config_type.__name__} entry {entry}: {e}")
+        if config.backend not in backends:
+            raise ValueError(f"Unknown backend {config.backend!r} for {config.name}, expected one of {backends}.")
+        configs.append(config._replace(port=int(config.port)))
+    names = [config.name for config in configs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Device names must be unique: {names}")
+    return configs
+
+
+def parse_device_config(data: dict) -> tuple:
+    """
+    (cameras, motors) lists of CameraConfig and MotorConfig from a dict.
+    """
+    cameras = _parse_list(data.get("cameras"), CameraConfig, CAMERA_BACKENDS)
+    motors = [m._replace(axis=int(m.axis)) for m in _parse_list(data.get("motors"), MotorConfig, MOTOR_BACKENDS)]
+    return cameras, motors
+
+
+def load_device_config(path: str = None) -> tuple:
+    """
+    Read the device list from path, GUAILIT_DEVICES or guailit_devices.json.
+
+    A missing file is an empty bench, not an error.
+    """
+    path = path or os.environ.get("GUAILIT_DEVICES", DEFAULT_CONFIG_PATH)
+    if not os.path.exists(path):
+        return [], []
+    with open(path) as f:
+        return parse_device_config(json.load(f))
+
+
+def save_device_config(path: str, cameras, motors):
+    with open(path, "w") as f:
+        json.dump({"cameras": [c._asdict() for c in cameras], "motors": [m._asdict() for m in motors]}, f, indent=2)
+
+
+class PlicoMotorAdapter:
+    """
+    fastlabio.motor API over a plico_motor client, so that the command
+    queue, the telemetry poller and the scan engine work unchanged.
+    plico_motor positions and velocities are in motor steps.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def move_motor(self, position: float):
+        self.client.move_to(position)
+
+    def get_motor_position(self) -> float:
+        return self.client.position()
+
+    def set_motor_speed(self, speed: float):
+        self.client.set_velocity(speed)
+
+
+def connect_camera(config: CameraConfig):
+    """
+    New camera connection with the pysilico getFutureFrames() API.
+    """
+    if config.backend == "simulated":
+        from guailit.simulated import SimulatedCamera
+        return SimulatedCamera(640, 480, bit_depth=12, fps=30, seed=config.port)
+    import pysilico # Only needed with real cameras
+    return pysilico.camera(config.host, config.port)
+
+
+def connect_motor(config: MotorConfig):
+    """
+    New motor connection with the fastlabio.motor API.
+    """
+    if config.backend == "simulated":
+        from guailit.simulated import SimulatedMotor
+        return SimulatedMotor()
+    import plico_motor # Only needed with real motors
+    return PlicoMotorAdapter(plico_motor.motor(config.host, config.port, axis=config.axis))
+
+
+class DeviceRegistry:
+    """
+    The configured cameras and motor axes, and their shared resources.
+
+    Connections are opened lazily, on first use. configure() replaces the
+    device list and drops the resources of devices that were removed or
+    whose address changed.
+    """
+
+    def __init__(self, cameras=(), motors=()):
+        self.cameras = {}
+        self.motors = {}
+        self._camera_pools = {}
+        self._motor_connections = {}
+        self._motor_queues = {}
+        self._lock = threading.Lock()
+        self.configure(cameras, motors)
+
+    def configure(self, cameras, motors):
+        cameras = {c.name: c for c in cameras}
+        motors = {m.name: m for m in motors}
+        with self._lock:
+            for name in list(self._camera_pools):
+                if cameras.get(name) != self.cameras.get(name):
+                    self._camera_pools.pop(name).close_all()
+            dropped = []
+            for name in list(self._motor_queues):
+                if motors.get(name) != self.motors.get(name):
+                    dropped.append(self._motor_queues.pop(name))
+                    self._motor_connections.pop(name, None)
+            self.cameras = cameras
+            self.motors = motors
+        # Outside the lock: a queue may be connecting through self.motor()
+        for command_queue in dropped:
+            command_queue.close()
+
+    def camera_pool(self, name: str) -> DevicePool:
+        """
+        Connection pool of camera name (KeyError if it is not configured).
+        """
+        with self._lock:
+            pool = self._camera_pools.get(name)
+            if pool is None:
+                config = self.cameras[name]
+                pool = DevicePool(f"camera {name}", lambda: connect_camera(config), probe=probe_camera)
+                self._camera_pools[name] = pool
+            return pool
+
+    def motor(self, name: str):
+        """
+        Connected motor axis name, with the fastlabio.motor API.
+        """
+        with self._lock:
+            connection = self._motor_connections.get(name)
+            if connection is None:
+                connection = connect_motor(self.motors[name])
+                self._motor_connections[name] = connection
+            return connection
+
+    def motor_queue(self, name: str) -> MotorCommandQueue:
+        """
+        Command queue of motor axis name; it connects on the first command.
+        """
+        with self._lock:
+            command_queue = self._motor_queues.get(name)
+            if command_queue is None:
+                self.motors[name] # KeyError for unknown axes
+                command_queue = MotorCommandQueue(lambda: self.motor(name))
+                self._motor_queues[name] = command_queue
+            return command_queue
@@ -0,0 +1,152 @@
+# Path: guailit/display_map.py
+# -*- coding: utf-8 -*-
+"""
+High bit depth to 8-bit display mapping for the guailit library.
+
+JPEG and the browser only show 8-bit images, while our sensors deliver 10
+to 16 bit frames. A DisplayMapper maps frames linearly from the current
+contrast window onto 0..255, into output buffers that are reused from
+frame to frame. The window is either fixed or follows the frame content
+(percentile auto-contrast measured on a subsample with a histogram, so no
+frame is ever sorted), and the mapping is only rebuilt when the window
+actually moves.
+
+8-bit frames go through a 256-entry lookup table (cv2.LUT). For 16-bit
+frames a 65536-entry table gather costs about 5 ns per pixel with numpy,
+so they are mapped with two saturating OpenCV passes instead, which give
+the same result as the table at roughly 1 ns per pixel.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import numpy as np
+
+# Histogram sizes for the integer frame types whose percentiles are counted
+LUT_SIZES = {np.dtype(np.uint8): 1 << 8, np.dtype(np.uint16): 1 << 16}
+
+
+def full_range_window(bit_depth: int) -> tuple:
+    """
+    Contrast window showing the whole range of a bit_depth sensor.
+    """
+    return (0, (1 << int(bit_depth)) - 1)
+
+
+def build_lut(black: float, white: float, size: int) -> np.ndarray:
+    """
+    uint8 table mapping black..white linearly onto 0..255, clipped outside.
+    """
+    scale = 255.0 / max(white - black, 1e-12)
+    lut = (np.arange(size, dtype=np.float32) - black) * scale
+    return np.clip(lut, 0, 255, out=lut).round().astype(np.uint8)
+
+
+def percentile_window(sample: np.ndarray, low: float, high: float) -> tuple:
+    """
+    low and high percentiles of sample. Integer samples use a histogram
+    (np.bincount and a cumulative sum) instead of sorting; NaN and inf are
+    left out of float samples. An empty sample (an empty ROI, or only NaN)
+    gives the full range of its dtype, (0.0, 1.0) for floats.
+    """
+    if sample.dtype in LUT_SIZES:
+        if sample.size == 0:
+            return 0, LUT_SIZES[sample.dtype] - 1
+        counts = np.bincount(sample.ravel(), minlength=LUT_SIZES[sample.dtype])
+        cumulative = np.cumsum(counts)
+        total = cumulative[-1]
+        black = int(np.searchsorted(cumulative, total * low / 100.0, side="right"))
+        white = int(np.searchsorted(cumulative, total * high / 100.0, side="left"))
+        return black, max(white, black + 1)
+    if not np.issubdtype(sample.dtype, np.integer):
+        sample = sample[np.isfinite(sample)]
+    if sample.size == 0:
+        return 0.0, 1.0
+    black, white = np.percentile(sample, [low, high])
+    return float(black), float(max(white, black + 1e-6))
+
+
+class DisplayMapper:
+    """
+    Callable converting frames to uint8 for display encoding.
+
+    window=(black, white) fixes the contrast window; window=None enables
+    auto-contrast between the low and high percentiles of every step-th
+    pixel of every step-th row. The auto window only moves when it changed
+    by more than hysteresis (a fraction of its width), which avoids
+    rebuilding the table and flickering on sensor noise.
+
+    The returned array is a buffer owned by the mapper, reused every buffers
+    calls: with the default of one it is overwritten by the next call, so
+    encode it before mapping the next frame, or use as many buffers as
+    frames can be waiting for their encode.
+    """
+
+    def __init__(self, window=None, low_percentile: float = 0.5, high_percentile: float = 99.5,
+                 step: int = 8, hysteresis: float = 0.02, buffers: int = 1):
+        self.fixed_window = tuple(window) if window is not None else None
+        self.low_percentile = low_percentile
+        self.high_percentile = high_percentile
+        self.step = max(1, int(step))
+        self.hysteresis = hysteresis
+        self.buffers = max(1, int(buffers))
+        self.window = self.fixed_window
+        self.lut_builds = 0
+        self._lut = None
+        self._lut_window = None
+        self._outs = []
+        self._next_out = 0
+        self._work = None
+
+    @property
+    def auto_contrast(self) -> bool:
+        return self.fixed_window is None
+
+    def _update_window(self, frame: np.ndarray):
+        new = percentile_window(frame[::self.step, ::self.step], self.low_percentile, self.high_percentile)
+        if self.window is not None:
+            tolerance = self.hysteresis * (self.window[1] - self.window[0])
+            if abs(new[0] - self.window[0]) <= tolerance and abs(new[1] - self.window[1]) <= tolerance:
+                return
+        self.window = new
+
+    def _buffers(self, frame: np.ndarray, work_dtype):
+        if len(self._outs) != self.buffers or self._outs[0].shape != frame.shape:
+            self._outs = [np.empty(frame.shape, dtype=np.uint8) for _ in range(self.buffers)]
+            self._work = None
+        out = self._outs[self._next_out % self.buffers]
+        self._next_out += 1
+        if work_dtype is not None and (self._work is None or self._work.dtype != work_dtype
+                                       or self._work.shape != frame.shape):
+            self._work = np.empty(frame.shape, dtype=work_dtype)
+        return out, self._work
+
+    def __call__(self, frame: np.ndarray) -> np.ndarray:
+        import cv2
+        if self.auto_contrast:
+            self._update_window(frame)
+        elif frame.dtype == np.uint8 and self.window == (0, 255):
+            return frame # Already what the encoder wants
+        black, white = self.window
+        scale = 255.0 / max(white - black, 1e-12)
+        if frame.dtype == np.uint8:
+            out, _ = self._buffers(frame, None)
+            if self._lut_window != self.window:
+                self._lut = build_lut(black, white, LUT_SIZES[frame.dtype])
+                self._lut_window = self.window
+                self.lut_builds += 1
+            return cv2.LUT(frame, self._lut, dst=out)
+        if frame.dtype == np.uint16:
+            out, work = self._buffers(frame, np.uint16)
+            # Saturating subtract clips below black, convertScaleAbs above white
+            cv2.subtract(frame, (float(black),) * 4, dst=work)
+            return cv2.convertScaleAbs(work, out, alpha=scale)
+        # Other types (float, int32...): scale with in-place numpy arithmetic
+        out, work = self._buffers(frame, np.float32)
+        np.subtract(frame, black, out=work, casting="unsafe")
+        np.multiply(work, scale, out=work)
+        np.clip(work, 0, 255, out=work)
+        np.rint(work, out=work)
+        np.copyto(out, work, casting="unsafe")
+        return out
@@ -0,0 +1,126 @@
+# Path: guailit/encoding.py
+# -*- coding: utf-8 -*-
+"""
+Frame encoders for the guailit display path.
+
+Each frame is encoded exactly once, and the encoded bytes are handed to the
+browser as they are. The encoders are interchangeable: JPEG at a chosen
+quality, PNG for lossless inspection, or the raw numpy array for small
+frames. Every EncodedFrame reports its size in bytes and its encode time.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import time
+from collections import namedtuple
+
+import numpy as np
+
+# An encoded frame, ready to be sent to the browser. It is immutable, so the
+# same object can be shared between several viewers.
+EncodedFrame = namedtuple(
+    "EncodedFrame",
+    ["data", "format", "width", "height", "nbytes", "encode_ms", "seq", "timestamp"],
+    defaults=[-1, None],
+)
+
+
+class JpegEncoder:
+    """
+    Encode frames to JPEG with OpenCV at a chosen quality (0-100).
+    """
+
+    format = "JPEG"
+
+    def __init__(self, quality: int = 85):
+        self.quality = int(quality)
+
+    def _encode_bytes(self, frame: np.ndarray):
+        import cv2
+        is_success, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return buffer.tobytes() if is_success else None
+
+    def encode(self, frame: np.ndarray, seq: int = -1, timestamp: float = None) -> EncodedFrame:
+        """
+        Encode a frame. Returns None if the codec fails.
+        """
+        start = time.perf_counter()
+        data = self._encode_bytes(frame)
+        if data is None:
+            return None
+        encode_ms = (time.perf_counter() - start) * 1000.0
+        height, width = frame.shape[:2]
+        return EncodedFrame(data, self.format, width, height, len(data), encode_ms, seq, timestamp)
+
+
+class PngEncoder(JpegEncoder):
+    """
+    Encode frames to lossless PNG with OpenCV.
+
+    compression goes from 0 (fastest, largest) to 9 (slowest, smallest).
+    """
+
+    format = "PNG"
+
+    def __init__(self, compression: int = 1):
+        self.compression = int(compression)
+
+    def _encode_bytes(self, frame: np.ndarray):
+        import cv2
+        is_success, buffer = cv2.imencode(".png", frame, [cv2.IMWRITE_PNG_COMPRESSION, self.compression])
+        return buffer.tobytes() if is_success else None
+
+
+class RawEncoder:
+    """
+    Pass the numpy array through without encoding it.
+
+    Streamlit then does the single encode itself. This is only worth it for
+    small frames, so frames with more than max_pixels pixels are handed to the
+    fallback encoder instead.
+    """
+
+    format = "RAW"
+
+    def __init__(self, max_pixels: int = 640 * 480, fallback=None):
+        self.max_pixels = int(max_pixels)
+        self.fallback = fallback if fallback is not None else JpegEncoder()
+
+    def encode(self, frame: np.ndarray, seq: int = -1, timestamp: float = None) -> EncodedFrame:
+        height, width = frame.shape[:2]
+        if height * width > self.max_pixels:
+            return self.fallback.encode(frame, seq, timestamp)
+        # Keep our own copy, the caller may reuse its buffer
+        start = time.perf_counter()
+        data = np.array(frame, copy=True)
+        data.flags.writeable = False
+        encode_ms = (time.perf_counter() - start) * 1000.0
+        return EncodedFrame(data, self.format, width, height, data.nbytes, encode_ms, seq, timestamp)
+
+
+ENCODERS = {
+    "JPEG": JpegEncoder,
+    "PNG": PngEncoder,
+    "RAW": RawEncoder,
+}
+
+
+def make_encoder(name: str = "JPEG", **kwargs):
+    """
+    Create an encoder by name ("JPEG", "PNG" or "RAW").
+    """
+    try:
+        encoder_class = ENCODERS[name.upper()]
+    except KeyError:
+        raise ValueError(f"Unknown frame encoder: {name}")
+    return encoder_class(**kwargs)
+
+
+def describe_encoded_frame(encoded: EncodedFrame) -> str:
+    """
+    Short human readable summary of the cost of an encoded frame.
+    """
+    return (f"{encoded.format} {encoded.width}x{encoded.height}, "
+            f"{encoded.nbytes / 1024:.1f} kB, {encoded.encode_ms:.1f} ms")
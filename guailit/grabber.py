@@ -0,0 +1,214 @@
+# Path: guailit/grabber.py
+# -*- coding: utf-8 -*-
+"""
+Background frame acquisition for the guailit library.
+
+A FrameGrabber owns a camera instance and keeps pulling frames in a daemon
+thread, independently of the Streamlit script lifecycle. Frames are copied
+into a FrameRingBuffer of preallocated slots, and the UI just reads the
+newest slot.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from guailit.metrics import METRICS
+
+# A frame read back from the ring buffer
+GrabbedFrame = namedtuple("GrabbedFrame", ["seq", "timestamp", "frame"])
+
+
+def frame_from_result(result):
+    """
+    Extract a single frame object from a getFutureFrames() result.
+
+    Depending on the camera backend, getFutureFrames may return a list of
+    frame objects or a single frame object.
+    """
+    if isinstance(result, list):
+        return result[0] if result else None
+    return result
+
+
+class FrameRingBuffer:
+    """
+    Fixed-size ring buffer of preallocated frame slots.
+
+    The slots are allocated on the first write, when the frame shape and dtype
+    are known, and reused for every following frame. Each slot carries a
+    sequence number and an acquisition timestamp. There is a single writer;
+    any number of readers can ask for the newest frame.
+    """
+
+    def __init__(self, size: int = 4):
+        if size < 2:
+            raise ValueError("FrameRingBuffer needs at least 2 slots.")
+        self.size = size
+        self._frames = None
+        self._seqs = np.full(size, -1, dtype=np.int64)
+        self._timestamps = np.zeros(size, dtype=np.float64)
+        self._last_seq = -1
+        self._cond = threading.Condition()
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest frame, -1 if the buffer is empty."""
+        return self._last_seq
+
+    def _allocate(self, frame: np.ndarray):
+        self._frames = np.empty((self.size,) + frame.shape, dtype=frame.dtype)
+        self._seqs[:] = -1
+        self._last_seq = -1
+
+    def write(self, frame: np.ndarray, timestamp: float = None) -> int:
+        """
+        Copy a frame into the next slot and publish it. Returns its sequence number.
+        """
+        frame = np.asarray(frame)
+        if timestamp is None:
+            timestamp = time.time()
+
+        if self._frames is None or self._frames.shape[1:] != frame.shape \
+                or self._frames.dtype != frame.dtype:
+            # First frame, or the camera changed format: (re)allocate the slots
+            with self._cond:
+                self._allocate(frame)
+
+        seq = self._last_seq + 1
+        slot = seq % self.size
+        # The slot being written is never the newest one, so readers holding
+        # the lock on the newest slot are not disturbed by this copy.
+        np.copyto(self._frames[slot], frame)
+
+        with self._cond:
+            self._seqs[slot] = seq
+            self._timestamps[slot] = timestamp
+            self._last_seq = seq
+            self._cond.notify_all()
+        return seq
+
+    def _read_newest(self, copy: bool) -> GrabbedFrame:
+        # Must be called with the lock held
+        seq = self._last_seq
+        if seq < 0:
+            return None
+        slot = seq % self.size
+        frame = self._frames[slot]
+        if copy:
+            frame = frame.copy()
+        return GrabbedFrame(seq, float(self._timestamps[slot]), frame)
+
+    def latest(self, copy: bool = True) -> GrabbedFrame:
+        """
+        Return the newest frame, or None if nothing has been written yet.
+
+        With copy=False the returned array is a view on the slot, which is
+        overwritten after size - 1 further frames.
+        """
+        with self._cond:
+            return self._read_newest(copy)
+
+    def wait_for_newer(self, seq: int, timeout: float = None, copy: bool = True) -> GrabbedFrame:
+        """
+        Wait until a frame newer than seq is available and return the newest one.
+
+        Returns None if no newer frame arrived within timeout seconds.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._last_seq > seq, timeout):
+                return None
+            return self._read_newest(copy)
+
+
+class FrameGrabber:
+    """
+    Continuously acquire frames from a camera instance into a ring buffer.
+
+    The camera instance is the object returned by get_pysilico_camera_sync(),
+    or anything else providing getFutureFrames(n) with frame objects that
+    have a toNumpyArray() method. max_fps (None for no limit) caps the
+    acquisition rate and can be changed while the grabber runs.
+
+    Frame listeners are called from the acquisition thread with
+    (seq, timestamp, frame) for every raw frame as returned by the camera,
+    not the ring copy. They must be quick and must not modify the frame.
+    """
+
+    def __init__(self, camera_instance, buffer_size: int = 4, max_fps: float = None):
+        self.camera_instance = camera_instance
+        self.buffer = FrameRingBuffer(buffer_size)
+        self.max_fps = max_fps
+        self.listeners = []
+        self.error = None
+        self.frames_acquired = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._started_at = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def fps(self) -> float:
+        """Average acquisition rate since the grabber was started."""
+        if not self._started_at or not self.frames_acquired:
+            return 0.0
+        elapsed = time.monotonic() - self._started_at
+        return self.frames_acquired / elapsed if elapsed > 0 else 0.0
+
+    def start(self):
+        """
+        Start the acquisition thread. Does nothing if it is already running.
+        """
+        if self.is_running:
+            return
+        self.error = None
+        self._stop_event.clear()
+        self._started_at = time.monotonic()
+        self.frames_acquired = 0
+        self._thread = threading.Thread(target=self._run, name="guailit-frame-grabber", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """
+        Ask the acquisition thread to stop and wait for it to finish.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _acquire_one(self):
+        with METRICS.timed("acquire"):
+            frame_object = frame_from_result(self.camera_instance.getFutureFrames(1))
+        if not frame_object:
+            return
+        with METRICS.timed("to_numpy"):
+            frame = frame_object.toNumpyArray()
+        timestamp = time.time()
+        with METRICS.timed("ring_write"):
+            seq = self.buffer.write(frame, timestamp)
+        for listener in list(self.listeners):
+            listener(seq, timestamp, frame)
+        self.frames_acquired += 1
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            try:
+                self._acquire_one()
+            except Exception as e:
+                # Keep the error for the UI and stop acquiring
+                self.error = e
+                break
+            max_fps = self.max_fps
+            if max_fps:
+                self._stop_event.wait(max(0.0, 1.0 / max_fps - (time.monotonic() - started)))
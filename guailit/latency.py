@@ -0,0 +1,106 @@
+# Path: guailit/latency.py
+# -*- coding: utf-8 -*-
+"""
+Glass-to-glass latency of the live view for the guailit library.
+
+Frames sent over the WebSocket side channel carry their sequence number
+and acquisition timestamp. The browser acknowledges every frame it paints
+with the time it spent between receiving and painting it. A LatencyTracker
+matches the acknowledgements with the frames sent and estimates
+
+    latency = (send - acquisition) + round trip / 2 + paint delay
+
+using only server clocks for the first two terms, so the browser clock
+does not need to be synchronized. Frames sent but superseded before the
+browser painted them are counted as dropped.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from guailit.metrics import METRICS
+
+
+class LatencyTracker:
+    """
+    Rolling end-to-end latency and displayed frame rate of one viewer.
+
+    The last window painted frames are kept. At most max_in_flight sent
+    frames wait for their acknowledgement; older ones are counted as
+    dropped.
+    """
+
+    def __init__(self, window: int = 256, max_in_flight: int = 64):
+        self.max_in_flight = max_in_flight
+        self.frames_sent = 0
+        self.frames_painted = 0
+        self.frames_dropped = 0
+        self.frames_skipped = 0 # Acquired but never sent, e.g. by the fps cap
+        self._sent = OrderedDict() # seq -> (acquisition time, send time)
+        self._last_sent_seq = None
+        self._painted = deque(maxlen=window) # (paint time, latency)
+        self._lock = threading.Lock()
+
+    def frame_sent(self, seq: int, timestamp: float, sent_at: float = None):
+        """
+        Record that frame seq, acquired at time.time() value timestamp, was sent.
+        """
+        sent_at = time.time() if sent_at is None else sent_at
+        with self._lock:
+            if self._last_sent_seq is not None and seq > self._last_sent_seq + 1:
+                self.frames_skipped += seq - self._last_sent_seq - 1
+            self._last_sent_seq = seq
+            self._sent[seq] = (timestamp, sent_at)
+            self.frames_sent += 1
+            while len(self._sent) > self.max_in_flight:
+                self._sent.popitem(last=False)
+                self.frames_dropped += 1
+
+    def frame_painted(self, seq: int, paint_ms: float, acked_at: float = None):
+        """
+        Record the browser acknowledgement of frame seq, painted paint_ms after
+        it was received. Returns the latency estimate in seconds, None for an
+        unknown frame.
+        """
+        acked_at = time.time() if acked_at is None else acked_at
+        paint_delay = max(0.0, paint_ms / 1000.0)
+        with self._lock:
+            if seq not in self._sent:
+                return None
+            # Frames sent before seq and not painted were superseded in the browser
+            while True:
+                sent_seq, (timestamp, sent_at) = self._sent.popitem(last=False)
+                if sent_seq == seq:
+                    break
+                self.frames_dropped += 1
+            round_trip = max(0.0, acked_at - sent_at - paint_delay)
+            latency = max(0.0, sent_at - timestamp) + round_trip / 2.0 + paint_delay
+            self._painted.append((time.monotonic(), latency))
+            self.frames_painted += 1
+        METRICS.observe("glass_to_glass", latency)
+        return latency
+
+    def summary(self) -> dict:
+        """
+        Rolling latency quantiles and displayed fps over the window, and the totals.
+        """
+        with self._lock:
+            painted = list(self._painted)
+            totals = {"frames_sent": self.frames_sent, "frames_painted": self.frames_painted,
+                      "frames_dropped": self.frames_dropped, "frames_skipped": self.frames_skipped}
+        if not painted:
+            return dict(totals, latency_p50_ms=None, latency_p95_ms=None, displayed_fps=None)
+        times = np.array([t for t, _ in painted])
+        latencies = np.array([latency for _, latency in painted]) * 1000.0
+        span = time.monotonic() - times[0]
+        return dict(totals,
+                    latency_p50_ms=float(np.percentile(latencies, 50)),
+                    latency_p95_ms=float(np.percentile(latencies, 95)),
+                    displayed_fps=(len(painted) - 1) / span if len(painted) > 1 and span > 0 else None)
@@ -0,0 +1,349 @@
+# Path: guailit/live_server.py
+# -*- coding: utf-8 -*-
+"""
+Low-latency live view side channel for the guailit library.
+
+st.image updates go through Streamlit's delta protocol and rebuild the
+element for every frame. LiveStreamServer instead serves the encoded
+frames of a FramePublisher directly to the browser, from a small ASGI app
+run by uvicorn in a daemon thread of the Streamlit process:
+
+    GET /streams/<name>.mjpg    multipart/x-mixed-replace (MJPEG) stream
+    WS  /streams/<name>.ws      one binary message per encoded frame
+
+Both take an optional ?fps= cap. Every frame is tagged with its sequence
+number and acquisition timestamp: MJPEG parts carry X-Frame-Seq and
+X-Frame-Timestamp headers, WebSocket messages start with FRAME_HEADER. On
+the WebSocket, the browser acknowledges the frames it paints; with
+?session=<id> the acknowledgements feed the LatencyTracker of that session.
+The page embeds the stream with mjpeg_html() or websocket_html() while the
+controls stay in Streamlit. There is no authentication: the server listens
+on 127.0.0.1 unless started on another host.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import asyncio
+import html
+import json
+import struct
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, quote
+
+from guailit.latency import LatencyTracker
+
+# Encodings a browser can display directly
+CONTENT_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png"}
+
+BOUNDARY = "guailitframe"
+
+# Prefix of WebSocket frame messages: sequence number, acquisition time.time()
+FRAME_HEADER = struct.Struct("<qd")
+
+
+class LiveStreamServer:
+    """
+    ASGI app streaming the frames of registered FramePublishers.
+
+    Every client gets its own publisher mailbox, so a slow client drops
+    frames without holding back the others. Waiting for a frame blocks a
+    thread, so at most max_clients clients are served at once and the
+    others get a 503.
+    """
+
+    def __init__(self, max_clients: int = 16, default_fps: float = 30.0):
+        self.max_clients = max_clients
+        self.default_fps = default_fps
+        self.host = None
+        self.port = None
+        self.clients = 0
+        self._streams = {} # name -> [publisher, registrations]
+        self._trackers = {} # session id -> LatencyTracker
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_clients, thread_name_prefix="guailit-live-view")
+        self._server = None
+        self._thread = None
+
+    def register(self, publisher) -> str:
+        """
+        Make publisher available to browsers and return its stream name.
+        A publisher registered again keeps its name; it is served until
+        every register() was matched by an unregister().
+        """
+        with self._lock:
+            for name, entry in self._streams.items():
+                if entry[0] is publisher:
+                    entry[1] += 1
+                    return name
+            name = uuid.uuid4().hex
+            self._streams[name] = [publisher, 1]
+            return name
+
+    def unregister(self, name: str):
+        """
+        Undo one register() of stream name. Clients already connected to
+        it keep streaming; new ones get a 404 once it is removed.
+        """
+        with self._lock:
+            entry = self._streams.get(name)
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self._streams[name]
+
+    def latency_tracker(self, session: str) -> LatencyTracker:
+        """
+        LatencyTracker fed by the WebSocket clients of session, created on first use.
+        """
+        with self._lock:
+            if session not in self._trackers:
+                self._trackers[session] = LatencyTracker()
+            return self._trackers[session]
+
+    def url(self, name: str, kind: str = "mjpg", base_url: str = None, fps: float = None,
+            session: str = None) -> str:
+        """
+        URL of stream name, as seen from the browser at base_url. Latency
+        reports of a WebSocket stream go to the tracker of session if given.
+        """
+        if not base_url:
+            host = self.host if self.host not in (None, "0.0.0.0", "::") else "localhost"
+            base_url = f"http://{host}:{self.port}"
+        if kind == "ws":
+            base_url = "ws" + base_url[len("http"):]
+        params = ([f"fps={fps:g}"] if fps else []) + ([f"session={quote(session)}"] if session else [])
+        query = "?" + "&".join(params) if params else ""
+        return f"{base_url.rstrip('/')}/streams/{name}.{kind}{query}"
+
+    def start(self, host: str = "127.0.0.1", port: int = 8765):
+        """
+        Serve on host:port from a daemon thread. Returns self.
+        """
+        import uvicorn # Only needed when the side channel is used
+
+        self.host, self.port = host, port
+        config = uvicorn.Config(self, host=host, port=port, log_level="warning", lifespan="off")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, name="guailit-live-server", daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 5.0
+        while not self._server.started and self._thread.is_alive() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        if not self._server.started:
+            raise OSError(f"Live view server could not listen on {host}:{port}.")
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join(timeout)
+            self._server = None
+
+    # --- ASGI ---
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return
+        path = scope["path"]
+        name, _, kind = path[len("/streams/"):].rpartition(".")
+        entry = self._streams.get(name) if path.startswith("/streams/") else None
+        publisher = entry[0] if entry is not None else None
+        if publisher is None or kind not in ("mjpg", "ws"):
+            await self._refuse(scope, send, 404)
+            return
+        if CONTENT_TYPES.get(getattr(publisher.encoder, "format", None)) is None:
+            # RAW frames cannot be shown by the browser
+            await self._refuse(scope, send, 415)
+            return
+        with self._lock:
+            busy = self.clients >= self.max_clients
+            if not busy:
+                self.clients += 1
+        if busy:
+            await self._refuse(scope, send, 503)
+            return
+        try:
+            loop = asyncio.get_running_loop()
+            try:
+                mailbox = await loop.run_in_executor(
+                    self._executor, publisher.subscribe, self._requested_fps(scope))
+            except ConnectionError:
+                await self._refuse(scope, send, 503)
+                return
+            try:
+                if scope["type"] == "websocket":
+                    await self._serve_websocket(publisher, mailbox, receive, send, self._session_tracker(scope))
+                else:
+                    await self._serve_mjpeg(publisher, mailbox, receive, send)
+            finally:
+                publisher.unsubscribe(mailbox)
+        finally:
+            with self._lock:
+                self.clients -= 1
+
+    @staticmethod
+    def _query(scope) -> dict:
+        return parse_qs(scope.get("query_string", b"").decode("latin-1"))
+
+    def _requested_fps(self, scope) -> float:
+        try:
+            return float(self._query(scope)["fps"][0])
+        except (KeyError, ValueError):
+            return self.default_fps
+
+    def _session_tracker(self, scope):
+        session = self._query(scope).get("session")
+        return self.latency_tracker(session[0]) if session else None
+
+    async def _refuse(self, scope, send, status: int):
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": 1008 if status != 503 else 1013})
+            return
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": f"{status}\n".encode()})
+
+    async def _frames(self, publisher, mailbox, disconnected: asyncio.Event):
+        """
+        Yield encoded frames for one client until it goes away.
+        """
+        loop = asyncio.get_running_loop()
+        while not disconnected.is_set():
+            if publisher.error is not None or not publisher.is_subscribed(mailbox):
+                return
+            encoded = await loop.run_in_executor(self._executor, mailbox.get, 0.5)
+            if encoded is not None:
+                yield encoded
+
+    @staticmethod
+    def _watch_disconnect(receive, disconnect_type: str, on_message=None):
+        """
+        Event set when the client disconnects, and the task watching for it.
+        Other messages are handed to on_message if given.
+        """
+        disconnected = asyncio.Event()
+
+        async def watch():
+            while (message := await receive())["type"] != disconnect_type:
+                if on_message is not None:
+                    on_message(message)
+            disconnected.set()
+
+        return disconnected, asyncio.ensure_future(watch())
+
+    async def _serve_mjpeg(self, publisher, mailbox, receive, send):
+        disconnected, watcher = self._watch_disconnect(receive, "http.disconnect")
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", f"multipart/x-mixed-replace; boundary={BOUNDARY}".encode()),
+            (b"cache-control", b"no-cache, no-store"),
+        ]})
+        try:
+            async for encoded in self._frames(publisher, mailbox, disconnected):
+                header = (f"--{BOUNDARY}\r\nContent-Type: {CONTENT_TYPES[encoded.format]}\r\n"
+                          f"Content-Length: {encoded.nbytes}\r\nX-Frame-Seq: {encoded.seq}\r\n"
+                          f"X-Frame-Timestamp: {encoded.timestamp or 0.0:.6f}\r\n\r\n").encode()
+                await send({"type": "http.response.body", "body": header + encoded.data + b"\r\n",
+                            "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        except OSError:
+            pass # Client went away in the middle of a frame
+        finally:
+            watcher.cancel()
+
+    async def _serve_websocket(self, publisher, mailbox, receive, send, tracker=None):
+        if (await receive())["type"] != "websocket.connect":
+            return
+        await send({"type": "websocket.accept"})
+
+        def acknowledged(message):
+            # {"seq": ..., "paint_ms": ...} for every frame the browser painted
+            if tracker is None or not message.get("text"):
+                return
+            try:
+                ack = json.loads(message["text"])
+                tracker.frame_painted(int(ack["seq"]), float(ack["paint_ms"]))
+            except (ValueError, KeyError, TypeError):
+                pass # Malformed reports are ignored
+
+        disconnected, watcher = self._watch_disconnect(receive, "websocket.disconnect", acknowledged)
+        try:
+            async for encoded in self._frames(publisher, mailbox, disconnected):
+                timestamp = encoded.timestamp or 0.0
+                if tracker is not None:
+                    tracker.frame_sent(encoded.seq, timestamp)
+                await send({"type": "websocket.send",
+                            "bytes": FRAME_HEADER.pack(encoded.seq, timestamp) + encoded.data})
+            if not disconnected.is_set():
+                await send({"type": "websocket.close", "code": 1011})
+        except OSError:
+            pass
+        finally:
+            watcher.cancel()
+
+
+def _script_string(value: str) -> str:
+    # JSON string literal that cannot end the <script> element it is embedded in
+    return json.dumps(value).replace("<", "\\u003c").replace(">", "\\u003e").replace("/", "\\/")
+
+
+def mjpeg_html(url: str, width: int = None) -> str:
+    """
+    HTML showing the MJPEG stream at url, to embed with st.components.v1.html.
+    """
+    style = f"width:{width}px;max-width:100%" if width else "max-width:100%"
+    return f'<img src="{html.escape(url)}" style="{style}" alt="Live view">'
+
+
+def websocket_html(url: str, content_type: str = "image/jpeg", width: int = None) -> str:
+    """
+    HTML showing the WebSocket stream at url. Only the newest frame is
+    decoded once the previous one is shown, and every painted frame is
+    acknowledged with its paint delay. The browser reconnects on errors.
+    """
+    style = f"width:{width}px;max-width:100%" if width else "max-width:100%"
+    return f"""<img id="live" style="{style}" alt="Live view">
+<script>
+const img = document.getElementById("live");
+let shown = null, pending = null, decoding = false;
+function show(socket) {{
+  const frame = pending;
+  pending = null;
+  decoding = true;
+  const next = URL.createObjectURL(frame.blob);
+  const done = () => {{
+    if (shown) URL.revokeObjectURL(shown);
+    shown = next;
+    decoding = false;
+    if (pending) show(socket);
+  }};
+  img.onload = () => {{
+    // The callback of the second animation frame runs once this one was painted
+    requestAnimationFrame(() => requestAnimationFrame(() => {{
+      if (socket.readyState === WebSocket.OPEN) {{
+        socket.send(JSON.stringify({{seq: frame.seq, paint_ms: performance.now() - frame.received}}));
+      }}
+    }}));
+    done();
+  }};
+  img.onerror = done;
+  img.src = next;
+}}
+function connect() {{
+  const socket = new WebSocket({_script_string(url)});
+  socket.binaryType = "arraybuffer";
+  socket.onmessage = (event) => {{
+    const header = new DataView(event.data, 0, {FRAME_HEADER.size});
+    // A frame still waiting for the decoder is superseded
+    pending = {{seq: Number(header.getBigInt64(0, true)), received: performance.now(),
+               blob: new Blob([event.data.slice({FRAME_HEADER.size})], {{type: {_script_string(content_type)}}})}};
+    if (!decoding) show(socket);
+  }};
+  socket.onclose = () => setTimeout(connect, 1000);
+}}
+connect();
+</script>"""
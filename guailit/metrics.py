@@ -0,0 +1,175 @@
+# Path: guailit/metrics.py
+# -*- coding: utf-8 -*-
+"""
+Per-stage timing metrics for the guailit frame path and motor commands.
+
+Timings go into fixed-bucket histograms: recording one sample is a
+perf_counter() pair, a bisect and an increment, which is well below 1% of
+a frame time. The histograms can be shown in the app sidebar, written to a
+Prometheus text file or served on a local HTTP endpoint.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds, from 50 us to 10 s
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Cumulative-friendly histogram of durations in seconds.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # Last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate the q quantile (0-1) by interpolating inside its bucket.
+        """
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if total == 0:
+            return None
+        rank = q * total
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": self.sum / self.count * 1000.0 if self.count else None,
+            "p50_ms": _to_ms(self.quantile(0.5)),
+            "p99_ms": _to_ms(self.quantile(0.99)),
+        }
+
+
+def _to_ms(seconds):
+    return seconds * 1000.0 if seconds is not None else None
+
+
+class MetricsRegistry:
+    """
+    Named stage histograms, exported as one Prometheus histogram family
+    with a "stage" label.
+    """
+
+    def __init__(self, name: str = "guailit_stage_seconds",
+                 help_text: str = "Time spent in each guailit pipeline stage."):
+        self.name = name
+        self.help_text = help_text
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str) -> Histogram:
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, Histogram())
+        return histogram
+
+    def observe(self, stage: str, seconds: float):
+        self.histogram(stage).observe(seconds)
+
+    @contextmanager
+    def timed(self, stage: str):
+        """
+        Time the enclosed block into the histogram of stage, even if it raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(stage).observe(time.perf_counter() - start)
+
+    def summary(self) -> dict:
+        return {stage: histogram.summary() for stage, histogram in sorted(self._histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+    def to_prometheus(self) -> str:
+        """
+        Render all histograms in the Prometheus text exposition format.
+        """
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for stage, histogram in sorted(self._histograms.items()):
+            with histogram._lock:
+                counts = list(histogram.counts)
+                total, total_sum = histogram.count, histogram.sum
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{stage="{stage}",le="+Inf"}} {total}')
+            lines.append(f'{self.name}_sum{{stage="{stage}"}} {total_sum:.9f}')
+            lines.append(f'{self.name}_count{{stage="{stage}"}} {total}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus_file(self, path: str):
+        """
+        Write the metrics atomically, e.g. for the node_exporter textfile collector.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+# Process-wide registry used by the grabber, the publisher and the app
+METRICS = MetricsRegistry()
+
+
+def start_metrics_server(port: int = 9108, host: str = "127.0.0.1", registry: MetricsRegistry = METRICS):
+    """
+    Serve registry on http://host:port/metrics from a daemon thread.
+
+    Returns the server; call shutdown() on it to stop serving.
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass # Keep scrapes out of the Streamlit console
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="guailit-metrics-server", daemon=True).start()
+    return server
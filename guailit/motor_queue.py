@@ -0,0 +1,215 @@
+# Path: guailit/motor_queue.py
+# -*- coding: utf-8 -*-
+"""
+Debounced, coalescing command queue in front of fastlabio.motor.
+
+Move and speed commands are sent by a single background thread. While a
+command waits to be sent, a newer command of the same kind replaces it, so
+only the operator's latest intent reaches the motor server. Position reads
+are served from a short-lived cache. Every call returns a
+concurrent.futures.Future instead of blocking the Streamlit script.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import threading
+import time
+from concurrent.futures import Future
+
+from guailit.metrics import METRICS
+
+
+def describe_command(future: Future) -> str:
+    """
+    Short status of a command future for display.
+    """
+    if future.cancelled():
+        return "superseded by a newer command"
+    if not future.done():
+        return "running" if future.running() else "queued"
+    error = future.exception()
+    return f"failed: {error}" if error is not None else "done"
+
+
+def _closed_error() -> RuntimeError:
+    return RuntimeError("Motor command queue is closed.")
+
+
+def _follow(shared: Future) -> Future:
+    # Future of one caller of a shared command: cancelling it (e.g. on a
+    # caller's timeout) leaves the shared future and its other callers alone
+    future = Future()
+
+    def copy(done: Future):
+        if done.cancelled():
+            future.cancel()
+        elif future.set_running_or_notify_cancel():
+            error = done.exception()
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(done.result())
+
+    shared.add_done_callback(copy)
+    return future
+
+
+def _refused() -> Future:
+    # Future of a command submitted after close()
+    future = Future()
+    future.set_exception(_closed_error())
+    return future
+
+
+class MotorCommandQueue:
+    """
+    Asynchronous, coalescing queue of motor commands.
+
+    get_motor() returns the object implementing the fastlabio.motor API; it
+    is looked up for every command. Commands are sent debounce seconds
+    after the last submission, so rapid nudges collapse into one command.
+    Superseded futures are cancelled. Position reads younger than
+    position_ttl seconds are answered from the cache, and concurrent reads
+    share a single round trip. close() ends the worker thread.
+    """
+
+    def __init__(self, get_motor, position_ttl: float = 0.2, debounce: float = 0.05):
+        self._get_motor = get_motor
+        self.position_ttl = position_ttl
+        self.debounce = debounce
+        self.commands_sent = 0
+        self.commands_superseded = 0
+        self._pending_move = None # (position, future)
+        self._pending_speed = None # (speed, future)
+        self._pending_read = None # future
+        self._last_submit = 0.0
+        self._cached_position = None # (monotonic time, position)
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="guailit-motor-queue", daemon=True)
+        self._thread.start()
+
+    def _replace(self, pending, value):
+        # Must be called with the lock held
+        if pending is not None and pending[1].cancel():
+            self.commands_superseded += 1
+        future = Future()
+        self._last_submit = time.monotonic()
+        self._cond.notify()
+        return value, future
+
+    def move(self, position: float) -> Future:
+        """
+        Queue a move to position, replacing any move that was not sent yet.
+        """
+        with self._cond:
+            if self._closed:
+                return _refused()
+            self._pending_move = self._replace(self._pending_move, position)
+            return self._pending_move[1]
+
+    def set_speed(self, speed: float) -> Future:
+        """
+        Queue a speed change, replacing any speed change that was not sent yet.
+        """
+        with self._cond:
+            if self._closed:
+                return _refused()
+            self._pending_speed = self._replace(self._pending_speed, speed)
+            return self._pending_speed[1]
+
+    def get_position(self, max_age: float = None) -> Future:
+        """
+        Motor position, from the cache if it is younger than max_age seconds
+        (position_ttl by default). Concurrent callers share one read, but each
+        gets its own future, which it may cancel.
+        """
+        max_age = self.position_ttl if max_age is None else max_age
+        with self._cond:
+            cached = self._cached_position
+            if cached is not None and time.monotonic() - cached[0] <= max_age:
+                future = Future()
+                future.set_result(cached[1])
+                return future
+            if self._closed:
+                return _refused()
+            if self._pending_read is None:
+                self._pending_read = Future()
+                self._cond.notify()
+            return _follow(self._pending_read)
+
+    def update_position(self, position: float, timestamp: float = None):
+        """
+        Feed the position cache from another source, e.g. the telemetry poller.
+        """
+        with self._cond:
+            self._cached_position = (time.monotonic() if timestamp is None else timestamp, position)
+
+    def close(self, timeout: float = 2.0):
+        """
+        Stop the worker thread. Commands not sent yet, and any submitted
+        later, fail with RuntimeError.
+        """
+        with self._cond:
+            self._closed = True
+            pending = [self._pending_speed and self._pending_speed[1],
+                       self._pending_move and self._pending_move[1], self._pending_read]
+            self._pending_speed = self._pending_move = self._pending_read = None
+            self._cond.notify_all()
+        for future in pending:
+            if future is not None and future.set_running_or_notify_cancel():
+                future.set_exception(_closed_error())
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    @property
+    def pending(self) -> bool:
+        return any(p is not None for p in (self._pending_move, self._pending_speed, self._pending_read))
+
+    def _send(self, future: Future, stage: str, command, *args):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            with METRICS.timed(stage):
+                result = command(*args)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            self.commands_sent += 1
+            future.set_result(result)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self.pending or self._closed)
+                writes = self._pending_move is not None or self._pending_speed is not None
+                # Let quick successive commands coalesce before sending them
+                while writes and not self._closed and time.monotonic() - self._last_submit < self.debounce:
+                    self._cond.wait(self.debounce - (time.monotonic() - self._last_submit))
+                if self._closed:
+                    return # close() failed whatever was pending
+                speed, self._pending_speed = self._pending_speed, None
+                move, self._pending_move = self._pending_move, None
+                read, self._pending_read = self._pending_read, None
+
+            try:
+                motor = self._get_motor()
+            except Exception as e:
+                # Fail this batch and keep serving: later commands retry the connection
+                for future in (speed and speed[1], move and move[1], read):
+                    if future is not None and future.set_running_or_notify_cancel():
+                        future.set_exception(e)
+                continue
+            # Speed first, so that it applies to the queued move
+            if speed is not None:
+                self._send(speed[1], "motor_set_speed", motor.set_motor_speed, speed[0])
+            if move is not None:
+                with self._cond:
+                    self._cached_position = None # The motor is about to move
+                self._send(move[1], "motor_move", motor.move_motor, move[0])
+            if read is not None:
+                self._send(read, "motor_get_position", motor.get_motor_position)
+                if not read.cancelled() and read.exception() is None:
+                    self.update_position(read.result())
@@ -0,0 +1,116 @@
+# Path: guailit/parallel_encode.py
+# -*- coding: utf-8 -*-
+"""
+Frame-parallel encoding for the guailit library.
+
+On large sensors a single JPEG encode can take longer than the frame
+interval, which caps the stream at what one core can encode. A
+ParallelEncoder encodes consecutive frames concurrently on a pool of worker
+threads and delivers the results in frame order. OpenCV releases the GIL
+while it encodes, so threads use as many cores as there are workers, and
+unlike worker processes they take the frames by reference, without copying
+or pickling them.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from guailit.metrics import METRICS
+
+
+def default_encode_workers() -> int:
+    """
+    Number of encode workers to use by default: one per core, up to 8.
+    """
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+class ParallelEncoder:
+    """
+    Encode frames with encoder on workers threads.
+
+    on_encoded(encoded) is called for every encoded frame in submission
+    order, from a worker thread, as soon as the frame and all the frames
+    submitted before it are done; frames the encoder returned None for are
+    skipped. At most workers frames are in flight, so a frame waits for at
+    most workers - 1 others. Frames must not be modified until delivered.
+    An encoder exception is kept in error and its frame skipped.
+    """
+
+    def __init__(self, encoder, on_encoded, workers: int = None):
+        self.encoder = encoder
+        self.on_encoded = on_encoded
+        self.workers = max(1, int(workers or default_encode_workers()))
+        self.error = None
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="guailit-encode")
+        self._pending = deque()
+        self._cond = threading.Condition()
+
+    @property
+    def format(self) -> str:
+        return self.encoder.format
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    def _encode(self, frame, seq: int, timestamp: float):
+        with METRICS.timed("encode"):
+            return self.encoder.encode(frame, seq, timestamp)
+
+    def _deliver(self, _future=None):
+        # Runs in the worker that finished a frame: deliver every frame at
+        # the head of the queue that is done, holding the lock to keep the order
+        with self._cond:
+            while self._pending and self._pending[0].done():
+                future = self._pending.popleft()
+                self._cond.notify_all()
+                if future.cancelled():
+                    continue
+                try:
+                    encoded = future.result()
+                except Exception as e:
+                    self.error = e
+                    continue
+                if encoded is not None:
+                    self.on_encoded(encoded)
+
+    def wait_for_slot(self, timeout: float = None) -> bool:
+        """
+        Wait until fewer than workers frames are in flight. False on timeout.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: len(self._pending) < self.workers, timeout)
+
+    def submit(self, frame, seq: int = -1, timestamp: float = None):
+        """
+        Start encoding frame. Call wait_for_slot() first: raises RuntimeError
+        if workers frames are already in flight.
+        """
+        with self._cond:
+            if len(self._pending) >= self.workers:
+                raise RuntimeError(f"{self.workers} frames already being encoded.")
+            future = self._executor.submit(self._encode, frame, seq, timestamp)
+            self._pending.append(future)
+        future.add_done_callback(self._deliver)
+        return future
+
+    def cancel(self):
+        """
+        Drop the frames not being encoded yet, e.g. when the stream stops.
+        """
+        with self._cond:
+            pending = list(self._pending)
+        for future in pending:
+            future.cancel()
+        self._deliver()
+
+    def close(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,90 @@
+# Path: guailit/preprocess.py
+# -*- coding: utf-8 -*-
+"""
+Frame preprocessing before display encoding.
+
+The live view never needs the full sensor resolution, so frames are cropped
+to a region of interest, binned and downscaled to the display width before
+they are encoded. Single-frame capture and recording keep full resolution.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import numpy as np
+
+
+def crop_roi(frame: np.ndarray, roi) -> np.ndarray:
+    """
+    Crop a frame to roi = (x, y, width, height). Returns a view, not a copy.
+
+    A width or height of 0 extends the region to the frame edge, and roi=None
+    keeps the whole frame.
+    """
+    if roi is None:
+        return frame
+    x, y, width, height = (int(v) for v in roi)
+    x_end = x + width if width > 0 else None
+    y_end = y + height if height > 0 else None
+    cropped = frame[y:y_end, x:x_end]
+    if cropped.size == 0:
+        raise ValueError(f"ROI {roi} is outside the {frame.shape[1]}x{frame.shape[0]} frame.")
+    return cropped
+
+
+def bin_frame(frame: np.ndarray, factor: int) -> np.ndarray:
+    """
+    Average factor x factor pixel blocks with a vectorized reshape-mean.
+
+    Rows and columns that do not fill a whole block are dropped. The result
+    keeps the dtype of the input frame.
+    """
+    factor = int(factor)
+    if factor <= 1:
+        return frame
+    height = frame.shape[0] // factor * factor
+    width = frame.shape[1] // factor * factor
+    if height == 0 or width == 0:
+        raise ValueError(f"Binning factor {factor} is larger than the frame.")
+    blocks = frame[:height, :width].reshape(
+        (height // factor, factor, width // factor, factor) + frame.shape[2:])
+    return blocks.mean(axis=(1, 3), dtype=np.float32).astype(frame.dtype)
+
+
+def downscale_to_width(frame: np.ndarray, width: int) -> np.ndarray:
+    """
+    Shrink a frame to the given width, keeping its aspect ratio.
+
+    Frames that are already narrow enough, or width=0, are returned as is.
+    """
+    width = int(width)
+    if width <= 0 or frame.shape[1] <= width:
+        return frame
+    import cv2
+    height = max(1, round(frame.shape[0] * width / frame.shape[1]))
+    # INTER_AREA averages the source pixels, which avoids aliasing when shrinking
+    return cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+
+
+class FramePreprocessor:
+    """
+    ROI crop, binning and downscaling to a display width, in that order.
+
+    roi is (x, y, width, height) or None, binning an integer factor and
+    display_width the target width in pixels (0 to keep the binned size).
+    """
+
+    def __init__(self, roi=None, binning: int = 1, display_width: int = 0):
+        self.roi = tuple(roi) if roi is not None else None
+        self.binning = int(binning)
+        self.display_width = int(display_width)
+
+    @property
+    def is_identity(self) -> bool:
+        return self.roi is None and self.binning <= 1 and self.display_width <= 0
+
+    def __call__(self, frame: np.ndarray) -> np.ndarray:
+        frame = crop_roi(frame, self.roi)
+        frame = bin_frame(frame, self.binning)
+        return downscale_to_width(frame, self.display_width)
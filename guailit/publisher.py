@@ -0,0 +1,360 @@
+# Path: guailit/publisher.py
+# -*- coding: utf-8 -*-
+"""
+Encode-once frame fan-out for the guailit library.
+
+A FramePublisher acquires frames from one camera with a FrameGrabber, encodes
+each frame a single time and hands the same immutable EncodedFrame to every
+subscribed session. Each subscriber has its own FrameMailbox that only keeps
+the newest frame, so a slow viewer drops frames without holding back the
+others.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import threading
+import time
+
+from guailit.averaging import FrameAverager
+from guailit.change_detect import ChangeDetector
+from guailit.display_map import DisplayMapper
+from guailit.encoding import make_encoder
+from guailit.grabber import FrameGrabber
+from guailit.metrics import METRICS
+from guailit.parallel_encode import ParallelEncoder
+from guailit.preprocess import FramePreprocessor
+
+
+class FrameMailbox:
+    """
+    Latest-frame-wins mailbox for one subscriber.
+
+    put() replaces any frame that was not read yet and counts it as dropped.
+    max_fps is the highest rate this subscriber wants (None for no limit).
+    """
+
+    def __init__(self, max_fps: float = None, demand: threading.Event = None):
+        self._frame = None
+        self._unread = False
+        self._cond = threading.Condition()
+        self._demand = demand
+        self.max_fps = max_fps
+        self.delivered = 0
+        self.dropped = 0
+        self.last_read = time.monotonic()
+
+    def put(self, frame):
+        with self._cond:
+            if self._unread:
+                self.dropped += 1
+            self._frame = frame
+            self._unread = True
+            self._cond.notify_all()
+
+    def get(self, timeout: float = None):
+        """
+        Wait for a frame that was not read yet. Returns None on timeout.
+        """
+        with self._cond:
+            self.last_read = time.monotonic()
+            if not self._unread and self._demand is not None:
+                # Tell the publisher this subscriber is ready for a frame
+                self._demand.set()
+            if not self._cond.wait_for(lambda: self._unread, timeout):
+                return None
+            self._unread = False
+            self.delivered += 1
+            return self._frame
+
+
+class FramePublisher:
+    """
+    Acquire, encode once and fan out frames from one camera.
+
+    The camera handle is leased from a DevicePool when the first session
+    subscribes. Acquisition stops, and the handle goes back to the pool, once
+    nobody has been subscribed for idle_timeout seconds. Mailboxes that were
+    not read for stale_after seconds (for example a closed browser tab) are
+    unsubscribed automatically. If given, preprocess(frame) runs before
+    encoding, e.g. a FramePreprocessor shrinking frames to the display size.
+
+    Frames are only encoded when at least one subscriber is waiting for
+    one, and acquisition is capped at the highest max_fps asked for by the
+    subscribers, so nothing is produced that no viewer can take.
+
+    Frame listeners (see FrameGrabber) receive every raw frame at full
+    resolution and bit depth, e.g. for recording. While any listener is
+    registered the publisher keeps running and acquires at full rate.
+
+    If given, change_detector (a ChangeDetector) skips the preprocessing,
+    encoding and delivery of frames that look like the last one sent, and
+    display_map(frame) (e.g. a DisplayMapper) converts the preprocessed
+    frame to 8 bits right before encoding. With an averager (a
+    FrameAverager), every acquired frame is added to the running average,
+    and the average is shown instead of the newest frame.
+
+    With encode_workers > 1, consecutive frames are encoded in parallel by
+    a ParallelEncoder and still published in order; at most encode_workers
+    frames are being encoded at any time.
+    """
+
+    def __init__(self, camera_pool, encoder, preprocess=None, idle_timeout: float = 5.0,
+                 stale_after: float = 30.0, change_detector=None, display_map=None, averager=None,
+                 encode_workers: int = 1):
+        self.camera_pool = camera_pool
+        self.encoder = encoder
+        self.preprocess = preprocess
+        self.change_detector = change_detector
+        self.display_map = display_map
+        self.averager = averager
+        self.encode_workers = max(1, int(encode_workers))
+        self._parallel = None
+        if self.encode_workers > 1:
+            self._parallel = ParallelEncoder(encoder, self._publish_in_order, self.encode_workers)
+            if isinstance(display_map, DisplayMapper):
+                # A mapped frame must stay intact while the next ones are mapped
+                display_map.buffers = max(display_map.buffers, self.encode_workers + 1)
+        self.idle_timeout = idle_timeout
+        self.stale_after = stale_after
+        self.error = None
+        self.latest = None
+        self.frames_encoded = 0
+        self._mailboxes = set()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._camera_instance = None
+        self._grabber = None
+        self._thread = None
+        self._active = False
+        self._stop_event = threading.Event()
+        self._demand = threading.Event()
+        self._idle_since = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._active
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._mailboxes)
+
+    @property
+    def frames_acquired(self) -> int:
+        """Frames acquired by the camera grabber since acquisition started."""
+        grabber = self._grabber
+        return grabber.frames_acquired if grabber is not None else 0
+
+    def raw_snapshot(self):
+        """
+        Copy of the newest raw frame as a GrabbedFrame, None if the camera is
+        not being read or gave no frame yet. Does not start acquisition.
+        """
+        grabber = self._grabber
+        return grabber.buffer.latest() if grabber is not None else None
+
+    def subscribe(self, max_fps: float = None) -> FrameMailbox:
+        """
+        Register a new viewer, starting acquisition if needed.
+
+        Raises ConnectionError if the camera cannot be leased.
+        """
+        mailbox = FrameMailbox(max_fps, self._demand)
+        with self._lock:
+            if not self.is_running:
+                self._start()
+            self._mailboxes.add(mailbox)
+            self._idle_since = None
+        if self.latest is not None:
+            # Show something right away instead of waiting for the next frame
+            mailbox.put(self.latest)
+        return mailbox
+
+    def add_frame_listener(self, listener, keeps_frames: bool = False):
+        """
+        Register a raw frame listener, starting acquisition if needed.
+        Frames are never reused here, so keeps_frames changes nothing; it
+        matches ProcessFramePublisher.add_frame_listener().
+
+        Raises ConnectionError if the camera cannot be leased.
+        """
+        with self._lock:
+            if not self.is_running:
+                self._start()
+            self._listeners.append(listener)
+            self._grabber.listeners.append(listener)
+            self._idle_since = None
+
+    def remove_frame_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+            if self._grabber is not None and listener in self._grabber.listeners:
+                self._grabber.listeners.remove(listener)
+
+    def is_subscribed(self, mailbox: FrameMailbox) -> bool:
+        return mailbox in self._mailboxes
+
+    def unsubscribe(self, mailbox: FrameMailbox):
+        with self._lock:
+            self._mailboxes.discard(mailbox)
+            if not self._mailboxes:
+                self._idle_since = time.monotonic()
+
+    def stop(self, timeout: float = 2.0):
+        """
+        Stop acquisition immediately, whatever the number of subscribers.
+        """
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _start(self):
+        # Must be called with the lock held
+        self.error = None
+        self.latest = None
+        if self.change_detector is not None:
+            self.change_detector.reset()
+        self._camera_instance = self.camera_pool.acquire()
+        self._grabber = FrameGrabber(self._camera_instance)
+        self._grabber.listeners.extend(self._listeners)
+        if self.averager is not None:
+            # Not one of self._listeners: averaging alone must not keep the camera busy
+            self.averager.reset()
+            self._grabber.listeners.append(self.averager)
+        self._grabber.start()
+        self._stop_event.clear()
+        self._active = True
+        self._thread = threading.Thread(target=self._run, name="guailit-frame-publisher", daemon=True)
+        self._thread.start()
+
+    def _shutdown(self):
+        # Must be called with the lock held
+        self._grabber.stop()
+        self.camera_pool.release(self._camera_instance, broken=self.error is not None)
+        self._grabber = None
+        self._camera_instance = None
+        self._active = False
+
+    def _should_stop(self) -> bool:
+        # Must be called with the lock held
+        if self._stop_event.is_set() or self.error is not None:
+            return True
+        now = time.monotonic()
+        for mailbox in [m for m in self._mailboxes if now - m.last_read > self.stale_after]:
+            self._mailboxes.discard(mailbox)
+        if self._listeners:
+            # Recording and other raw listeners need every frame
+            self._idle_since = None
+            self._grabber.max_fps = None
+            return False
+        if self._mailboxes:
+            self._idle_since = None
+            rates = [m.max_fps for m in self._mailboxes]
+            # The average must include every frame, not just the ones shown
+            self._grabber.max_fps = None if None in rates or self.averager is not None else max(rates)
+            return False
+        if self._idle_since is None:
+            self._idle_since = now
+        return now - self._idle_since > self.idle_timeout
+
+    def _publish(self, encoded):
+        self.latest = encoded
+        self.frames_encoded += 1
+        with self._lock:
+            mailboxes = list(self._mailboxes)
+        for mailbox in mailboxes:
+            mailbox.put(encoded)
+
+    def _publish_in_order(self, encoded):
+        # Called by the parallel encoder; clear the demand before the put, so
+        # that a subscriber asking for its next frame right away sets it again
+        self._demand.clear()
+        self._publish(encoded)
+
+    def _run(self):
+        grabber = self._grabber
+        parallel = self._parallel
+        last_seq = -1
+        while True:
+            with self._lock:
+                if grabber.error is not None:
+                    self.error = grabber.error
+                if parallel is not None and parallel.error is not None:
+                    self.error = parallel.error
+                stop = self._should_stop()
+                if stop:
+                    self._shutdown()
+            if stop:
+                if parallel is not None:
+                    parallel.cancel() # Not under the lock: delivering a frame takes it
+                return
+            try:
+                # Backpressure: wait until a subscriber can take a frame
+                if not self._demand.wait(0.5):
+                    continue
+                if parallel is not None and not parallel.wait_for_slot(0.5):
+                    continue
+                grabbed = grabber.buffer.wait_for_newer(last_seq, 0.5)
+                if grabbed is None:
+                    continue
+                last_seq = grabbed.seq
+                if self.change_detector is not None:
+                    with METRICS.timed("change_detect"):
+                        changed = self.change_detector.should_send(grabbed.frame)
+                    if not changed:
+                        # Subscribers are still waiting: keep the demand set
+                        continue
+                if parallel is None:
+                    self._demand.clear()
+                # Otherwise keep taking new frames while subscribers wait, up
+                # to encode_workers of them; publishing clears the demand
+                frame = grabbed.frame
+                if self.averager is not None:
+                    frame = self.averager.mean()
+                    if frame is None:
+                        frame = grabbed.frame
+                if self.preprocess is not None:
+                    with METRICS.timed("preprocess"):
+                        frame = self.preprocess(frame)
+                if self.display_map is not None:
+                    with METRICS.timed("display_map"):
+                        frame = self.display_map(frame)
+                if parallel is not None:
+                    if self.averager is not None and self.display_map is None:
+                        frame = frame.copy() # The averager reuses its buffer
+                    parallel.submit(frame, grabbed.seq, grabbed.timestamp)
+                    continue
+                with METRICS.timed("encode"):
+                    encoded = self.encoder.encode(frame, grabbed.seq, grabbed.timestamp)
+                if encoded is not None:
+                    self._publish(encoded)
+            except Exception as e:
+                self.error = e
+
+
+def build_frame_publisher(camera_pool, encoder_name: str = "JPEG", jpeg_quality: int = 85, roi=None,
+                          binning: int = 1, display_width: int = 0, change_threshold: float = None,
+                          contrast_window=None, averaging=None, encode_workers: int = 1) -> FramePublisher:
+    """
+    FramePublisher for one set of display settings, as chosen in the UI.
+
+    With a change_threshold, frames that barely differ from the last one
+    sent are skipped (see ChangeDetector). Frames are mapped to 8 bits with
+    contrast_window, or with auto-contrast when it is None. averaging is
+    None, ("mean", window) or ("ema", window, alpha) (see FrameAverager).
+    encode_workers frames are encoded in parallel (see ParallelEncoder).
+    """
+    if encoder_name == "JPEG":
+        encoder = make_encoder("JPEG", quality=jpeg_quality)
+    else:
+        encoder = make_encoder(encoder_name)
+    preprocessor = FramePreprocessor(roi, binning, display_width)
+    change_detector = ChangeDetector(threshold=change_threshold) if change_threshold is not None else None
+    return FramePublisher(camera_pool, encoder,
+                          preprocess=None if preprocessor.is_identity else preprocessor,
+                          change_detector=change_detector,
+                          display_map=DisplayMapper(contrast_window),
+                          averager=FrameAverager(*averaging) if averaging is not None else None,
+                          encode_workers=encode_workers)
@@ -0,0 +1,90 @@
+# Path: guailit/rate.py
+# -*- coding: utf-8 -*-
+"""
+Adaptive frame-rate control for the guailit live view.
+
+A RateController measures what each displayed frame costs (encoding plus
+delivery) and how old it is when it reaches the browser, and adapts the
+display rate so the latency stays around a target. Frames that are already
+too old are dropped instead of queued.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import time
+
+
+class RateController:
+    """
+    Additive-increase / multiplicative-decrease display rate controller.
+
+    max_fps caps the rate, latency_target (seconds) is the acceptable age of
+    a frame when it is displayed. At least one frame every 1 / min_fps
+    seconds is shown even if it is stale, so a slow pipeline degrades to a
+    slow view rather than a frozen one.
+    """
+
+    def __init__(self, max_fps: float = 30.0, latency_target: float = 0.2,
+                 min_fps: float = 1.0, smoothing: float = 0.2):
+        if max_fps <= 0:
+            raise ValueError("max_fps must be positive.")
+        self.max_fps = float(max_fps)
+        self.latency_target = float(latency_target)
+        self.min_fps = min(float(min_fps), self.max_fps)
+        self.smoothing = float(smoothing)
+        self.target_fps = self.max_fps
+        self.frame_cost = 0.0 # Smoothed encode + delivery time, seconds
+        self.latency = 0.0 # Smoothed frame age at display, seconds
+        self.frames_shown = 0
+        self.frames_dropped = 0
+        self._last_shown = None
+
+    def _smooth(self, average: float, value: float) -> float:
+        if self.frames_shown == 0:
+            return value
+        return average + self.smoothing * (value - average)
+
+    def should_drop(self, timestamp: float, now: float = None) -> bool:
+        """
+        Decide whether a frame acquired at timestamp (time.time()) is too old to show.
+        """
+        if timestamp is None:
+            return False
+        now = time.time() if now is None else now
+        if now - timestamp <= self.latency_target:
+            return False
+        last_shown = self._last_shown
+        if last_shown is None or time.monotonic() - last_shown >= 1.0 / self.min_fps:
+            # Better a late frame than no frame at all, including the first one
+            return False
+        self.frames_dropped += 1
+        return True
+
+    def frame_shown(self, cost: float, latency: float):
+        """
+        Record a displayed frame: cost is its encode + delivery time and
+        latency its age when it was displayed, both in seconds.
+        """
+        self.frame_cost = self._smooth(self.frame_cost, cost)
+        self.latency = self._smooth(self.latency, latency)
+        self.frames_shown += 1
+        self._last_shown = time.monotonic()
+
+        if self.latency > self.latency_target:
+            self.target_fps = max(self.min_fps, self.target_fps * 0.8)
+        else:
+            self.target_fps = min(self.max_fps, self.target_fps + 1.0)
+        if self.frame_cost > 0:
+            # Never ask for more frames than the pipeline can produce
+            self.target_fps = max(self.min_fps, min(self.target_fps, 1.0 / self.frame_cost))
+
+    def next_delay(self) -> float:
+        """
+        Seconds to wait before showing the next frame.
+        """
+        if self._last_shown is None:
+            return 0.0
+        elapsed = time.monotonic() - self._last_shown
+        return max(0.0, 1.0 / self.target_fps - elapsed)
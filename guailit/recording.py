@@ -0,0 +1,183 @@
+# Path: guailit/recording.py
+# -*- coding: utf-8 -*-
+"""
+High-throughput recording of raw camera frames to memory-mapped files.
+
+A FrameRecorder preallocates a memory-mapped .npy file for a fixed number
+of frames at full bit depth, plus a sidecar index (.index.npy) holding the
+sequence number, acquisition timestamp and motor position of each frame.
+Frames are written by a background thread, so the acquisition path only
+pays for a queue put and never waits on the disk. RecordingReader slices
+frames back through the memory map without loading the whole file.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+INDEX_DTYPE = np.dtype([("seq", np.int64), ("timestamp", np.float64), ("motor_position", np.float64)])
+
+
+def recording_paths(path: str) -> dict:
+    """
+    File names used by the recording with prefix path.
+    """
+    return {"frames": f"{path}.npy", "index": f"{path}.index.npy", "meta": f"{path}.json"}
+
+
+class FrameRecorder:
+    """
+    Record up to max_frames raw frames under the file prefix path.
+
+    submit() is meant to be called from the acquisition thread, e.g. as a
+    FrameGrabber listener. The frame is queued as is, not copied, so it must
+    not be modified afterwards. If the writer falls more than queue_frames
+    behind, new frames are dropped and counted instead of blocking the
+    caller. motor_position() is called for each frame and may return None.
+    """
+
+    def __init__(self, path: str, max_frames: int, motor_position=None, queue_frames: int = 64):
+        if max_frames < 1:
+            raise ValueError("max_frames must be positive.")
+        self.path = path
+        self.paths = recording_paths(path)
+        self.max_frames = int(max_frames)
+        self.motor_position = motor_position
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.error = None
+        self._frames = None
+        self._index = None
+        self._queue = queue.Queue(maxsize=queue_frames)
+        self._submitted = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="guailit-frame-recorder", daemon=True)
+        self._thread.start()
+
+    @property
+    def is_full(self) -> bool:
+        return self._submitted >= self.max_frames
+
+    def submit(self, seq: int, timestamp: float, frame: np.ndarray, motor_position: float = None) -> bool:
+        """
+        Queue a frame for writing. Returns False if it was dropped.
+
+        motor_position, when given, is stored instead of calling the
+        recorder's motor_position().
+        """
+        if self._closed or self.error is not None or self.is_full:
+            return False
+        position = motor_position
+        if position is None and self.motor_position is not None:
+            position = self.motor_position()
+        try:
+            self._queue.put_nowait((seq, timestamp, position, frame))
+        except queue.Full:
+            self.frames_dropped += 1
+            return False
+        self._submitted += 1
+        return True
+
+    # The recorder can be registered directly as a frame listener
+    __call__ = submit
+
+    def _allocate(self, frame: np.ndarray):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._frames = np.lib.format.open_memmap(
+            self.paths["frames"], mode="w+", dtype=frame.dtype, shape=(self.max_frames,) + frame.shape)
+        self._index = np.lib.format.open_memmap(
+            self.paths["index"], mode="w+", dtype=INDEX_DTYPE, shape=(self.max_frames,))
+        self._index["seq"] = -1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self.error is not None:
+                continue
+            seq, timestamp, position, frame = item
+            try:
+                if self._frames is None:
+                    self._allocate(frame)
+                elif frame.shape != self._frames.shape[1:] or frame.dtype != self._frames.dtype:
+                    raise ValueError(f"Frame format changed during recording: {frame.shape} {frame.dtype}")
+                i = self.frames_written
+                self._frames[i] = frame
+                self._index[i] = (seq, timestamp, np.nan if position is None else position)
+                self.frames_written += 1
+            except Exception as e:
+                self.error = e
+
+    def close(self, timeout: float = 30.0):
+        """
+        Write the queued frames, flush the files and write the metadata.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self._frames is not None:
+            self._frames.flush()
+            self._index.flush()
+        with open(self.paths["meta"], "w") as f:
+            json.dump({"frames": self.frames_written, "dropped": self.frames_dropped,
+                       "max_frames": self.max_frames,
+                       "error": str(self.error) if self.error is not None else None}, f)
+        self._frames = None
+        self._index = None
+
+
+class RecordingReader:
+    """
+    Read back a recording through memory maps. Indexing and slicing return
+    views on the file, so only the frames actually used are read from disk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.paths = recording_paths(path)
+        index = np.load(self.paths["index"], mmap_mode="r")
+        try:
+            with open(self.paths["meta"]) as f:
+                count = json.load(f)["frames"]
+        except (OSError, ValueError, KeyError):
+            # Recording was not closed cleanly: trust the index
+            count = int(np.count_nonzero(index["seq"] >= 0))
+        self.index = index[:count]
+        self.frames = np.load(self.paths["frames"], mmap_mode="r")[:count]
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, item):
+        return self.frames[item]
+
+    @property
+    def shape(self):
+        return self.frames.shape[1:]
+
+    @property
+    def dtype(self):
+        return self.frames.dtype
+
+    @property
+    def seqs(self) -> np.ndarray:
+        return self.index["seq"]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.index["timestamp"]
+
+    @property
+    def motor_positions(self) -> np.ndarray:
+        return self.index["motor_position"]
@@ -0,0 +1,244 @@
+# Path: guailit/replay.py
+# -*- coding: utf-8 -*-
+"""
+Replay of recorded sessions as virtual devices.
+
+A ReplaySession plays a FrameRecorder recording back in time, at the
+recorded rate, at a multiple of it, or as fast as possible. ReplayCamera
+behaves like the object returned by get_pysilico_camera_sync(): its frames
+are views on the memory-mapped recording, so nothing is copied or loaded
+up front. ReplayMotor reports the recorded motor position at the current
+replay time. Together they run the whole guailit pipeline offline, with
+real data and real data rates.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import threading
+import time
+
+import numpy as np
+
+from guailit.recording import RecordingReader
+from guailit.simulated import SimulatedFrame
+
+# Frame interval assumed for recordings of a single frame
+DEFAULT_FRAME_INTERVAL = 1.0 / 30.0
+
+
+def parse_replay_speed(value) -> float:
+    """
+    Replay speed from a setting: a factor of real time, or "max" (None) for
+    as fast as possible.
+    """
+    if value is None or str(value).strip().lower() in ("", "max", "0"):
+        return None
+    speed = float(str(value).strip().rstrip("xX"))
+    if speed <= 0:
+        raise ValueError(f"Replay speed must be positive, got {value}.")
+    return speed
+
+
+class ReplayFrame(SimulatedFrame):
+    """
+    Replayed frame: timestamp is the delivery time, like a live frame, and
+    recorded_timestamp the acquisition time in the recording.
+    """
+
+    def __init__(self, array: np.ndarray, counter: int, timestamp: float, recorded_timestamp: float):
+        super().__init__(array, counter, timestamp)
+        self.recorded_timestamp = recorded_timestamp
+
+
+class ReplaySession:
+    """
+    A recording played back on a clock shared by its cameras and motor.
+
+    speed is a factor of real time (1.0 plays the recording at the rate it
+    was acquired) or None to deliver frames as fast as they are asked for.
+    With loop the recording starts over at its end; without, reading past
+    the last frame raises EOFError. The session also provides the
+    fastlabio.camera functions the app uses, so it can stand in for that
+    module.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, loop: bool = True):
+        self.reader = RecordingReader(path)
+        if len(self.reader) == 0:
+            raise ValueError(f"Recording {path} holds no frames.")
+        self.speed = speed
+        self.loop = loop
+        timestamps = np.asarray(self.reader.timestamps, dtype=np.float64)
+        self._first_timestamp = float(timestamps[0])
+        self._offsets = timestamps - timestamps[0]
+        interval = float(np.median(np.diff(self._offsets))) if len(self) > 1 else DEFAULT_FRAME_INTERVAL
+        # One lap of a looped replay, with a normal frame interval before the restart
+        self.period = float(self._offsets[-1]) + max(interval, 1e-6)
+        positions = np.asarray(self.reader.motor_positions, dtype=np.float64)
+        valid = ~np.isnan(positions)
+        self._position_offsets = self._offsets[valid]
+        self._positions = positions[valid]
+        self.exposure_time = None
+        self.gain = None
+        self._start = None
+        self._current = 0 # Absolute index of the last frame delivered
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.reader)
+
+    @property
+    def motor_positions_recorded(self) -> bool:
+        return len(self._positions) > 0
+
+    @property
+    def paced(self) -> bool:
+        return self.speed is not None
+
+    def offset(self, index: int) -> float:
+        """
+        Replay time of the absolute frame index, in seconds of recording.
+        """
+        lap, k = divmod(index, len(self))
+        if lap and not self.loop:
+            raise EOFError("End of the replayed recording.")
+        return lap * self.period + float(self._offsets[k])
+
+    def elapsed(self) -> float:
+        """
+        Recording seconds played since the replay started.
+        """
+        with self._lock:
+            if self._start is None:
+                self._start = time.monotonic()
+            return (time.monotonic() - self._start) * self.speed
+
+    def due_time(self, index: int) -> float:
+        """
+        time.monotonic() value at which frame index is acquired.
+        """
+        return self._start + self.offset(index) / self.speed
+
+    def index_at(self, elapsed: float) -> int:
+        """
+        Absolute index of the first frame acquired at or after elapsed.
+        """
+        lap = int(elapsed // self.period) if self.loop else 0
+        return lap * len(self) + int(np.searchsorted(self._offsets, elapsed - lap * self.period, side="left"))
+
+    def frame_delivered(self, index: int):
+        self._current = index
+
+    def recorded_time(self) -> float:
+        """
+        Recording timestamp at the current replay time.
+        """
+        if self.paced:
+            elapsed = self.elapsed()
+            within = elapsed % self.period if self.loop else min(elapsed, float(self._offsets[-1]))
+        else:
+            within = float(self._offsets[self._current % len(self)])
+        return self._first_timestamp + within
+
+    def motor_position(self) -> float:
+        """
+        Recorded motor position at the current replay time, interpolated
+        between frames.
+        """
+        if not self.motor_positions_recorded:
+            raise RuntimeError("The replayed recording holds no motor positions.")
+        return float(np.interp(self.recorded_time() - self._first_timestamp, self._position_offsets, self._positions))
+
+    # --- fastlabio.camera API ---
+    def get_pysilico_camera_sync(self):
+        return ReplayCamera(self)
+
+    def set_exposure(self, exposure_time: float):
+        # Recorded frames cannot change; remembered so the UI round-trips
+        self.exposure_time = exposure_time
+
+    def set_gain(self, gain_value: float):
+        self.gain = gain_value
+
+
+class ReplayCamera:
+    """
+    Camera connection serving the frames of a ReplaySession.
+
+    When paced, getFutureFrames() waits for the next frame to be due and
+    skips the frames that went by since the last call, like a live camera
+    read by a slow consumer (counted in frames_skipped). Every connection
+    has its own position in the recording but follows the shared clock.
+    """
+
+    def __init__(self, session: ReplaySession):
+        self.session = session
+        self.frames_skipped = 0
+        self.closed = False
+        self._cursor = None if session.paced else 0
+
+    def getFutureFrames(self, n: int = 1, timeoutInSec: float = None):
+        if self.closed:
+            raise ConnectionError("Replay camera is closed.")
+        session = self.session
+        n = int(n)
+        if session.paced:
+            upcoming = session.index_at(session.elapsed())
+            if self._cursor is None:
+                self._cursor = upcoming
+            elif upcoming > self._cursor:
+                self.frames_skipped += upcoming - self._cursor
+                self._cursor = upcoming
+        indices = range(self._cursor, self._cursor + n)
+        session.offset(indices[-1]) # EOFError past the end without loop
+        self._cursor += n
+        if session.paced:
+            delay = session.due_time(indices[-1]) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        session.frame_delivered(indices[-1])
+        frames = [k % len(session) for k in indices]
+        # A single frame is a view on the memory map; stacks are copied, as with pysilico
+        array = session.reader[frames[0]] if n == 1 else np.stack([session.reader[k] for k in frames], axis=-1)
+        return ReplayFrame(array, indices[-1], time.time(),
+                           float(session.reader.timestamps[frames[-1]]))
+
+    def exposureTime(self) -> float:
+        return self.session.exposure_time
+
+    def setExposureTime(self, exposure_time: float):
+        self.session.set_exposure(exposure_time)
+
+    def close(self):
+        self.closed = True
+
+
+def open_replay_camera(path: str, speed: float = 1.0, loop: bool = True) -> ReplayCamera:
+    """
+    Camera connection on a new replay of the recording path. Being a
+    module-level function, it can be handed to another process.
+    """
+    return ReplaySession(path, speed, loop).get_pysilico_camera_sync()
+
+
+class ReplayMotor:
+    """
+    Motor with the fastlabio.motor API reporting the recorded positions.
+
+    Commands are accepted and counted but do not change the replay.
+    """
+
+    def __init__(self, session: ReplaySession):
+        self.session = session
+        self.commands_ignored = 0
+
+    def move_motor(self, position: float):
+        self.commands_ignored += 1
+
+    def get_motor_position(self) -> float:
+        return self.session.motor_position()
+
+    def set_motor_speed(self, speed: float):
+        self.commands_ignored += 1
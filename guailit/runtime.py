@@ -0,0 +1,178 @@
+# Path: guailit/runtime.py
+# -*- coding: utf-8 -*-
+"""
+Long-lived asyncio runtime and async device layer for the guailit library.
+
+A DeviceRuntime owns one event loop, running in a daemon thread for the
+whole life of the Streamlit process, and a bounded thread pool for the
+blocking fastlabio calls. AsyncCamera and AsyncMotor are async facades over
+the devices; the Streamlit script submits coroutines to the runtime and
+waits for their results, so independent operations (setting the exposure
+while the motor moves, say) overlap instead of running one after the other.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import asyncio
+import concurrent.futures
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from guailit.averaging import grab_average
+from guailit.device_state import CAMERA_SETTERS
+from guailit.grabber import frame_from_result
+from guailit.metrics import METRICS
+
+
+class DeviceRuntime:
+    """
+    Event loop in a background thread, with at most max_workers blocking
+    device calls in flight.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="guailit-device")
+        self.loop.set_default_executor(self.executor)
+        self._thread = threading.Thread(target=self.loop.run_forever, name="guailit-runtime", daemon=True)
+        self._thread.start()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread.is_alive() and not self.loop.is_closed()
+
+    def submit(self, coroutine):
+        """
+        Schedule coroutine on the runtime loop. Returns a concurrent.futures.Future.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine, timeout: float = 30.0):
+        """
+        Run coroutine on the runtime loop and wait for its result.
+
+        Raises concurrent.futures.TimeoutError (the builtin TimeoutError from
+        Python 3.11) and cancels the coroutine after timeout seconds.
+        """
+        future = self.submit(coroutine)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def run_all(self, *coroutines, timeout: float = 30.0) -> list:
+        """
+        Run independent coroutines concurrently and return their results in
+        order. Exceptions are returned in place of results, not raised.
+        """
+        async def gather():
+            return await asyncio.gather(*coroutines, return_exceptions=True)
+        return self.run(gather(), timeout)
+
+    async def call(self, function, *args, stage: str = None, **kwargs):
+        """
+        Await a blocking call made on the device executor, timed into the
+        metrics histogram of stage if given.
+        """
+        call = functools.partial(function, *args, **kwargs)
+        if stage is None:
+            return await self.loop.run_in_executor(self.executor, call)
+        with METRICS.timed(stage):
+            return await self.loop.run_in_executor(self.executor, call)
+
+    def stop(self, timeout: float = 5.0):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class AsyncCamera:
+    """
+    Async facade over fastlabio.camera and a pool of camera connections.
+
+    get_camera() returns the camera module; it is looked up for every call.
+    Settings calls are serialized, since they share one server connection,
+    but they overlap with frame grabs and with motor commands.
+    """
+
+    def __init__(self, runtime: DeviceRuntime, get_camera, camera_pool):
+        self.runtime = runtime
+        self._get_camera = get_camera
+        self.camera_pool = camera_pool
+        self._settings_lock = None
+
+    async def _setting(self, name: str, *args):
+        if self._settings_lock is None:
+            self._settings_lock = asyncio.Lock() # Created on the runtime loop
+        async with self._settings_lock:
+            return await self.runtime.call(getattr(self._get_camera(), name), *args, stage=f"camera_{name}")
+
+    async def set_exposure(self, exposure_time: float):
+        return await self._setting("set_exposure", exposure_time)
+
+    async def set_gain(self, gain_value: float):
+        return await self._setting("set_gain", gain_value)
+
+    async def apply_settings(self, settings: dict, on_applied=None):
+        """
+        Write several settings ({"exposure": ..., "gain": ...}) back to back
+        in one job on the device executor, under the settings lock. Each
+        setter is still its own server round trip. on_applied(name, value)
+        is called after each write that succeeded.
+        """
+        def apply():
+            camera_module = self._get_camera()
+            for name, value in settings.items():
+                getattr(camera_module, CAMERA_SETTERS[name])(value)
+                if on_applied is not None:
+                    on_applied(name, value)
+        if self._settings_lock is None:
+            self._settings_lock = asyncio.Lock()
+        async with self._settings_lock:
+            return await self.runtime.call(apply, stage="camera_apply_settings")
+
+    async def _with_camera(self, function, *args, stage: str = None):
+        # Leases a pooled connection for the duration of the call; an
+        # exception marks it broken so the pool reconnects
+        def leased():
+            with self.camera_pool.lease() as camera_instance:
+                return function(camera_instance, *args)
+        return await self.runtime.call(leased, stage=stage)
+
+    async def grab_frame(self):
+        """
+        One frame as a numpy array, None if the camera returned no frame.
+        """
+        def grab(camera_instance):
+            frame_object = frame_from_result(camera_instance.getFutureFrames(1))
+            return frame_object.toNumpyArray() if frame_object else None
+        return await self._with_camera(grab, stage="single_frame_acquire")
+
+    async def grab_average(self, count: int):
+        """
+        float32 average of count frames pulled in a single call.
+        """
+        return await self._with_camera(grab_average, count, stage="average_acquire")
+
+
+class AsyncMotor:
+    """
+    Async facade over a MotorCommandQueue: awaiting a command waits for the
+    queue to send it, without blocking the runtime loop.
+    """
+
+    def __init__(self, command_queue):
+        self.command_queue = command_queue
+
+    async def move(self, position: float):
+        return await asyncio.wrap_future(self.command_queue.move(position))
+
+    async def set_speed(self, speed: float):
+        return await asyncio.wrap_future(self.command_queue.set_speed(speed))
+
+    async def get_position(self, max_age: float = None) -> float:
+        return await asyncio.wrap_future(self.command_queue.get_position(max_age))
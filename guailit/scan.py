@@ -0,0 +1,200 @@
+# Path: guailit/scan.py
+# -*- coding: utf-8 -*-
+"""
+Pipelined motor scan and frame acquisition for the guailit library.
+
+A ScanEngine steps the motor through a list of positions and grabs a frame
+at each one. As soon as frame N has been captured the move to position N+1
+is issued, and frame N is processed (encoded, saved...) by a worker while
+the motor travels and settles, so the per-point cost is close to
+max(move + settle + capture, processing) instead of their sum.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from guailit.grabber import frame_from_result
+from guailit.metrics import METRICS
+
+# One scan point: the frame captured at `position` while aiming at `target`,
+# and whatever the processing function returned for it
+ScanResult = namedtuple("ScanResult", ["index", "target", "position", "timestamp", "frame", "output"])
+
+_DONE = object()
+
+
+def scan_positions(start: float, stop: float, step: float) -> np.ndarray:
+    """
+    Positions from start to stop (included when it falls on the grid) every step.
+    """
+    if step == 0:
+        raise ValueError("Scan step must not be zero.")
+    step = abs(step) if stop >= start else -abs(step)
+    count = int(np.floor((stop - start) / step + 1e-9)) + 1
+    return start + step * np.arange(count)
+
+
+class ScanEngine:
+    """
+    Move / settle / capture scan with processing overlapped with motion.
+
+    motor provides move_motor(), get_motor_position() (the fastlabio.motor
+    API) and camera_instance getFutureFrames(). The settle criterion is
+    either a position tolerance, polled every poll_interval seconds for at
+    most settle_timeout seconds, or a plain settle_time delay; with a
+    tolerance, settle_time is an extra wait once in tolerance.
+    process(index, target, position, timestamp, frame) runs on a worker
+    thread and its return value becomes ScanResult.output.
+    """
+
+    def __init__(self, motor, camera_instance, positions, tolerance: float = None,
+                 settle_time: float = 0.0, settle_timeout: float = 30.0,
+                 poll_interval: float = 0.005, process=None, max_pending: int = 4):
+        self.motor = motor
+        self.camera_instance = camera_instance
+        self.positions = [float(p) for p in positions]
+        self.tolerance = tolerance
+        self.settle_time = settle_time
+        self.settle_timeout = settle_timeout
+        self.poll_interval = poll_interval
+        self.process = process
+        self.max_pending = max(1, max_pending)
+        self.points_done = 0
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._results = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="guailit-scan", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def wait(self, timeout: float = None):
+        """
+        Wait for the scan thread to finish.
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def results(self, timeout: float = None):
+        """
+        Yield ScanResults in position order as they become available.
+
+        Stops at the end of the scan, after a cancel, or on error (see error).
+        Raises queue.Empty if nothing arrives within timeout seconds.
+        """
+        while True:
+            item = self._results.get(timeout=timeout)
+            if item is _DONE:
+                return
+            yield item
+
+    def run(self) -> list:
+        """
+        Run the whole scan in the calling thread and return all results.
+        """
+        self.started_at = time.monotonic()
+        self._run()
+        results = list(self.results())
+        if self.error is not None:
+            raise self.error
+        return results
+
+    def _settle(self, target: float) -> float:
+        if self.tolerance is None:
+            self._cancel_event.wait(self.settle_time)
+            return self.motor.get_motor_position()
+        deadline = time.monotonic() + self.settle_timeout
+        while True:
+            position = self.motor.get_motor_position()
+            if abs(position - target) <= self.tolerance:
+                if self.settle_time:
+                    self._cancel_event.wait(self.settle_time)
+                return position
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Motor did not settle at {target} (last position {position}).")
+            if self._cancel_event.wait(self.poll_interval):
+                return position
+
+    def _capture(self):
+        with METRICS.timed("scan_capture"):
+            frame_object = frame_from_result(self.camera_instance.getFutureFrames(1))
+        if not frame_object:
+            raise RuntimeError("No frame received during scan.")
+        return time.time(), frame_object.toNumpyArray()
+
+    def _process(self, index, target, position, timestamp, frame) -> ScanResult:
+        output = None
+        if self.process is not None:
+            with METRICS.timed("scan_process"):
+                output = self.process(index, target, position, timestamp, frame)
+        return ScanResult(index, target, position, timestamp, frame, output)
+
+    def _run(self):
+        # One thread for motor commands, one for frame processing: the
+        # processing order, and so the result order, follows the scan order
+        motor_executor = ThreadPoolExecutor(1, thread_name_prefix="guailit-scan-motor")
+        process_executor = ThreadPoolExecutor(1, thread_name_prefix="guailit-scan-process")
+        pending = deque()
+
+        def deliver_next():
+            self._results.put(pending.popleft().result())
+            self.points_done += 1
+
+        try:
+            if self.positions:
+                move = motor_executor.submit(self.motor.move_motor, self.positions[0])
+            for index, target in enumerate(self.positions):
+                if self._cancel_event.is_set():
+                    break
+                with METRICS.timed("scan_move_settle"):
+                    move.result()
+                    position = self._settle(target)
+                if self._cancel_event.is_set():
+                    break
+                timestamp, frame = self._capture()
+                # Start travelling to the next point while this frame is processed
+                if index + 1 < len(self.positions):
+                    move = motor_executor.submit(self.motor.move_motor, self.positions[index + 1])
+                pending.append(process_executor.submit(
+                    self._process, index, target, position, timestamp, frame))
+                while pending and pending[0].done():
+                    deliver_next()
+                while len(pending) >= self.max_pending:
+                    # Processing is the bottleneck: wait instead of piling up frames
+                    deliver_next()
+            while pending:
+                deliver_next()
+        except Exception as e:
+            self.error = e
+        finally:
+            motor_executor.shutdown(wait=True)
+            process_executor.shutdown(wait=True, cancel_futures=True)
+            self.finished_at = time.monotonic()
+            self._results.put(_DONE)
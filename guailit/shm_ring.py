@@ -0,0 +1,599 @@
+# Path: guailit/shm_ring.py
+# -*- coding: utf-8 -*-
+"""
+Out-of-process acquisition over shared-memory frame rings.
+
+In the Streamlit process, frame conversion and encoding compete for the GIL
+with the script reruns of every session. A ProcessFramePublisher runs the
+acquire / preprocess / encode pipeline of a FramePublisher in a separate
+process instead, which writes the raw frames and the encoded frames into
+two SharedFrameRing blocks of multiprocessing.shared_memory. The UI process
+attaches to the rings and hands out views on them: frames are neither
+pickled nor copied on the way, and the pipeline gets a core of its own.
+Raw frames are only written while the UI process reads them.
+
+A ring has a single writer and any number of readers. Each slot carries a
+sequence number that the writer clears while it rewrites the slot, so a
+reader can tell (with is_current()) whether a view it holds is still intact.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import multiprocessing
+import queue
+import threading
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from guailit.encoding import EncodedFrame, make_encoder
+from guailit.grabber import GrabbedFrame
+from guailit.publisher import FrameMailbox
+
+CONTROL_DTYPE = np.dtype([("last_seq", np.int64), ("slots", np.int64), ("slot_bytes", np.int64),
+                          ("frames_dropped", np.int64)])
+SLOT_DTYPE = np.dtype([("seq", np.int64), ("timestamp", np.float64), ("nbytes", np.int64), ("ndim", np.int64),
+                       ("shape", np.int64, (4,)), ("dtype", "S8"), ("format", "S8"), ("frame_seq", np.int64),
+                       ("width", np.int64), ("height", np.int64), ("encode_ms", np.float64)])
+ALIGNMENT = 64
+
+# A frame read from a ring. data is a view on the shared memory, valid while
+# the ring's is_current(frame) is True.
+RingFrame = namedtuple("RingFrame", ["seq", "timestamp", "data", "frame_seq", "format", "width", "height",
+                                     "encode_ms"])
+
+# Raw frames keep being written for this long after the last latest_raw() call
+RAW_DEMAND_TIMEOUT = 5.0
+
+
+def _aligned(size: int) -> int:
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+class SharedFrameRing:
+    """
+    Ring of slots slots of slot_bytes bytes each in a shared memory block.
+
+    Use create() in the writing process and attach() in the readers.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self._control = np.ndarray((1,), dtype=CONTROL_DTYPE, buffer=shm.buf)
+        slots = int(self._control["slots"][0])
+        slot_bytes = int(self._control["slot_bytes"][0])
+        headers_offset = _aligned(CONTROL_DTYPE.itemsize)
+        data_offset = headers_offset + _aligned(slots * SLOT_DTYPE.itemsize)
+        self._headers = np.ndarray((slots,), dtype=SLOT_DTYPE, buffer=shm.buf, offset=headers_offset)
+        self._data = np.ndarray((slots, slot_bytes), dtype=np.uint8, buffer=shm.buf, offset=data_offset)
+
+    @classmethod
+    def create(cls, slots: int, slot_bytes: int):
+        slot_bytes = _aligned(max(1, int(slot_bytes)))
+        size = _aligned(CONTROL_DTYPE.itemsize) + _aligned(slots * SLOT_DTYPE.itemsize) + slots * slot_bytes
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        control = np.ndarray((1,), dtype=CONTROL_DTYPE, buffer=shm.buf)
+        control[0] = (-1, slots, slot_bytes, 0)
+        del control # No view may outlive close()
+        ring = cls(shm, owner=True)
+        ring._headers["seq"] = -1
+        return ring
+
+    @classmethod
+    def attach(cls, name: str):
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def slots(self) -> int:
+        return len(self._headers)
+
+    @property
+    def slot_bytes(self) -> int:
+        return self._data.shape[1]
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest frame, -1 if the ring is empty."""
+        return int(self._control["last_seq"][0])
+
+    @property
+    def frames_dropped(self) -> int:
+        """Frames too large for a slot, which the writer skipped."""
+        return int(self._control["frames_dropped"][0])
+
+    def write(self, data, timestamp: float, frame_seq: int = -1, format: str = "", width: int = 0,
+              height: int = 0, encode_ms: float = 0.0) -> int:
+        """
+        Copy an array (or bytes) into the next slot. Returns its sequence
+        number, -1 if it does not fit in a slot. Single writer only.
+        """
+        array = np.frombuffer(data, dtype=np.uint8) if isinstance(data, (bytes, bytearray)) \
+            else np.ascontiguousarray(data)
+        if array.nbytes > self.slot_bytes or array.ndim > 4:
+            self._control["frames_dropped"] += 1
+            return -1
+        seq = self.last_seq + 1
+        i = seq % self.slots
+        self._headers["seq"][i] = -1 # Readers ignore the slot while it is rewritten
+        self._data[i, :array.nbytes] = array.reshape(-1).view(np.uint8)
+        shape = tuple(array.shape) + (0,) * (4 - array.ndim)
+        self._headers[i] = (-1, timestamp, array.nbytes, array.ndim, shape, array.dtype.str, format,
+                            frame_seq, width, height, encode_ms)
+        self._headers["seq"][i] = seq
+        self._control["last_seq"] = seq
+        return seq
+
+    def read(self, seq: int):
+        """
+        Frame seq as a RingFrame of views, None if it was overwritten or not written yet.
+        """
+        if seq < 0 or seq > self.last_seq:
+            return None
+        i = seq % self.slots
+        header = self._headers[i].copy()
+        if header["seq"] != seq:
+            return None
+        ndim = int(header["ndim"])
+        array = self._data[i, :int(header["nbytes"])].view(np.dtype(header["dtype"].decode()))
+        array = array.reshape(tuple(int(n) for n in header["shape"][:ndim]))
+        return RingFrame(seq, float(header["timestamp"]), array, int(header["frame_seq"]),
+                         header["format"].decode(), int(header["width"]), int(header["height"]),
+                         float(header["encode_ms"]))
+
+    def latest(self):
+        """
+        Newest frame, None if the ring is empty.
+        """
+        return self.read(self.last_seq)
+
+    def is_current(self, frame: RingFrame) -> bool:
+        """
+        True while the slot of frame has not been reused, i.e. its views are intact.
+        """
+        headers = self._headers
+        return headers is not None and int(headers["seq"][frame.seq % len(headers)]) == frame.seq
+
+    def wait_for_newer(self, seq: int, timeout: float = None, poll: float = 0.001):
+        """
+        Wait for a frame newer than seq and return the newest one, None on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.last_seq > seq:
+                frame = self.latest()
+                if frame is not None:
+                    return frame
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll)
+
+    def close(self):
+        """
+        Detach from the block, and free it if this ring created it.
+        """
+        self._control = self._headers = self._data = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass # A reader still holds views; the mapping goes with them
+        if self.owner:
+            self.unlink()
+
+    def unlink(self):
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _encoded_slot_bytes(encoded: EncodedFrame) -> int:
+    # Compressed frames are normally far smaller than 3 bytes per pixel
+    nbytes = encoded.nbytes if encoded.format == "RAW" else encoded.width * encoded.height * 3 + 65536
+    return max(nbytes, 2 * encoded.nbytes)
+
+
+def _encoded_view(ring: SharedFrameRing, frame: RingFrame) -> EncodedFrame:
+    """
+    EncodedFrame of frame whose data is a read-only view on its ring slot
+    (an array for RAW, a memoryview otherwise), None if the slot was reused.
+    """
+    if not ring.is_current(frame):
+        return None
+    if frame.format == "RAW":
+        data = frame.data.view()
+        data.flags.writeable = False
+    else:
+        data = memoryview(frame.data).toreadonly()
+    return EncodedFrame(data, frame.format, frame.width, frame.height, data.nbytes, frame.encode_ms,
+                        frame.frame_seq, frame.timestamp)
+
+
+class RingMailbox(FrameMailbox):
+    """
+    Mailbox of a ProcessFramePublisher.
+
+    It holds (ring, RingFrame) pairs, and get() hands out the newest one as
+    an EncodedFrame of views on shared memory, skipping a frame whose slot
+    was reused while it waited (counted as dropped). The views stay intact
+    until the ring has taken slots - 1 newer frames.
+    """
+
+    def get(self, timeout: float = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            item = super().get(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            if item is None:
+                return None
+            encoded = _encoded_view(*item)
+            if encoded is not None:
+                return encoded
+            self.dropped += 1
+
+
+def _acquisition_main(connect, settings: tuple, raw_slots: int, encoded_slots: int, max_fps, raw_wanted,
+                      acquired, stop_event, status):
+    """
+    Entry point of the acquisition process: run a FramePublisher and copy
+    its encoded frames, and its raw frames while raw_wanted is set, into
+    shared memory rings. The camera is read at most max_fps times per second
+    (0 for no limit) and the frame count is kept in acquired.
+    """
+    from guailit.connections import DevicePool, probe_camera
+    from guailit.publisher import build_frame_publisher
+    rings = {}
+
+    def ring_for(kind: str, slots: int, slot_bytes: int) -> SharedFrameRing:
+        if kind not in rings:
+            rings[kind] = SharedFrameRing.create(slots, slot_bytes)
+            status.put(("ring", kind, rings[kind].name))
+        return rings[kind]
+
+    def write_raw(seq, timestamp, frame):
+        # Frame listener, called from the grabber thread
+        ring_for("raw", raw_slots, frame.nbytes).write(frame, timestamp, frame_seq=seq)
+
+    publisher = None
+    try:
+        publisher = build_frame_publisher(DevicePool("camera", connect, probe=probe_camera), *settings)
+        mailbox = publisher.subscribe()
+        raw_listening = False
+        while not stop_event.is_set():
+            start = time.monotonic()
+            fps = max_fps.value
+            # The grabber follows the rate of its subscriber, i.e. of the fastest viewer
+            mailbox.max_fps = fps if fps > 0 else None
+            acquired.value = publisher.frames_acquired
+            # A raw listener lifts the fps cap and copies every full frame: only while the UI reads them
+            wanted = bool(raw_slots and raw_wanted.value)
+            if wanted != raw_listening:
+                if wanted:
+                    publisher.add_frame_listener(write_raw)
+                else:
+                    publisher.remove_frame_listener(write_raw)
+                raw_listening = wanted
+            encoded = mailbox.get(0.5)
+            if publisher.error is not None:
+                raise publisher.error
+            if encoded is None:
+                continue
+            data = encoded.data if isinstance(encoded.data, np.ndarray) else bytes(encoded.data)
+            ring_for("encoded", encoded_slots, _encoded_slot_bytes(encoded)).write(
+                data, encoded.timestamp, encoded.seq, encoded.format, encoded.width, encoded.height,
+                encoded.encode_ms)
+            # Encode no faster than the fastest viewer wants
+            if fps > 0:
+                stop_event.wait(max(0.0, 1.0 / fps - (time.monotonic() - start)))
+    except BaseException as e:
+        status.put(("error", type(e).__name__, str(e)))
+    finally:
+        if publisher is not None:
+            publisher.stop()
+        for ring in rings.values():
+            ring.close()
+        status.put(("stopped",))
+
+
+class ProcessFramePublisher:
+    """
+    FramePublisher whose pipeline runs in a separate process.
+
+    It has the interface of FramePublisher: sessions subscribe and read
+    EncodedFrames from their FrameMailbox, raw frame listeners get every raw
+    frame. A thread of the UI process follows the shared memory rings and
+    fans the frames out. connect() opens the camera in the acquisition
+    process, so it must be picklable, e.g. a module-level function or a
+    functools.partial of one. settings are the arguments of
+    build_frame_publisher() after the camera pool.
+
+    Mailboxes hand out EncodedFrames of views on the encoded ring (see
+    RingMailbox), and raw listeners get read-only views on the raw ring,
+    valid until raw_slots - 1 newer frames were written; listeners that keep
+    frames longer must be added with keeps_frames=True to get copies. The
+    acquisition process only writes raw frames while there are listeners
+    or latest_raw() was called in the last RAW_DEMAND_TIMEOUT seconds.
+    """
+
+    def __init__(self, connect, settings: tuple = (), idle_timeout: float = 5.0, stale_after: float = 30.0,
+                 raw_slots: int = 8, encoded_slots: int = 8, start_timeout: float = 20.0):
+        self.connect = connect
+        self.settings = tuple(settings)
+        self.idle_timeout = idle_timeout
+        self.stale_after = stale_after
+        self.raw_slots = raw_slots
+        self.encoded_slots = encoded_slots
+        self.start_timeout = start_timeout
+        # Only the encoding format is needed here, the encoder itself runs in the other process
+        self.encoder = make_encoder(settings[0] if settings else "JPEG")
+        self.averager = None # Averaging happens in the acquisition process
+        self.error = None
+        self.latest = None
+        self.frames_encoded = 0
+        self.raw_frames_missed = 0
+        self.raw_ring = None
+        self.encoded_ring = None
+        self._context = multiprocessing.get_context("spawn") # Forking a threaded server is unsafe
+        self._process = None
+        self._status = None
+        self._stop_event = None
+        self._max_fps = None
+        self._raw_wanted = None
+        self._acquired = None
+        self._raw_requested = None
+        self._latest_frame = None # (ring, RingFrame) of latest
+        self._mailboxes = set()
+        self._listeners = []
+        self._keeps_frames = []
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self._stopping = None # Thread still shutting down a detached process
+        self._idle_since = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._mailboxes)
+
+    @property
+    def frames_acquired(self) -> int:
+        return self._acquired.value if self._acquired is not None else 0
+
+    def latest_raw(self):
+        """
+        Newest raw frame as a RingFrame of views on shared memory, None if
+        there is none yet. Check raw_ring.is_current() after using it.
+
+        Raw frames are written while this keeps being called, so the first
+        calls return None until the acquisition process starts writing them.
+        """
+        self._raw_requested = time.monotonic()
+        ring = self.raw_ring
+        return ring.latest() if ring is not None else None
+
+    def raw_snapshot(self):
+        """
+        Copy of the newest raw frame as a GrabbedFrame, None if there is none
+        or its slot was reused while it was being copied.
+        """
+        ring = self.raw_ring
+        frame = self.latest_raw()
+        if frame is None:
+            return None
+        data = frame.data.copy()
+        return GrabbedFrame(frame.seq, frame.timestamp, data) if ring.is_current(frame) else None
+
+    def subscribe(self, max_fps: float = None) -> FrameMailbox:
+        """
+        Register a new viewer, starting the acquisition process if needed.
+
+        Raises ConnectionError if it fails to deliver frames within start_timeout.
+        """
+        mailbox = RingMailbox(max_fps) # The acquisition process paces itself
+        with self._lock:
+            if not self.is_running:
+                self._start()
+            self._mailboxes.add(mailbox)
+            self._idle_since = None
+        if not self._ready.wait(self.start_timeout) or self.error is not None:
+            self.unsubscribe(mailbox)
+            raise ConnectionError(f"Acquisition process did not start: {self.error or 'timeout'}")
+        if self._latest_frame is not None:
+            mailbox.put(self._latest_frame)
+        return mailbox
+
+    def add_frame_listener(self, listener, keeps_frames: bool = False):
+        """
+        Register a raw frame listener, starting acquisition if needed. With
+        keeps_frames it is given copies instead of views on shared memory.
+        """
+        with self._lock:
+            if not self.is_running:
+                self._start()
+            self._listeners.append(listener)
+            if keeps_frames:
+                self._keeps_frames.append(listener)
+            self._idle_since = None
+
+    def remove_frame_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+            if listener in self._keeps_frames:
+                self._keeps_frames.remove(listener)
+
+    def is_subscribed(self, mailbox: FrameMailbox) -> bool:
+        return mailbox in self._mailboxes
+
+    def unsubscribe(self, mailbox: FrameMailbox):
+        with self._lock:
+            self._mailboxes.discard(mailbox)
+            if not self._mailboxes:
+                self._idle_since = time.monotonic()
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Stop the acquisition process immediately, whatever the number of subscribers.
+        """
+        if self._stop_event is not None:
+            self._stop_event.set()
+        for thread in (self._thread, self._stopping):
+            if thread is not None and thread is not threading.current_thread():
+                thread.join(timeout)
+
+    def _start(self):
+        # Must be called with the lock held
+        self.error = None
+        self.latest = None
+        self._ready.clear()
+        self._status = self._context.Queue()
+        self._stop_event = self._context.Event()
+        self._max_fps = self._context.Value("d", 0.0)
+        self._raw_wanted = self._context.Value("b", 0)
+        self._acquired = self._context.Value("q", 0)
+        self._process = self._context.Process(
+            target=_acquisition_main, name="guailit-acquisition", daemon=True,
+            args=(self.connect, self.settings, self.raw_slots, self.encoded_slots, self._max_fps,
+                  self._raw_wanted, self._acquired, self._stop_event, self._status))
+        self._process.start()
+        self._thread = threading.Thread(target=self._run, name="guailit-process-publisher", daemon=True)
+        self._thread.start()
+
+    def _handle_status(self):
+        while True:
+            try:
+                message = self._status.get_nowait()
+            except queue.Empty:
+                return
+            if message[0] == "ring":
+                ring = SharedFrameRing.attach(message[2])
+                if message[1] == "raw":
+                    self.raw_ring = ring
+                else:
+                    self.encoded_ring = ring
+                    self._ready.set()
+            elif message[0] == "error":
+                error_type = ConnectionError if message[1] == "ConnectionError" else RuntimeError
+                self.error = error_type(f"{message[1]}: {message[2]}")
+                self._ready.set()
+
+    def _should_stop(self) -> bool:
+        # Must be called with the lock held
+        if self._stop_event.is_set() or self.error is not None:
+            return True
+        if not self._process.is_alive():
+            self.error = RuntimeError(f"Acquisition process exited with code {self._process.exitcode}")
+            return True
+        now = time.monotonic()
+        for mailbox in [m for m in self._mailboxes if now - m.last_read > self.stale_after]:
+            self._mailboxes.discard(mailbox)
+        raw_requested = self._raw_requested is not None and now - self._raw_requested < RAW_DEMAND_TIMEOUT
+        self._raw_wanted.value = bool(self._listeners) or raw_requested
+        if self._mailboxes or self._listeners:
+            self._idle_since = None
+            rates = [m.max_fps for m in self._mailboxes]
+            self._max_fps.value = 0.0 if not rates or None in rates else max(rates)
+            return False
+        if self._idle_since is None:
+            self._idle_since = now
+        return now - self._idle_since > self.idle_timeout
+
+    def _detach(self):
+        # Must be called with the lock held: ask the process to stop and
+        # hand it over to _shutdown(), so that a new one can start meanwhile
+        self._stop_event.set()
+        stopping = (self._process, self._status, [self.raw_ring, self.encoded_ring])
+        self._stopping = self._thread
+        self._thread = None
+        self.raw_ring = None
+        self.encoded_ring = None
+        self._latest_frame = None
+        self._ready.set() # Wake subscribers still waiting for the start
+        return stopping
+
+    @staticmethod
+    def _shutdown(process, status, rings):
+        # Runs without the lock, since joining the process may take seconds
+        process.join(5.0)
+        if process.is_alive():
+            process.kill()
+        while True:
+            try:
+                message = status.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == "ring":
+                # Created after the last status check: attach to free it
+                try:
+                    rings.append(SharedFrameRing.attach(message[2]))
+                except FileNotFoundError:
+                    pass
+        for ring in rings:
+            if ring is not None:
+                ring.close()
+                ring.unlink() # In case the acquisition process died before freeing it
+
+    def _publish(self, frame: RingFrame):
+        item = (self.encoded_ring, frame)
+        encoded = _encoded_view(*item)
+        if encoded is None:
+            return # Already overwritten
+        self._latest_frame = item
+        self.latest = encoded
+        self.frames_encoded += 1
+        with self._lock:
+            mailboxes = list(self._mailboxes)
+        for mailbox in mailboxes:
+            mailbox.put(item)
+
+    def _feed_listeners(self, last_raw: int) -> int:
+        ring = self.raw_ring
+        newest = ring.last_seq
+        listeners = list(self._listeners)
+        keepers = list(self._keeps_frames)
+        for seq in range(last_raw + 1, newest + 1):
+            frame = ring.read(seq)
+            copy = frame.data.copy() if frame is not None and keepers else None
+            if frame is None or not ring.is_current(frame):
+                self.raw_frames_missed += 1
+                continue
+            view = frame.data
+            view.flags.writeable = False
+            for listener in listeners:
+                listener(frame.frame_seq, frame.timestamp, copy if listener in keepers else view)
+        return newest
+
+    def _run(self):
+        last_seq = -1
+        last_raw = -1
+        while True:
+            self._handle_status()
+            with self._lock:
+                stopping = self._detach() if self._should_stop() else None
+            if stopping is not None:
+                self._shutdown(*stopping)
+                return
+            try:
+                if self.raw_ring is not None:
+                    # Frames written for latest_raw() alone are not missed by later listeners
+                    last_raw = self._feed_listeners(last_raw) if self._listeners else self.raw_ring.last_seq
+                if self.encoded_ring is None:
+                    time.sleep(0.01)
+                    continue
+                frame = self.encoded_ring.wait_for_newer(last_seq, 0.05)
+                if frame is not None:
+                    last_seq = frame.seq
+                    self._publish(frame)
+            except Exception as e:
+                self.error = e
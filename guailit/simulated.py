@@ -0,0 +1,159 @@
+# Path: guailit/simulated.py
+# -*- coding: utf-8 -*-
+"""
+Simulated fastlabio devices for benchmarks and development without hardware.
+
+SimulatedCamera behaves like the object returned by
+fastlabio.camera.get_pysilico_camera_sync(), and SimulatedMotor like the
+fastlabio.motor module, so they can be dropped into the guailit pipeline in
+place of the real servers.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import random
+import threading
+import time
+
+import numpy as np
+
+
+class SimulatedFrame:
+    """
+    Frame object with the toNumpyArray() method of the pysilico frames.
+    """
+
+    def __init__(self, array: np.ndarray, counter: int, timestamp: float):
+        self._array = array
+        self.counter = counter
+        self.timestamp = timestamp
+
+    def toNumpyArray(self) -> np.ndarray:
+        return self._array
+
+
+class SimulatedCamera:
+    """
+    Camera producing noisy frames at a fixed rate with optional jitter.
+
+    width and height set the resolution, bit_depth the pixel range (8 bit
+    frames are uint8, deeper ones uint16), fps the frame rate and jitter the
+    standard deviation of the frame interval as a fraction of it.
+    getFutureFrames(n) blocks until the next n frames are due, like a real
+    camera; for n > 1 the frames are stacked along the last axis.
+    """
+
+    def __init__(self, width: int = 1920, height: int = 1080, bit_depth: int = 12,
+                 fps: float = 30.0, jitter: float = 0.0, variants: int = 4, seed: int = 0):
+        self.width = int(width)
+        self.height = int(height)
+        self.bit_depth = int(bit_depth)
+        self.fps = float(fps)
+        self.jitter = float(jitter)
+        self.dtype = np.uint8 if self.bit_depth <= 8 else np.uint16
+        self._exposure_time = 1000.0
+        self._counter = 0
+        self._next_frame_time = time.monotonic()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._frames = self._make_frames(max(1, variants), seed)
+        self.closed = False
+
+    def _make_frames(self, variants: int, seed: int):
+        # A gradient with a bright spot and sensor noise: compresses like real data
+        rng = np.random.default_rng(seed)
+        max_value = 2 ** self.bit_depth - 1
+        y, x = np.mgrid[0:self.height, 0:self.width]
+        frames = []
+        for i in range(variants):
+            cx = self.width * (0.3 + 0.4 * i / variants)
+            spot = np.exp(-((x - cx) ** 2 + (y - self.height / 2) ** 2) / (0.02 * self.width ** 2))
+            image = 0.2 * x / max(1, self.width - 1) + 0.7 * spot
+            image += rng.normal(0.0, 0.02, image.shape)
+            frames.append((np.clip(image, 0.0, 1.0) * max_value).astype(self.dtype))
+        return frames
+
+    def _wait_next_frame(self) -> int:
+        with self._lock:
+            interval = 1.0 / self.fps
+            if self.jitter:
+                interval = max(0.0, self._random.gauss(interval, self.jitter * interval))
+            self._next_frame_time = max(self._next_frame_time + interval, time.monotonic())
+            due = self._next_frame_time
+            self._counter += 1
+            counter = self._counter
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        return counter
+
+    def getFutureFrames(self, n: int = 1, timeoutInSec: float = None) -> SimulatedFrame:
+        if self.closed:
+            raise ConnectionError("Simulated camera is closed.")
+        counters = [self._wait_next_frame() for _ in range(int(n))]
+        arrays = [self._frames[c % len(self._frames)] for c in counters]
+        array = arrays[0] if n == 1 else np.stack(arrays, axis=-1)
+        return SimulatedFrame(array, counters[-1], time.time())
+
+    def exposureTime(self) -> float:
+        return self._exposure_time
+
+    def setExposureTime(self, exposure_time: float):
+        self._exposure_time = float(exposure_time)
+
+    def close(self):
+        self.closed = True
+
+
+class SimulatedMotor:
+    """
+    Motor with the fastlabio.motor API and realistic timing.
+
+    Every command costs command_latency seconds of round trip. move_motor()
+    returns once the command is accepted, and the position then moves
+    towards the target at the current speed (units per second), as seen by
+    get_motor_position().
+    """
+
+    def __init__(self, position: float = 0.0, speed: float = 10.0,
+                 command_latency: float = 0.005):
+        self.speed = float(speed)
+        self.command_latency = float(command_latency)
+        self._start_position = float(position)
+        self._target = float(position)
+        self._move_started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _position_at(self, now: float) -> float:
+        distance = self._target - self._start_position
+        travelled = self.speed * (now - self._move_started)
+        if travelled >= abs(distance):
+            return self._target
+        return self._start_position + travelled * (1 if distance > 0 else -1)
+
+    def move_motor(self, position: float):
+        time.sleep(self.command_latency)
+        with self._lock:
+            now = time.monotonic()
+            self._start_position = self._position_at(now)
+            self._target = float(position)
+            self._move_started = now
+
+    def get_motor_position(self) -> float:
+        time.sleep(self.command_latency)
+        with self._lock:
+            return self._position_at(time.monotonic())
+
+    def set_motor_speed(self, speed: float):
+        time.sleep(self.command_latency)
+        with self._lock:
+            now = time.monotonic()
+            self._start_position = self._position_at(now)
+            self._move_started = now
+            self.speed = float(speed)
+
+    def is_moving(self) -> bool:
+        with self._lock:
+            return self._position_at(time.monotonic()) != self._target
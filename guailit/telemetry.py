@@ -0,0 +1,145 @@
+# Path: guailit/telemetry.py
+# -*- coding: utf-8 -*-
+"""
+Live motor telemetry for the guailit library.
+
+A MotorPoller reads the motor position in a background thread at a fixed
+rate and stores (timestamp, position) samples in a TimeSeriesBuffer, a
+fixed-size numpy ring. minmax_decimate() reduces hours of history to a few
+hundred points for plotting while keeping every peak visible.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import threading
+import time
+
+import numpy as np
+
+
+class TimeSeriesBuffer:
+    """
+    Fixed-capacity ring of (timestamp, value) samples backed by one float64 array.
+    """
+
+    def __init__(self, capacity: int = 100_000):
+        if capacity < 1:
+            raise ValueError("TimeSeriesBuffer capacity must be positive.")
+        self.capacity = capacity
+        self._data = np.empty((capacity, 2), dtype=np.float64)
+        self._count = 0 # Total number of samples ever appended
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    def append(self, timestamp: float, value: float):
+        with self._lock:
+            self._data[self._count % self.capacity] = (timestamp, value)
+            self._count += 1
+
+    def latest(self):
+        """
+        Return the newest (timestamp, value) sample, or None if empty.
+        """
+        with self._lock:
+            if self._count == 0:
+                return None
+            timestamp, value = self._data[(self._count - 1) % self.capacity]
+            return float(timestamp), float(value)
+
+    def snapshot(self):
+        """
+        Return copies of the timestamps and values, oldest first.
+        """
+        with self._lock:
+            if self._count <= self.capacity:
+                data = self._data[:self._count].copy()
+            else:
+                start = self._count % self.capacity
+                data = np.concatenate((self._data[start:], self._data[:start]))
+        return data[:, 0], data[:, 1]
+
+
+def minmax_decimate(t: np.ndarray, y: np.ndarray, buckets: int = 500):
+    """
+    Reduce a time series to the minimum and maximum of each of `buckets`
+    equal-size buckets, returned in time order.
+
+    The output has at most 2 * buckets points. Series that are already that
+    short are returned unchanged. The oldest len(y) % buckets samples are
+    dropped so that all buckets have the same size.
+    """
+    n = len(y)
+    if n <= 2 * buckets:
+        return t, y
+    size = n // buckets
+    offset = n - size * buckets
+    blocks = y[offset:].reshape(buckets, size)
+    # Position of the min and the max inside each bucket, in time order
+    inner = np.sort(np.stack((blocks.argmin(axis=1), blocks.argmax(axis=1)), axis=1), axis=1)
+    indices = (inner + offset + size * np.arange(buckets)[:, None]).ravel()
+    return t[indices], y[indices]
+
+
+class MotorPoller:
+    """
+    Poll read_position() at rate_hz in a background thread.
+
+    Read errors are counted and kept in last_error, and polling goes on so
+    that a short glitch does not stop the telemetry. The poller stops by
+    itself when nobody called touch() for idle_timeout seconds.
+    """
+
+    def __init__(self, read_position, rate_hz: float = 10.0, capacity: int = 100_000,
+                 idle_timeout: float = 60.0):
+        self.read_position = read_position
+        self.rate_hz = rate_hz
+        self.idle_timeout = idle_timeout
+        self.buffer = TimeSeriesBuffer(capacity)
+        self.errors = 0
+        self.last_error = None
+        self._last_touch = time.monotonic()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def touch(self):
+        """
+        Tell the poller that somebody is still watching.
+        """
+        self._last_touch = time.monotonic()
+
+    def start(self):
+        self.touch()
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="guailit-motor-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        next_poll = time.monotonic()
+        while not self._stop_event.is_set():
+            if time.monotonic() - self._last_touch > self.idle_timeout:
+                break
+            try:
+                position = self.read_position()
+                self.buffer.append(time.time(), float(position))
+            except Exception as e:
+                self.errors += 1
+                self.last_error = e
+            # Fixed schedule, so slow reads do not make the rate drift
+            next_poll = max(next_poll + 1.0 / self.rate_hz, time.monotonic())
+            self._stop_event.wait(max(0.0, next_poll - time.monotonic()))
@@ -102,6 +102,11 @@ setup(name=NAME,
           'fastlabio',
           # TODO: Add any other dependencies guailit might have besides fastlabio
       ],
+      extras_require={
+          # Clients of the bench dashboard's real device backends
+          'pysilico': ['pysilico>=0.22'],
+          'plico_motor': ['plico_motor>=0.0.5'],
+      },
       include_package_data=True,
       test_suite='tests', # Assuming tests are in a 'tests' directory
       cmdclass={'upload': UploadCommand, },
@@ -0,0 +1,129 @@
+# Path: guailit/tests/test_analytics.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the live image analytics and autofocus.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import time
+
+import numpy as np
+import pytest
+
+from guailit.analytics import (FrameAnalyzer, autofocus, focus_score, frame_statistics, full_scale,
+                               peak_position)
+from guailit.connections import DevicePool
+from guailit.encoding import JpegEncoder
+from guailit.publisher import FramePublisher
+from guailit.simulated import SimulatedCamera, SimulatedFrame
+
+
+def blurred(pattern: np.ndarray, radius: int) -> np.ndarray:
+    # Box blur along both axes, wrapping at the edges
+    out = pattern.astype(np.float64)
+    for axis in (0, 1):
+        out = sum(np.roll(out, shift, axis) for shift in range(-radius, radius + 1)) / (2 * radius + 1)
+    return out.astype(np.uint16)
+
+
+class FocusRig:
+    """
+    Motor and camera whose frames are sharpest at motor position focus.
+    """
+
+    def __init__(self, focus: float):
+        self.focus = focus
+        self.position = 0.0
+        rng = np.random.default_rng(0)
+        self.pattern = rng.integers(0, 4096, size=(96, 128)).astype(np.uint16)
+
+    def move_motor(self, position: float):
+        self.position = position
+
+    def get_motor_position(self) -> float:
+        return self.position
+
+    def getFutureFrames(self, n: int = 1, timeoutInSec: float = None):
+        radius = int(round(abs(self.position - self.focus) * 10))
+        return SimulatedFrame(blurred(self.pattern, radius), 0, time.time())
+
+
+def test_frame_statistics_on_a_known_frame():
+    frame = np.zeros((64, 64), dtype=np.uint8)
+    frame[:32, :32] = 255 # A quarter saturated
+    frame[32:, :] = 100
+    stats = frame_statistics(frame, step=2, bins=16)
+    assert stats.saturated_fraction == pytest.approx(0.25)
+    assert stats.max == 255.0 and stats.full_scale == 255.0
+    assert stats.mean == pytest.approx((255 * 0.25 + 100 * 0.5))
+    assert stats.histogram.sum() == 32 * 32
+    assert stats.histogram[-1] == 256 and stats.histogram[100 * 16 // 256] == 512
+    # 12 bit data in 16 bit words
+    assert frame_statistics(np.full((8, 8), 4095, dtype=np.uint16), bit_depth=12).saturated_fraction == 1.0
+    assert frame_statistics(np.full((8, 8), 1000, dtype=np.uint16), bit_depth=12).saturated_fraction == 0.0
+
+def test_dark_frames_are_not_reported_saturated():
+    dark = np.zeros((64, 64), dtype=np.uint16)
+    dark[::2, ::2] = 255 # A 12 bit camera, under-exposed
+    stats = frame_statistics(dark, step=1, bins=16)
+    assert stats.full_scale == 65535.0 and stats.saturated_fraction == 0.0
+    assert stats.histogram[0] == 64 * 64
+
+def test_full_scale_follows_the_bit_depth():
+    assert full_scale(np.zeros(4, dtype=np.uint8)) == 255.0
+    assert full_scale(np.array([0, 3000], dtype=np.uint16)) == 65535.0
+    assert full_scale(np.array([0, 3000], dtype=np.uint16), bit_depth=14) == 16383.0
+    assert full_scale(np.array([0, 3000], dtype=np.uint16), from_peak=True) == 4095.0
+    assert full_scale(np.array([0.0, 2.5])) == 2.5
+
+def test_statistics_of_negative_and_nan_pixels():
+    stats = frame_statistics(np.array([[-1, 2]], dtype=np.int16), step=1, bins=4)
+    assert stats.histogram.sum() == 2 and stats.histogram[0] == 2
+    stats = frame_statistics(np.array([[np.nan, 0.5], [1.0, np.nan]]), step=1, bins=2)
+    assert stats.histogram.tolist() == [0, 2] and stats.mean == 0.75 # 1.0 is the full scale
+    stats = frame_statistics(np.full((4, 4), np.nan), step=1)
+    assert stats.histogram.sum() == 0 and stats.saturated_fraction == 0.0
+
+def test_focus_score_drops_with_blur():
+    pattern = FocusRig(0.0).pattern
+    scores = [focus_score(blurred(pattern, radius)) for radius in (0, 1, 2, 4)]
+    assert scores == sorted(scores, reverse=True)
+    assert focus_score(np.full((32, 32), 7, dtype=np.uint16)) == 0.0
+
+def test_peak_position_is_refined_between_samples():
+    positions = np.linspace(0.0, 1.0, 11)
+    scores = -(positions - 0.43) ** 2
+    assert peak_position(positions, scores) == pytest.approx(0.43)
+    assert peak_position([0.0, 1.0], [2.0, 1.0]) == 0.0 # Peak at the edge
+    with pytest.raises(ValueError):
+        peak_position([], [])
+
+def test_autofocus_moves_to_the_sharpest_position():
+    rig = FocusRig(focus=0.6)
+    result = autofocus(rig, rig, np.linspace(0.0, 1.0, 11))
+    assert len(result.scores) == 11
+    assert result.best_position == pytest.approx(0.6, abs=0.05)
+    assert rig.position == result.best_position
+
+def test_analyzer_follows_publisher_off_the_display_path():
+    camera = SimulatedCamera(64, 48, bit_depth=12, fps=100.0)
+    publisher = FramePublisher(DevicePool("camera", lambda: camera), JpegEncoder())
+    analyzer = FrameAnalyzer(publisher.raw_snapshot, rate_hz=20.0)
+    assert analyzer.analyze_once() is None # Not acquiring yet
+    mailbox = publisher.subscribe()
+    analyzer.start()
+    try:
+        deadline = time.monotonic() + 2.0
+        while analyzer.frames_analyzed < 3 and time.monotonic() < deadline:
+            mailbox.get(0.1)
+        assert analyzer.last_error is None
+        assert analyzer.stats is not None and 0 < analyzer.stats.mean < analyzer.stats.full_scale
+        assert len(analyzer.focus_history) == analyzer.frames_analyzed
+        # Analyzed at the analyzer rate, not the acquisition rate
+        assert analyzer.frames_analyzed < publisher.frames_acquired
+    finally:
+        analyzer.stop()
+        publisher.stop()
@@ -0,0 +1,79 @@
+# Path: guailit/tests/test_averaging.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for frame averaging.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import numpy as np
+import pytest
+
+from guailit.averaging import FrameAverager, grab_average, split_frame_stack
+from guailit.simulated import SimulatedCamera
+
+
+def test_sliding_mean_covers_the_last_window_frames():
+    averager = FrameAverager("mean", window=3)
+    assert averager.mean() is None
+    for value in (1, 2, 3, 10):
+        averager.add(np.full((4, 5), value, dtype=np.uint16))
+    mean = averager.mean()
+    assert mean.dtype == np.float32
+    assert np.allclose(mean, (2 + 3 + 10) / 3)
+    assert averager.count == 3
+
+def test_updates_are_in_place():
+    averager = FrameAverager("mean", window=4)
+    averager.add(np.zeros((8, 8), dtype=np.uint8))
+    accumulator = averager._accumulator
+    for _ in range(10):
+        averager.add(np.ones((8, 8), dtype=np.uint8))
+    assert averager._accumulator is accumulator
+    assert averager.mean() is averager.mean() # Reused output buffer
+
+def test_exponential_moving_average():
+    averager = FrameAverager("ema", alpha=0.5)
+    averager.add(np.zeros((2, 2), dtype=np.uint16))
+    averager.add(np.full((2, 2), 100, dtype=np.uint16))
+    averager.add(np.full((2, 2), 100, dtype=np.uint16))
+    assert np.allclose(averager.mean(), 75.0)
+
+def test_shape_change_restarts_the_average():
+    averager = FrameAverager("mean", window=4)
+    averager.add(np.full((2, 2), 5, dtype=np.uint8))
+    averager.add(np.full((3, 3), 7, dtype=np.uint8))
+    assert averager.count == 1
+    assert np.allclose(averager.mean(), 7.0)
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        FrameAverager("median")
+
+def test_split_frame_stack_handles_both_result_layouts():
+    camera = SimulatedCamera(16, 12, bit_depth=12, fps=1000)
+    frames = split_frame_stack(camera.getFutureFrames(3), 3)
+    assert len(frames) == 3 and frames[0].shape == (12, 16)
+    listed = split_frame_stack([camera.getFutureFrames(1), camera.getFutureFrames(1)], 2)
+    assert len(listed) == 2
+    with pytest.raises(ValueError):
+        split_frame_stack(camera.getFutureFrames(2), 3)
+
+def test_grab_average_uses_one_batched_call(tmp_path):
+    camera = SimulatedCamera(32, 24, bit_depth=12, fps=1000, variants=2)
+    calls = []
+    original = camera.getFutureFrames
+    camera.getFutureFrames = lambda n: calls.append(n) or original(n)
+    average = grab_average(camera, 4)
+    assert calls == [4]
+    expected = np.mean([camera._frames[i % 2] for i in range(1, 5)], axis=0)
+    assert np.allclose(average, expected)
+
+    averager = FrameAverager("mean", window=4)
+    averager.add_stack([camera._frames[0], camera._frames[1]])
+    path = averager.save(str(tmp_path / "average"))
+    saved = np.load(path)
+    assert saved.dtype == np.float32
+    assert np.allclose(saved, (camera._frames[0].astype(np.float32) + camera._frames[1]) / 2)
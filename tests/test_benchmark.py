@@ -0,0 +1,67 @@
+# Path: guailit/tests/test_benchmark.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the simulated devices and the offline benchmark harness.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import json
+import time
+
+import numpy as np
+import pytest
+
+from guailit import benchmark
+from guailit.simulated import SimulatedCamera, SimulatedMotor
+
+
+def test_simulated_camera_frames():
+    camera = SimulatedCamera(width=32, height=16, bit_depth=12, fps=200.0)
+    frame = camera.getFutureFrames(1).toNumpyArray()
+    assert frame.shape == (16, 32)
+    assert frame.dtype == np.uint16
+    assert frame.max() < 2 ** 12
+    assert camera.getFutureFrames(3).toNumpyArray().shape == (16, 32, 3)
+
+def test_simulated_camera_frame_rate():
+    camera = SimulatedCamera(width=8, height=8, fps=100.0)
+    start = time.monotonic()
+    for _ in range(10):
+        camera.getFutureFrames(1)
+    assert time.monotonic() - start >= 0.08
+
+def test_simulated_camera_close():
+    camera = SimulatedCamera(width=8, height=8)
+    camera.close()
+    with pytest.raises(ConnectionError):
+        camera.getFutureFrames(1)
+
+def test_simulated_motor_moves_at_speed():
+    motor = SimulatedMotor(speed=100.0, command_latency=0.0)
+    motor.move_motor(5.0)
+    assert motor.is_moving()
+    assert motor.get_motor_position() < 5.0
+    time.sleep(0.06)
+    assert motor.get_motor_position() == 5.0
+    assert not motor.is_moving()
+
+def test_benchmark_reports_machine_readable_results(tmp_path):
+    pytest.importorskip("cv2")
+    output = tmp_path / "run.json"
+    status = benchmark.main(["--width", "64", "--height", "48", "--fps", "100",
+                             "--duration", "0.3", "--viewers", "2", "--moves", "2",
+                             "--motor-latency", "0", "--json", str(output)])
+    assert status == 0
+    results = json.loads(output.read_text())
+    assert results["stream"]["frames_delivered"] > 0
+    assert results["stream"]["latency_ms"]["p99"] is not None
+    assert "move_command_ms" in results["motor"]
+
+def test_compare_results_flags_regressions():
+    baseline = {"stream": {"delivered_fps": 30.0, "latency_ms": {"p99": 10.0}}}
+    current = {"stream": {"delivered_fps": 20.0, "latency_ms": {"p99": 10.5}}}
+    regressions = benchmark.compare_results(baseline, current, tolerance=0.1)
+    assert [r["metric"] for r in regressions] == ["stream.delivered_fps"]
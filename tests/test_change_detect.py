@@ -0,0 +1,52 @@
+# Path: guailit/tests/test_change_detect.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the change detector of the live view.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import numpy as np
+
+from guailit.change_detect import ChangeDetector
+
+
+def test_static_frames_are_skipped_until_keep_alive():
+    detector = ChangeDetector(keep_alive=1.0)
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 200, (480, 640), dtype=np.uint8)
+    assert detector.should_send(frame, now=0.0)
+    # Sensor noise of a couple of counts is not a change
+    noisy = (frame + rng.integers(0, 3, frame.shape)).astype(np.uint8)
+    assert not detector.should_send(noisy, now=0.5)
+    assert detector.should_send(noisy, now=1.0) # Keep-alive
+    assert (detector.frames_sent, detector.frames_skipped) == (2, 1)
+
+def test_small_local_change_is_sent():
+    detector = ChangeDetector(step=8)
+    frame = np.zeros((480, 640), dtype=np.uint8)
+    assert detector.should_send(frame, now=0.0)
+    moved = frame.copy()
+    moved[100:132, 200:232] = 255 # A 32x32 spot appears
+    assert detector.should_send(moved, now=0.1)
+    assert 0 < detector.last_score < 0.01
+    # The changed frame is the new reference
+    assert not detector.should_send(moved, now=0.2)
+
+def test_twelve_bit_frames_use_sensor_full_scale():
+    detector = ChangeDetector(noise=0.02)
+    frame = np.full((64, 64), 2000, dtype=np.uint16)
+    frame[0, 0] = 4000
+    assert detector.should_send(frame, now=0.0)
+    # 20 counts is 0.5% of 4095: noise; 200 counts is well above it
+    assert not detector.should_send(frame + 20, now=0.1)
+    assert detector.should_send(frame + 200, now=0.2)
+
+def test_format_change_and_reset_force_a_send():
+    detector = ChangeDetector()
+    assert detector.should_send(np.zeros((64, 64), dtype=np.uint8), now=0.0)
+    assert detector.should_send(np.zeros((32, 32), dtype=np.uint8), now=0.1)
+    detector.reset()
+    assert detector.should_send(np.zeros((32, 32), dtype=np.uint8), now=0.2)
@@ -0,0 +1,70 @@
+# Path: guailit/tests/test_connections.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the pooled device connections.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from guailit.connections import DevicePool
+
+
+def make_pool(**kwargs):
+    connect = MagicMock(side_effect=lambda: MagicMock())
+    return DevicePool("camera", connect, **kwargs), connect
+
+def test_handles_are_reused():
+    pool, connect = make_pool()
+    with pool.lease() as first:
+        pass
+    with pool.lease() as second:
+        pass
+    assert first is second
+    assert connect.call_count == 1
+    assert pool.open_handles == 1
+
+def test_open_handles_are_capped():
+    pool, _ = make_pool(max_handles=2)
+    a = pool.acquire()
+    b = pool.acquire()
+    with pytest.raises(ConnectionError):
+        pool.acquire(timeout=0.01)
+    pool.release(a)
+    assert pool.acquire(timeout=0.01) is a
+    pool.release(b)
+
+def test_broken_handle_is_closed_and_replaced():
+    pool, connect = make_pool()
+    with pytest.raises(RuntimeError):
+        with pool.lease() as handle:
+            raise RuntimeError("device error")
+    handle.close.assert_called_once()
+    assert pool.open_handles == 0
+    assert pool.acquire() is not handle
+    assert connect.call_count == 2
+
+def test_stale_idle_handle_is_probed():
+    probe = MagicMock(side_effect=RuntimeError("dead"))
+    pool, connect = make_pool(probe=probe, probe_interval=0.0)
+    handle = pool.acquire()
+    pool.release(handle)
+    assert pool.acquire() is not handle
+    probe.assert_called_once_with(handle)
+    assert connect.call_count == 2
+    assert pool.open_handles == 1
+
+def test_failed_connect_backs_off():
+    connect = MagicMock(return_value=None)
+    pool = DevicePool("camera", connect, backoff_initial=60.0)
+    with pytest.raises(ConnectionError):
+        pool.acquire()
+    with pytest.raises(ConnectionError, match="retrying in"):
+        pool.acquire()
+    assert connect.call_count == 1 # The second attempt did not hit the server
+    assert pool.open_handles == 0
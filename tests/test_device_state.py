@@ -0,0 +1,87 @@
+# Path: guailit/tests/test_device_state.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the camera settings mirror.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import threading
+import time
+
+import pytest
+
+from guailit.device_state import CameraStateMirror
+from guailit.runtime import AsyncCamera, DeviceRuntime
+
+
+class FakeCameraModule:
+    """
+    fastlabio.camera stand-in recording the calls and their threads.
+    """
+
+    def __init__(self, fail_gain: bool = False):
+        self.calls = []
+        self.threads = set()
+        self.fail_gain = fail_gain
+
+    def set_exposure(self, exposure_time):
+        self.calls.append(("set_exposure", exposure_time))
+        self.threads.add(threading.get_ident())
+
+    def set_gain(self, gain_value):
+        self.threads.add(threading.get_ident())
+        if self.fail_gain:
+            raise ConnectionError("camera server down")
+        self.calls.append(("set_gain", gain_value))
+
+
+@pytest.fixture
+def runtime():
+    runtime = DeviceRuntime(max_workers=2)
+    yield runtime
+    runtime.stop()
+
+def test_changed_settings_are_applied_in_one_job(runtime):
+    module = FakeCameraModule()
+    mirror = CameraStateMirror()
+    applied = mirror.apply(runtime, AsyncCamera(runtime, lambda: module, None), {"exposure": 100.0, "gain": 2.0})
+    assert applied == {"exposure": 100.0, "gain": 2.0}
+    assert module.calls == [("set_exposure", 100.0), ("set_gain", 2.0)]
+    assert len(module.threads) == 1 # Both writes in one executor job
+    assert mirror.snapshot() == {"exposure": 100.0, "gain": 2.0}
+
+def test_unchanged_settings_are_skipped(runtime):
+    module = FakeCameraModule()
+    mirror = CameraStateMirror()
+    async_camera = AsyncCamera(runtime, lambda: module, None)
+    mirror.apply(runtime, async_camera, {"exposure": 100.0, "gain": 2.0})
+    assert mirror.apply(runtime, async_camera, {"exposure": 100.0, "gain": 2.0}) == {}
+    assert mirror.apply(runtime, async_camera, {"exposure": 100.0, "gain": 3.0}) == {"gain": 3.0}
+    assert module.calls[2:] == [("set_gain", 3.0)]
+    assert mirror.writes_sent == 3 and mirror.writes_skipped == 3
+
+def test_expired_settings_are_written_again(runtime):
+    module = FakeCameraModule()
+    mirror = CameraStateMirror(ttl=0.05)
+    async_camera = AsyncCamera(runtime, lambda: module, None)
+    mirror.apply(runtime, async_camera, {"exposure": 100.0})
+    time.sleep(0.1)
+    assert mirror.get("exposure") is None
+    value, age = mirror.last_written()["exposure"] # Still shown, with its age
+    assert value == 100.0 and age >= 0.1
+    assert mirror.apply(runtime, async_camera, {"exposure": 100.0}) == {"exposure": 100.0}
+    assert len(module.calls) == 2
+
+def test_failed_write_is_forgotten(runtime):
+    module = FakeCameraModule(fail_gain=True)
+    mirror = CameraStateMirror()
+    mirror.record("gain", 1.0)
+    with pytest.raises(ConnectionError):
+        mirror.apply(runtime, AsyncCamera(runtime, lambda: module, None), {"exposure": 50.0, "gain": 4.0})
+    # The exposure went through; the gain is unknown now
+    assert mirror.snapshot() == {"exposure": 50.0}
+    with pytest.raises(KeyError):
+        mirror.changes({"offset": 1})
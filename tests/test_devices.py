@@ -0,0 +1,107 @@
+# Path: guailit/tests/test_devices.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the multi-device configuration and registry.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import inspect
+import json
+import time
+
+import pytest
+
+from guailit.benchmark import benchmark_cameras
+from guailit.devices import (CameraConfig, DeviceRegistry, MotorConfig, PlicoMotorAdapter, connect_motor,
+                             load_device_config, parse_device_config, save_device_config)
+from guailit.simulated import SimulatedCamera
+
+
+def test_parse_device_config_defaults_and_validation():
+    cameras, motors = parse_device_config({
+        "cameras": [{"name": "top", "host": "lab", "port": "7100"}],
+        "motors": [{"name": "x", "host": "lab", "port": 7300}, {"name": "y", "host": "lab", "port": 7300, "axis": 2}],
+    })
+    assert cameras == [CameraConfig("top", "lab", 7100, "pysilico")]
+    assert [(m.name, m.axis, m.backend) for m in motors] == [("x", 1, "plico_motor"), ("y", 2, "plico_motor")]
+    with pytest.raises(ValueError):
+        parse_device_config({"cameras": [{"name": "a", "host": "h", "port": 1}, {"name": "a", "host": "h", "port": 2}]})
+    with pytest.raises(ValueError):
+        parse_device_config({"cameras": [{"name": "a", "host": "h", "port": 1, "backend": "usb"}]})
+    with pytest.raises(ValueError):
+        parse_device_config({"motors": [{"name": "x", "port": 1}]})
+
+def test_device_config_round_trip(tmp_path, monkeypatch):
+    path = tmp_path / "devices.json"
+    assert load_device_config(str(path)) == ([], [])
+    cameras = [CameraConfig("top", "lab", 7100, "simulated")]
+    motors = [MotorConfig("x", "lab", 7300, 1, "simulated")]
+    save_device_config(str(path), cameras, motors)
+    assert json.loads(path.read_text())["cameras"][0]["name"] == "top"
+    monkeypatch.setenv("GUAILIT_DEVICES", str(path))
+    assert load_device_config() == (cameras, motors)
+
+def test_plico_motor_adapter():
+    class Client:
+        def __init__(self):
+            self.calls = []
+        def move_to(self, position):
+            self.calls.append(("move_to", position))
+        def position(self):
+            return 3.0
+        def set_velocity(self, velocity):
+            self.calls.append(("set_velocity", velocity))
+
+    client = Client()
+    adapter = PlicoMotorAdapter(client)
+    adapter.move_motor(1.5)
+    adapter.set_motor_speed(2.0)
+    assert adapter.get_motor_position() == 3.0
+    assert client.calls == [("move_to", 1.5), ("set_velocity", 2.0)]
+
+def test_clients_match_the_published_apis():
+    pytest.importorskip("plico_motor")
+    pysilico = pytest.importorskip("pysilico")
+    # plico_motor connects on the first request, so no server is needed here
+    motor = connect_motor(MotorConfig("x", "localhost", 7300, 2))
+    assert isinstance(motor, PlicoMotorAdapter)
+    assert all(callable(getattr(motor.client, name)) for name in ("move_to", "position", "set_velocity"))
+    # pysilico.camera() waits for the server, so only its signature is checked
+    assert list(inspect.signature(pysilico.camera).parameters) == ["hostname", "port"]
+
+def test_registry_per_device_resources():
+    registry = DeviceRegistry([CameraConfig("a", "h", 1, "simulated"), CameraConfig("b", "h", 2, "simulated")],
+                              [MotorConfig("x", "h", 3, 1, "simulated"), MotorConfig("y", "h", 3, 2, "simulated")])
+    assert registry.camera_pool("a") is registry.camera_pool("a")
+    assert registry.camera_pool("a") is not registry.camera_pool("b")
+    with registry.camera_pool("a").lease() as camera_instance:
+        assert camera_instance.getFutureFrames(1).toNumpyArray().shape == (480, 640)
+    assert registry.motor("x") is not registry.motor("y")
+    registry.motor_queue("x").move(2.0).result(timeout=5)
+    assert registry.motor("x")._target == 2.0
+    assert registry.motor("y")._target == 0.0
+    with pytest.raises(KeyError):
+        registry.motor_queue("z")
+
+def test_registry_configure_drops_changed_devices():
+    registry = DeviceRegistry([CameraConfig("a", "h", 1, "simulated")], [MotorConfig("x", "h", 3, 1, "simulated")])
+    pool = registry.camera_pool("a")
+    queue = registry.motor_queue("x")
+    registry.configure([CameraConfig("a", "h", 1, "simulated")], [MotorConfig("x", "h", 4, 1, "simulated")])
+    assert registry.camera_pool("a") is pool # Unchanged
+    assert registry.motor_queue("x") is not queue # Moved to another port
+    assert not queue._thread.is_alive()
+    registry.configure([], [])
+    with pytest.raises(KeyError):
+        registry.camera_pool("a")
+
+def test_multi_camera_throughput_scales():
+    pytest.importorskip("cv2")
+    one = benchmark_cameras([SimulatedCamera(64, 48, 8, fps=50.0)], duration=0.5)
+    four = benchmark_cameras([SimulatedCamera(64, 48, 8, fps=50.0, seed=i) for i in range(4)], duration=0.5)
+    assert four["cameras"] == 4
+    # Cameras are acquired in parallel, not one after the other
+    assert four["total_acquired_fps"] > 3 * one["total_acquired_fps"]
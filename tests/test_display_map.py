@@ -0,0 +1,63 @@
+# Path: guailit/tests/test_display_map.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the high bit depth to 8-bit display mapping.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import numpy as np
+
+from guailit.display_map import DisplayMapper, build_lut, full_range_window, percentile_window
+
+
+def test_build_lut_maps_window_linearly():
+    lut = build_lut(100, 355, 1 << 16)
+    assert lut.dtype == np.uint8
+    assert (lut[0], lut[100], lut[355], lut[60000]) == (0, 0, 255, 255)
+    assert lut[228] in (127, 128)
+
+def test_sixteen_bit_mapping_matches_the_table_and_reuses_the_buffer():
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 4096, (120, 160), dtype=np.uint16)
+    mapper = DisplayMapper(window=full_range_window(12))
+    out = mapper(frame)
+    assert out.dtype == np.uint8
+    assert np.array_equal(out, build_lut(0, 4095, 1 << 16)[frame])
+    assert mapper(frame) is out # No allocation once the buffers exist
+
+def test_eight_bit_full_range_is_passed_through():
+    frame = np.arange(256, dtype=np.uint8).reshape(16, 16)
+    assert DisplayMapper(window=(0, 255))(frame) is frame
+    stretched = DisplayMapper(window=(0, 127))(frame)
+    assert stretched.max() == 255 and stretched[0, 0] == 0
+
+def test_percentile_window_uses_a_histogram():
+    sample = np.arange(1000, dtype=np.uint16)
+    black, white = percentile_window(sample, 1.0, 99.0)
+    assert abs(black - 10) <= 1 and abs(white - 990) <= 1
+    black, white = percentile_window(sample.astype(np.float64), 1.0, 99.0)
+    assert abs(black - 10) <= 1 and abs(white - 990) <= 1
+
+def test_percentile_window_of_an_empty_sample_is_the_full_range():
+    assert percentile_window(np.zeros((0, 8), dtype=np.float32), 1.0, 99.0) == (0.0, 1.0)
+    assert percentile_window(np.full((4, 4), np.nan), 1.0, 99.0) == (0.0, 1.0)
+    assert percentile_window(np.zeros(0, dtype=np.uint16), 1.0, 99.0) == (0, 65535)
+    black, white = percentile_window(np.array([np.nan, 1.0, 2.0, 3.0]), 0.0, 100.0)
+    assert (black, white) == (1.0, 3.0) # NaN left out
+
+def test_auto_contrast_follows_content_with_hysteresis():
+    rng = np.random.default_rng(1)
+    frame = rng.integers(1000, 2000, (256, 256), dtype=np.uint16)
+    mapper = DisplayMapper(step=4)
+    out = mapper(frame)
+    assert out.min() == 0 and out.max() == 255
+    window = mapper.window
+    # Fresh noise does not move the window
+    mapper(rng.integers(1000, 2000, (256, 256), dtype=np.uint16))
+    assert mapper.window == window
+    # A brighter scene does
+    mapper(frame + 1500)
+    assert mapper.window[0] > window[0] + 1000
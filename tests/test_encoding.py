@@ -0,0 +1,59 @@
+# Path: guailit/tests/test_encoding.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the frame encoders.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import numpy as np
+import pytest
+
+from guailit.encoding import (JpegEncoder, PngEncoder, RawEncoder,
+                              describe_encoded_frame, make_encoder)
+
+pytest.importorskip("cv2")
+
+
+@pytest.fixture
+def frame():
+    return (np.arange(48 * 64, dtype=np.uint32).reshape(48, 64) % 256).astype(np.uint8)
+
+def test_jpeg_encoder_reports_cost(frame):
+    encoded = JpegEncoder(quality=70).encode(frame, seq=3, timestamp=12.5)
+    assert encoded.format == "JPEG"
+    assert encoded.data[:2] == b"\xff\xd8" # JPEG start of image marker
+    assert encoded.nbytes == len(encoded.data)
+    assert (encoded.width, encoded.height) == (64, 48)
+    assert encoded.encode_ms >= 0
+    assert (encoded.seq, encoded.timestamp) == (3, 12.5)
+
+def test_png_encoder_is_lossless(frame):
+    import cv2
+    encoded = PngEncoder().encode(frame)
+    assert encoded.format == "PNG"
+    decoded = cv2.imdecode(np.frombuffer(encoded.data, np.uint8), cv2.IMREAD_UNCHANGED)
+    assert np.array_equal(decoded, frame)
+
+def test_raw_encoder_passes_small_frames_through(frame):
+    encoded = RawEncoder().encode(frame)
+    assert encoded.format == "RAW"
+    assert np.array_equal(encoded.data, frame)
+    assert encoded.data is not frame
+    assert encoded.nbytes == frame.nbytes
+
+def test_raw_encoder_falls_back_for_large_frames(frame):
+    encoded = RawEncoder(max_pixels=100).encode(frame)
+    assert encoded.format == "JPEG"
+
+def test_make_encoder():
+    assert isinstance(make_encoder("jpeg", quality=50), JpegEncoder)
+    assert isinstance(make_encoder("PNG"), PngEncoder)
+    with pytest.raises(ValueError):
+        make_encoder("BMP")
+
+def test_describe_encoded_frame(frame):
+    text = describe_encoded_frame(JpegEncoder().encode(frame))
+    assert text.startswith("JPEG 64x48")
@@ -0,0 +1,109 @@
+# Path: guailit/tests/test_grabber.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the background frame grabber.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import time
+
+import numpy as np
+import pytest
+
+from guailit.grabber import FrameGrabber, FrameRingBuffer, frame_from_result
+
+
+class FakeFrame:
+    def __init__(self, array):
+        self._array = array
+
+    def toNumpyArray(self):
+        return self._array
+
+
+class FakeCamera:
+    def __init__(self, shape=(4, 6)):
+        self.shape = shape
+        self.count = 0
+
+    def getFutureFrames(self, n):
+        self.count += 1
+        time.sleep(0.001)
+        return FakeFrame(np.full(self.shape, self.count % 256, dtype=np.uint8))
+
+
+class FailingCamera:
+    def getFutureFrames(self, n):
+        raise RuntimeError("camera disconnected")
+
+
+def test_frame_from_result():
+    frame = FakeFrame(None)
+    assert frame_from_result([frame]) is frame
+    assert frame_from_result(frame) is frame
+    assert frame_from_result([]) is None
+    assert frame_from_result(None) is None
+
+def test_ring_buffer_reuses_preallocated_slots():
+    ring = FrameRingBuffer(size=3)
+    assert ring.latest() is None
+
+    ring.write(np.zeros((2, 2), dtype=np.uint16), timestamp=1.0)
+    slots = ring._frames
+    for i in range(1, 5):
+        seq = ring.write(np.full((2, 2), i, dtype=np.uint16), timestamp=1.0 + i)
+
+    assert seq == 4
+    assert ring._frames is slots # No reallocation for frames of the same format
+    grabbed = ring.latest()
+    assert grabbed.seq == 4
+    assert grabbed.timestamp == 5.0
+    assert np.all(grabbed.frame == 4)
+
+def test_ring_buffer_latest_copy_is_detached():
+    ring = FrameRingBuffer(size=2)
+    ring.write(np.zeros(3, dtype=np.uint8))
+    grabbed = ring.latest(copy=True)
+    ring.write(np.ones(3, dtype=np.uint8))
+    ring.write(np.ones(3, dtype=np.uint8))
+    assert np.all(grabbed.frame == 0)
+
+def test_ring_buffer_wait_for_newer_times_out():
+    ring = FrameRingBuffer()
+    ring.write(np.zeros(3))
+    assert ring.wait_for_newer(0, timeout=0.01) is None
+    assert ring.wait_for_newer(-1, timeout=0.01).seq == 0
+
+def test_ring_buffer_rejects_too_small_size():
+    with pytest.raises(ValueError):
+        FrameRingBuffer(size=1)
+
+def test_frame_grabber_acquires_in_background():
+    grabber = FrameGrabber(FakeCamera())
+    grabber.start()
+    try:
+        grabbed = grabber.buffer.wait_for_newer(5, timeout=2.0)
+    finally:
+        grabber.stop()
+
+    assert not grabber.is_running
+    assert grabbed is not None and grabbed.seq > 5
+    assert grabbed.frame.shape == (4, 6)
+    assert grabber.error is None
+
+def test_frame_grabber_keeps_error_and_stops():
+    grabber = FrameGrabber(FailingCamera())
+    grabber.start()
+    grabber._thread.join(2.0)
+    assert not grabber.is_running
+    assert isinstance(grabber.error, RuntimeError)
+
+def test_frame_grabber_caps_acquisition_rate():
+    grabber = FrameGrabber(FakeCamera(), max_fps=20)
+    grabber.start()
+    time.sleep(0.3)
+    grabber.stop()
+    assert 2 <= grabber.frames_acquired <= 8
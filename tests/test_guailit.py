@@ -10,8 +10,7 @@ __date__ = "2023-10-27" # Placeholder: Update with actual creation date
 
 import pytest
 from unittest.mock import patch, MagicMock
-import io
-from PIL import Image
+import numpy as np
 
 # We need to adjust the path to import modules from the parent directory (guailit)
 import sys
@@ -40,35 +39,41 @@ def mock_fastlabio():
 
         # Configure the mock objects
         mock_motor.get_motor_position.return_value = 10.5
-        # Create a dummy JPEG byte string for camera tests
-        dummy_image = Image.new('RGB', (10, 10), color = 'red')
-        byte_io = io.BytesIO()
-        dummy_image.save(byte_io, 'JPEG')
-        mock_camera.get_single_frame.return_value = byte_io.getvalue()
+        # Frames are grabbed from a pooled pysilico connection of the camera module
+        mock_frame = MagicMock()
+        mock_frame.toNumpyArray.return_value = np.full((10, 10), 200, dtype=np.uint8)
+        mock_camera.get_pysilico_camera_sync.return_value.getFutureFrames.return_value = [mock_frame]
+        # Connections pooled by earlier tests belong to other mocks
+        app.get_camera_pool().close_all()
 
         yield mock_motor, mock_camera, mock_st_write, mock_st_success, mock_st_error, mock_st_info, mock_st_warning, mock_st_image
 
+        app.get_camera_pool().close_all()
+
 # Test motor actions
 def test_move_motor_action(mock_fastlabio):
-    mock_motor, _, mock_st_write, mock_st_success, mock_st_error, _, _, _ = mock_fastlabio
+    mock_motor, _, mock_st_write, mock_st_success, mock_st_error, mock_st_info, _, _ = mock_fastlabio
     
     test_position = 20.0
-    app.move_motor_action(test_position)
+    # The command is queued: wait for it to be sent
+    app.move_motor_action(test_position).result(timeout=5)
     
     mock_motor.move_motor.assert_called_once_with(test_position)
     mock_st_write.assert_called_once_with(f"Attempting to move motor to {test_position}...")
-    mock_st_success.assert_called_once_with(f"Motor move command sent for position: {test_position}")
+    mock_st_info.assert_called_once_with(f"Motor move command queued for position: {test_position}")
+    mock_st_success.assert_not_called() # Not sent yet when the action returns
     mock_st_error.assert_not_called()
 
 def test_set_motor_speed_action(mock_fastlabio):
-    mock_motor, _, mock_st_write, mock_st_success, mock_st_error, _, _, _ = mock_fastlabio
+    mock_motor, _, mock_st_write, mock_st_success, mock_st_error, mock_st_info, _, _ = mock_fastlabio
     
     test_speed = 5.0
-    app.set_motor_speed_action(test_speed)
+    app.set_motor_speed_action(test_speed).result(timeout=5)
     
     mock_motor.set_motor_speed.assert_called_once_with(test_speed)
     mock_st_write.assert_called_once_with(f"Attempting to set motor speed to {test_speed}...")
-    mock_st_success.assert_called_once_with(f"Motor speed set to: {test_speed}")
+    mock_st_info.assert_called_once_with(f"Motor speed change queued: {test_speed}")
+    mock_st_success.assert_not_called()
     mock_st_error.assert_not_called()
 
 def test_get_motor_position_action(mock_fastlabio):
@@ -110,7 +115,7 @@ def test_get_single_frame_action(mock_fastlabio):
     
     app.get_single_frame_action()
     
-    mock_camera.get_single_frame.assert_called_once()
+    mock_camera.get_pysilico_camera_sync.return_value.getFutureFrames.assert_called_with(1)
     mock_st_write.assert_called_once_with("Acquiring single frame...")
     mock_st_image.assert_called_once() # Check if st.image was called
     mock_st_success.assert_called_once_with("Single frame acquired and displayed.")
@@ -121,13 +126,13 @@ def test_get_single_frame_action(mock_fastlabio):
 def test_get_single_frame_action_no_data(mock_fastlabio):
     _, mock_camera, mock_st_write, mock_st_success, mock_st_error, _, mock_st_warning, mock_st_image = mock_fastlabio
     
-    mock_camera.get_single_frame.return_value = None # Simulate no data returned
+    mock_camera.get_pysilico_camera_sync.return_value.getFutureFrames.return_value = [] # Simulate no data returned
     
     app.get_single_frame_action()
     
-    mock_camera.get_single_frame.assert_called_once()
+    mock_camera.get_pysilico_camera_sync.return_value.getFutureFrames.assert_called_with(1)
     mock_st_write.assert_called_once_with("Acquiring single frame...")
-    mock_st_warning.assert_called_once_with("No frame received.")
+    mock_st_warning.assert_called_once_with("No frames received.")
     mock_st_image.assert_not_called()
     mock_st_success.assert_not_called()
     mock_st_error.assert_not_called()
@@ -137,7 +142,7 @@ def test_get_single_frame_action_no_data(mock_fastlabio):
 # ensuring that the underlying fastlabio functions would be called correctly.
 # For full UI testing, consider using streamlit.testing (more involved).
 def test_get_motor_position_button(mock_fastlabio):
-    mock_motor, _ = mock_fastlabio
+    mock_motor, *_ = mock_fastlabio
 
     # Simulate clicking the 'Get Current Position' button in Streamlit
     # This part is conceptual as directly simulating button clicks in unit tests is tricky
@@ -163,7 +168,7 @@ def test_get_motor_position_button(mock_fastlabio):
 
 # Example Placeholder Test for setting motor speed
 def test_set_motor_speed(mock_fastlabio):
-    mock_motor, _ = mock_fastlabio
+    mock_motor, *_ = mock_fastlabio
     
     # Simulate setting speed via the UI and clicking the button.
     # This needs testable functions in app.py
@@ -175,7 +180,7 @@ def test_set_motor_speed(mock_fastlabio):
 
 # Example Placeholder Test for setting camera exposure
 def test_set_camera_exposure(mock_fastlabio):
-    _, mock_camera = mock_fastlabio
+    _, mock_camera, *_ = mock_fastlabio
     
     # Simulate setting exposure via the UI and clicking the button.
     # This needs testable functions in app.py
@@ -183,4 +188,43 @@ def test_set_camera_exposure(mock_fastlabio):
     # Example check if the fastlabio function was called:
     # test_exposure = 1000.0
     # mock_camera.set_exposure.assert_called_once_with(test_exposure)
-    pass # Placeholder test 
\ No newline at end of file
+    pass # Placeholder test 
+# Test the multi-device dashboard
+def test_reconfigured_camera_streams_from_the_new_host(monkeypatch):
+    from guailit import devices
+    from guailit.simulated import SimulatedCamera
+
+    hosts = []
+    def connect(config):
+        hosts.append(config.host)
+        return SimulatedCamera(64, 48, bit_depth=8, fps=100)
+    monkeypatch.setattr(devices, "connect_camera", connect)
+    registry = app.get_device_registry()
+    settings = ("JPEG", 85, None, 1, 0, None, None, None)
+    try:
+        registry.configure([devices.CameraConfig("bench", "host-a", 7100)], [])
+        publisher = app.get_frame_publisher(*settings, camera=registry.cameras["bench"])
+        mailbox = publisher.subscribe()
+        assert mailbox.get(2.0) is not None
+        publisher.unsubscribe(mailbox)
+        publisher.stop()
+
+        registry.configure([devices.CameraConfig("bench", "host-b", 7100)], [])
+        moved = app.get_frame_publisher(*settings, camera=registry.cameras["bench"])
+        assert moved is not publisher
+        mailbox = moved.subscribe()
+        assert mailbox.get(2.0) is not None
+        moved.unsubscribe(mailbox)
+        moved.stop()
+        assert hosts[0] == "host-a" and hosts[-1] == "host-b"
+    finally:
+        registry.configure([], [])
+
+# Test the replay mode
+def test_replay_keeps_acquisition_in_process(monkeypatch):
+    monkeypatch.setenv("GUAILIT_REPLAY", "recordings/missing")
+    monkeypatch.setitem(app.st.session_state, 'separate_process_toggle', True)
+    assert not app.separate_process_enabled()
+    assert app.get_display_settings()[-1] is False
+    with pytest.raises(RuntimeError):
+        app.camera_connector()
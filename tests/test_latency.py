@@ -0,0 +1,39 @@
+# Path: guailit/tests/test_latency.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the glass-to-glass latency tracker.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import pytest
+
+from guailit.latency import LatencyTracker
+
+
+def test_latency_combines_age_round_trip_and_paint():
+    tracker = LatencyTracker()
+    tracker.frame_sent(1, timestamp=100.0, sent_at=100.030)
+    # Acked 50 ms after sending, 10 ms of which the browser spent painting
+    latency = tracker.frame_painted(1, paint_ms=10.0, acked_at=100.080)
+    assert latency == pytest.approx(0.030 + 0.040 / 2 + 0.010)
+    assert tracker.frame_painted(7, paint_ms=1.0) is None # Never sent
+
+def test_superseded_and_skipped_frames_are_counted():
+    tracker = LatencyTracker()
+    for seq in (1, 2, 3, 6):
+        tracker.frame_sent(seq, timestamp=10.0, sent_at=10.0)
+    tracker.frame_painted(3, paint_ms=0.0, acked_at=10.01)
+    summary = tracker.summary()
+    assert summary["frames_dropped"] == 2 # 1 and 2 were never painted
+    assert summary["frames_skipped"] == 2 # 4 and 5 were never sent
+    assert summary["frames_painted"] == 1
+
+def test_unacknowledged_frames_are_bounded():
+    tracker = LatencyTracker(max_in_flight=4)
+    for seq in range(10):
+        tracker.frame_sent(seq, timestamp=0.0, sent_at=0.0)
+    assert tracker.frames_dropped == 6
+    assert tracker.summary()["latency_p50_ms"] is None
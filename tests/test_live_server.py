@@ -0,0 +1,142 @@
+# Path: guailit/tests/test_live_server.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the MJPEG / WebSocket live view side channel.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import http.client
+import json
+import socket
+import time
+
+import pytest
+
+from guailit.connections import DevicePool
+from guailit.encoding import JpegEncoder, RawEncoder
+from guailit.live_server import BOUNDARY, FRAME_HEADER, LiveStreamServer, mjpeg_html, websocket_html
+from guailit.publisher import FramePublisher
+from guailit.simulated import SimulatedCamera
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@pytest.fixture
+def live_server():
+    server = LiveStreamServer(max_clients=2).start(port=_free_port())
+    yield server
+    server.stop()
+
+def _publisher(encoder=None):
+    camera = SimulatedCamera(64, 48, bit_depth=8, fps=100)
+    return FramePublisher(DevicePool("camera", lambda: camera), encoder or JpegEncoder(), idle_timeout=0.2)
+
+def test_mjpeg_stream_sends_jpeg_parts(live_server):
+    publisher = _publisher()
+    name = live_server.register(publisher)
+    connection = http.client.HTTPConnection("127.0.0.1", live_server.port, timeout=5)
+    try:
+        connection.request("GET", f"/streams/{name}.mjpg?fps=50")
+        response = connection.getresponse()
+        assert response.status == 200
+        assert BOUNDARY in response.getheader("content-type")
+        data = b""
+        while data.count(b"\xff\xd9") < 2: # Two complete JPEG images
+            data += response.read1(65536)
+        assert data.startswith(f"--{BOUNDARY}\r\nContent-Type: image/jpeg".encode())
+        assert b"X-Frame-Seq: " in data and b"X-Frame-Timestamp: " in data
+        assert b"\xff\xd8" in data
+    finally:
+        connection.close()
+        publisher.stop()
+
+def test_websocket_stream_sends_binary_frames(live_server):
+    from websockets.sync.client import connect
+
+    publisher = _publisher()
+    name = live_server.register(publisher)
+    try:
+        with connect(live_server.url(name, "ws", fps=50), open_timeout=5) as socket_client:
+            frames = [socket_client.recv(timeout=5) for _ in range(3)]
+        assert all(isinstance(f, bytes) and f[FRAME_HEADER.size:].startswith(b"\xff\xd8") for f in frames)
+        seqs = [FRAME_HEADER.unpack_from(f)[0] for f in frames]
+        assert seqs == sorted(seqs) and FRAME_HEADER.unpack_from(frames[0])[1] > 0
+    finally:
+        publisher.stop()
+
+def test_websocket_acks_feed_session_latency(live_server):
+    from websockets.sync.client import connect
+
+    publisher = _publisher()
+    name = live_server.register(publisher)
+    try:
+        with connect(live_server.url(name, "ws", fps=50, session="s1"), open_timeout=5) as socket_client:
+            for _ in range(4):
+                seq, _ = FRAME_HEADER.unpack_from(socket_client.recv(timeout=5))
+                socket_client.send(json.dumps({"seq": seq, "paint_ms": 5.0}))
+            socket_client.send("not json")
+            deadline = time.monotonic() + 2.0
+            tracker = live_server.latency_tracker("s1")
+            while tracker.frames_painted < 4 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        summary = tracker.summary()
+        assert summary["frames_painted"] == 4
+        assert summary["latency_p50_ms"] >= 5.0
+    finally:
+        publisher.stop()
+
+def test_unknown_and_raw_streams_are_refused(live_server):
+    raw_name = live_server.register(_publisher(RawEncoder()))
+    connection = http.client.HTTPConnection("127.0.0.1", live_server.port, timeout=5)
+    try:
+        connection.request("GET", "/streams/missing.mjpg")
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 404
+        connection.request("GET", f"/streams/{raw_name}.mjpg")
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 415
+    finally:
+        connection.close()
+
+def test_unregistered_streams_are_removed(live_server):
+    publisher = _publisher()
+    name = live_server.register(publisher)
+    assert live_server.register(publisher) == name # Registered twice
+    other = live_server.register(_publisher())
+    assert other != name
+    connection = http.client.HTTPConnection("127.0.0.1", live_server.port, timeout=5)
+    try:
+        live_server.unregister(name)
+        assert name in live_server._streams # Still registered once
+        live_server.unregister(other)
+        connection.request("GET", f"/streams/{other}.mjpg")
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 404
+        live_server.unregister(name)
+        connection.request("GET", f"/streams/{name}.mjpg")
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 404
+    finally:
+        connection.close()
+    assert live_server.host == "127.0.0.1" # Not exposed to the network by default
+
+def test_embed_html_points_at_the_stream():
+    assert 'src="http://host:1/streams/a.mjpg"' in mjpeg_html("http://host:1/streams/a.mjpg", 640)
+    assert 'new WebSocket("ws:\\/\\/host:1\\/streams\\/a.ws")' in websocket_html("ws://host:1/streams/a.ws")
+    page = websocket_html('ws://host:1/</script><script>alert(1)</script>', "image/jpeg")
+    assert page.count("</script>") == 1 and "<script>alert" not in page
+    server = LiveStreamServer()
+    server.port = 8765
+    assert server.url("a", "ws", base_url="http://lab:8765/") == "ws://lab:8765/streams/a.ws"
+    assert server.url("a", "ws", base_url="http://lab:8765", fps=10, session="s1") == \
+        "ws://lab:8765/streams/a.ws?fps=10&session=s1"
@@ -0,0 +1,72 @@
+# Path: guailit/tests/test_metrics.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the pipeline stage metrics.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import time
+import urllib.request
+
+import pytest
+
+from guailit.metrics import Histogram, MetricsRegistry, start_metrics_server
+
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(0.001, 0.01, 0.1))
+    assert histogram.quantile(0.5) is None
+    for _ in range(90):
+        histogram.observe(0.0005)
+    for _ in range(10):
+        histogram.observe(0.05)
+    assert histogram.count == 100
+    assert histogram.quantile(0.5) <= 0.001
+    assert 0.01 < histogram.quantile(0.99) <= 0.1
+    assert histogram.summary()["mean_ms"] == pytest.approx(5.45)
+
+def test_timed_records_even_on_error():
+    registry = MetricsRegistry()
+    with pytest.raises(RuntimeError):
+        with registry.timed("encode"):
+            raise RuntimeError("codec failure")
+    assert registry.summary()["encode"]["count"] == 1
+
+def test_prometheus_text_format(tmp_path):
+    registry = MetricsRegistry()
+    registry.observe("acquire", 0.002)
+    registry.observe("acquire", 20.0)
+    text = registry.to_prometheus()
+    assert "# TYPE guailit_stage_seconds histogram" in text
+    assert 'guailit_stage_seconds_bucket{stage="acquire",le="0.0025"} 1' in text
+    assert 'guailit_stage_seconds_bucket{stage="acquire",le="+Inf"} 2' in text
+    assert 'guailit_stage_seconds_count{stage="acquire"} 2' in text
+
+    path = tmp_path / "metrics.prom"
+    registry.write_prometheus_file(str(path))
+    assert path.read_text() == text
+
+def test_metrics_server():
+    registry = MetricsRegistry()
+    registry.observe("display", 0.001)
+    server = start_metrics_server(0, registry=registry)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        body = urllib.request.urlopen(url, timeout=2).read().decode()
+    finally:
+        server.shutdown()
+    assert 'stage="display"' in body
+
+def test_timing_overhead_is_small():
+    registry = MetricsRegistry()
+    n = 20000
+    start = time.perf_counter()
+    for _ in range(n):
+        with registry.timed("noop"):
+            pass
+    per_sample = (time.perf_counter() - start) / n
+    # Far below 1% of a 10 ms frame, even on a slow CI machine
+    assert per_sample < 50e-6
@@ -0,0 +1,127 @@
+# Path: guailit/tests/test_motor_queue.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the coalescing motor command queue.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import time
+
+import pytest
+
+from guailit.motor_queue import MotorCommandQueue, describe_command
+from guailit.simulated import SimulatedMotor
+
+
+class RecordingMotor(SimulatedMotor):
+    """
+    Simulated motor that remembers the commands it received.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.moves = []
+        self.speeds = []
+        self.reads = 0
+
+    def move_motor(self, position):
+        self.moves.append(position)
+        super().move_motor(position)
+
+    def set_motor_speed(self, speed):
+        self.speeds.append(speed)
+        super().set_motor_speed(speed)
+
+    def get_motor_position(self):
+        self.reads += 1
+        return super().get_motor_position()
+
+
+def test_superseded_moves_are_dropped():
+    motor = RecordingMotor(command_latency=0.0)
+    commands = MotorCommandQueue(lambda: motor, debounce=0.2)
+    futures = [commands.move(float(i)) for i in range(5)]
+    futures[-1].result(timeout=5)
+    assert motor.moves == [4.0]
+    assert all(f.cancelled() for f in futures[:-1])
+    assert describe_command(futures[0]) == "superseded by a newer command"
+    assert describe_command(futures[-1]) == "done"
+    assert commands.commands_superseded == 4
+
+def test_speed_is_sent_before_the_move():
+    motor = RecordingMotor(command_latency=0.0)
+    commands = MotorCommandQueue(lambda: motor, debounce=0.1)
+    move = commands.move(1.0)
+    speed = commands.set_speed(50.0)
+    move.result(timeout=5)
+    speed.result(timeout=5)
+    assert motor.speeds == [50.0]
+    assert motor.moves == [1.0]
+    assert motor.speed == 50.0
+
+def test_position_reads_are_cached_and_shared():
+    motor = RecordingMotor(position=3.0, command_latency=0.0)
+    commands = MotorCommandQueue(lambda: motor, position_ttl=10.0, debounce=0.0)
+    first = commands.get_position()
+    second = commands.get_position()
+    assert first.result(timeout=5) == 3.0
+    assert second.result(timeout=5) == 3.0
+    assert commands.get_position().result(timeout=5) == 3.0
+    assert motor.reads == 1
+    # A move invalidates the cache
+    commands.move(5.0).result(timeout=5)
+    commands.get_position().result(timeout=5)
+    assert motor.reads == 2
+
+def test_cancelling_one_position_read_keeps_the_shared_read():
+    motor = RecordingMotor(position=2.0, command_latency=0.1)
+    commands = MotorCommandQueue(lambda: motor, debounce=0.0)
+    first = commands.get_position()
+    second = commands.get_position()
+    assert first is not second
+    assert first.cancel()
+    assert second.result(timeout=5) == 2.0
+    assert first.cancelled() and motor.reads == 1
+
+def test_command_errors_end_up_in_the_future():
+    class BrokenMotor(RecordingMotor):
+        def move_motor(self, position):
+            raise ConnectionError("motor server down")
+
+    commands = MotorCommandQueue(lambda: BrokenMotor(), debounce=0.0)
+    future = commands.move(1.0)
+    with pytest.raises(ConnectionError):
+        future.result(timeout=5)
+    assert describe_command(future) == "failed: motor server down"
+
+def test_connection_errors_fail_commands_but_not_the_queue():
+    motor = RecordingMotor(command_latency=0.0)
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("motor server down")
+        return motor
+
+    commands = MotorCommandQueue(connect, debounce=0.0)
+    with pytest.raises(ConnectionError):
+        commands.move(1.0).result(timeout=5)
+    commands.move(2.0).result(timeout=5)
+    assert motor.moves == [2.0]
+
+def test_close_ends_the_thread_and_fails_pending_commands():
+    motor = RecordingMotor(command_latency=0.0)
+    commands = MotorCommandQueue(lambda: motor, debounce=10.0) # Moves wait to coalesce
+    pending = commands.move(1.0)
+    time.sleep(0.05) # The worker is now waiting for more moves
+    commands.close()
+    assert not commands._thread.is_alive()
+    with pytest.raises(RuntimeError):
+        pending.result(timeout=1)
+    with pytest.raises(RuntimeError):
+        commands.get_position().result(timeout=1)
+    assert motor.moves == []
@@ -0,0 +1,119 @@
+# Path: guailit/tests/test_parallel_encode.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for frame-parallel encoding.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from guailit.connections import DevicePool
+from guailit.display_map import DisplayMapper
+from guailit.encoding import EncodedFrame
+from guailit.parallel_encode import ParallelEncoder
+from guailit.publisher import FramePublisher
+from guailit.simulated import SimulatedCamera
+
+
+class SlowEncoder:
+    """
+    Sleeps like a GIL-releasing codec; frame i takes delays[i % len(delays)].
+    """
+
+    format = "JPEG"
+
+    def __init__(self, delays=(0.02,)):
+        self.delays = delays
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def encode(self, frame, seq=-1, timestamp=None):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delays[seq % len(self.delays)])
+        with self._lock:
+            self.active -= 1
+        return EncodedFrame(b"x", self.format, frame.shape[1], frame.shape[0], 1, 0.0, seq, timestamp)
+
+
+def encode_all(workers: int, count: int, delays=(0.02,)):
+    delivered = []
+    encoder = ParallelEncoder(SlowEncoder(delays), delivered.append, workers)
+    frame = np.zeros((4, 4), dtype=np.uint8)
+    start = time.monotonic()
+    for seq in range(count):
+        assert encoder.wait_for_slot(2.0)
+        encoder.submit(frame, seq)
+    while len(delivered) < count and time.monotonic() - start < 5.0:
+        time.sleep(0.001)
+    elapsed = time.monotonic() - start
+    encoder.close()
+    return delivered, elapsed, encoder
+
+def test_results_are_delivered_in_order():
+    # Later frames finish first, yet come out in submission order
+    delivered, _, encoder = encode_all(4, 12, delays=(0.04, 0.01, 0.03, 0.0))
+    assert [e.seq for e in delivered] == list(range(12))
+    assert encoder.encoder.max_active == 4
+
+def test_throughput_grows_with_workers():
+    _, one, _ = encode_all(1, 16)
+    _, four, _ = encode_all(4, 16)
+    assert four < one / 2.5
+
+def test_in_flight_frames_are_bounded():
+    encoder = ParallelEncoder(SlowEncoder((0.2,)), lambda encoded: None, workers=2)
+    frame = np.zeros((2, 2), dtype=np.uint8)
+    encoder.submit(frame, 0)
+    encoder.submit(frame, 1)
+    assert not encoder.wait_for_slot(0.01)
+    with pytest.raises(RuntimeError):
+        encoder.submit(frame, 2)
+    assert encoder.wait_for_slot(1.0)
+    encoder.close()
+
+def test_encoder_errors_are_kept():
+    class Failing:
+        format = "JPEG"
+
+        def encode(self, frame, seq=-1, timestamp=None):
+            raise ValueError("codec failed")
+
+    delivered = []
+    encoder = ParallelEncoder(Failing(), delivered.append, workers=2)
+    encoder.submit(np.zeros((2, 2)), 0)
+    assert encoder.wait_for_slot(1.0) and encoder.in_flight == 0
+    assert isinstance(encoder.error, ValueError) and delivered == []
+    encoder.close()
+
+def test_publisher_encodes_frames_in_parallel():
+    camera = SimulatedCamera(32, 24, bit_depth=12, fps=200.0)
+    encoder = SlowEncoder((0.03,))
+    display_map = DisplayMapper()
+    publisher = FramePublisher(DevicePool("camera", lambda: camera), encoder, display_map=display_map,
+                               encode_workers=4)
+    assert display_map.buffers == 5
+    mailbox = publisher.subscribe()
+    seqs = []
+    try:
+        deadline = time.monotonic() + 0.6
+        while time.monotonic() < deadline:
+            encoded = mailbox.get(0.5)
+            if encoded is not None:
+                seqs.append(encoded.seq)
+    finally:
+        publisher.stop()
+    assert publisher.error is None
+    assert seqs == sorted(seqs) # Published in frame order
+    assert encoder.max_active > 1
+    # One worker would manage about 20 frames in 0.6 s
+    assert publisher.frames_encoded > 30
@@ -0,0 +1,59 @@
+# Path: guailit/tests/test_preprocess.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the stream preprocessing stage.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import numpy as np
+import pytest
+
+from guailit.preprocess import FramePreprocessor, bin_frame, crop_roi, downscale_to_width
+
+
+@pytest.fixture
+def frame():
+    return np.arange(12 * 16, dtype=np.uint16).reshape(12, 16)
+
+def test_crop_roi_returns_a_view(frame):
+    cropped = crop_roi(frame, (2, 3, 4, 5))
+    assert cropped.shape == (5, 4)
+    assert cropped[0, 0] == frame[3, 2]
+    assert np.shares_memory(cropped, frame)
+
+def test_crop_roi_zero_size_extends_to_edge(frame):
+    assert crop_roi(frame, (10, 4, 0, 0)).shape == (8, 6)
+    assert crop_roi(frame, None) is frame
+
+def test_crop_roi_outside_frame(frame):
+    with pytest.raises(ValueError):
+        crop_roi(frame, (100, 0, 5, 5))
+
+def test_bin_frame_averages_blocks(frame):
+    binned = bin_frame(frame, 2)
+    assert binned.shape == (6, 8)
+    assert binned.dtype == frame.dtype
+    assert binned[0, 0] == int(np.mean(frame[:2, :2]))
+
+def test_bin_frame_drops_partial_blocks(frame):
+    assert bin_frame(frame, 5).shape == (2, 3)
+    assert bin_frame(frame, 1) is frame
+
+def test_bin_frame_color():
+    frame = np.ones((4, 4, 3), dtype=np.uint8)
+    assert bin_frame(frame, 2).shape == (2, 2, 3)
+
+def test_downscale_to_width(frame):
+    pytest.importorskip("cv2")
+    assert downscale_to_width(frame, 8).shape == (6, 8)
+    assert downscale_to_width(frame, 32) is frame
+    assert downscale_to_width(frame, 0) is frame
+
+def test_preprocessor_pipeline(frame):
+    pytest.importorskip("cv2")
+    preprocessor = FramePreprocessor(roi=(0, 0, 16, 8), binning=2, display_width=4)
+    assert preprocessor(frame).shape == (2, 4)
+    assert FramePreprocessor().is_identity
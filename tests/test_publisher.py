@@ -0,0 +1,138 @@
+# Path: guailit/tests/test_publisher.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the encode-once frame publisher.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import time
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from guailit.averaging import FrameAverager
+from guailit.change_detect import ChangeDetector
+from guailit.connections import DevicePool
+from guailit.encoding import EncodedFrame
+from guailit.publisher import FrameMailbox, FramePublisher
+
+
+class FakeFrame:
+    def __init__(self, array):
+        self._array = array
+
+    def toNumpyArray(self):
+        return self._array
+
+
+class FakeCamera:
+    def getFutureFrames(self, n):
+        time.sleep(0.002)
+        return FakeFrame(np.zeros((4, 4), dtype=np.uint8))
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, frame, seq=-1, timestamp=None):
+        self.calls += 1
+        return EncodedFrame(b"frame", "JPEG", 4, 4, 5, 0.0, seq, timestamp)
+
+
+def test_mailbox_keeps_only_the_latest_frame():
+    mailbox = FrameMailbox()
+    assert mailbox.get(timeout=0.01) is None
+    mailbox.put("a")
+    mailbox.put("b")
+    assert mailbox.get(timeout=0.01) == "b"
+    assert mailbox.get(timeout=0.01) is None
+    assert (mailbox.delivered, mailbox.dropped) == (1, 1)
+
+def test_publisher_encodes_once_for_all_subscribers():
+    pool = DevicePool("camera", FakeCamera)
+    encoder = CountingEncoder()
+    publisher = FramePublisher(pool, encoder)
+    mailboxes = [publisher.subscribe() for _ in range(5)]
+    try:
+        frames = [mailbox.get(timeout=2.0) for mailbox in mailboxes]
+        time.sleep(0.05)
+    finally:
+        publisher.stop()
+
+    assert all(frame is not None for frame in frames)
+    # Each acquired frame was encoded at most once, whatever the number of viewers
+    assert encoder.calls == publisher.frames_encoded
+    assert encoder.calls <= publisher.latest.seq + 1
+    assert not publisher.is_running
+    assert pool.open_handles == 1 and pool.idle_handles == 1
+
+def test_publisher_stops_when_idle():
+    pool = DevicePool("camera", FakeCamera)
+    publisher = FramePublisher(pool, CountingEncoder(), idle_timeout=0.05)
+    mailbox = publisher.subscribe()
+    assert mailbox.get(timeout=2.0) is not None
+    publisher.unsubscribe(mailbox)
+    deadline = time.monotonic() + 2.0
+    while publisher.is_running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not publisher.is_running
+    assert pool.idle_handles == 1
+
+def test_publisher_reports_camera_errors():
+    camera = MagicMock()
+    camera.getFutureFrames.side_effect = RuntimeError("camera disconnected")
+    pool = DevicePool("camera", lambda: camera)
+    publisher = FramePublisher(pool, CountingEncoder())
+    publisher.subscribe()
+    deadline = time.monotonic() + 2.0
+    while publisher.is_running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert isinstance(publisher.error, RuntimeError)
+    assert pool.open_handles == 0 # The broken handle was dropped
+
+def test_publisher_skips_unchanged_frames():
+    pool = DevicePool("camera", FakeCamera)
+    encoder = CountingEncoder()
+    publisher = FramePublisher(pool, encoder, change_detector=ChangeDetector(keep_alive=10.0))
+    mailbox = publisher.subscribe()
+    try:
+        assert mailbox.get(timeout=2.0) is not None
+        # FakeCamera always returns the same frame: nothing else is encoded
+        assert mailbox.get(timeout=0.3) is None
+        assert encoder.calls == 1
+        assert publisher.change_detector.frames_skipped > 0
+    finally:
+        publisher.stop()
+
+def test_publisher_shows_the_running_average():
+    class CountingCamera:
+        def __init__(self):
+            self.value = 0
+
+        def getFutureFrames(self, n):
+            time.sleep(0.002)
+            self.value += 1
+            return FakeFrame(np.full((4, 4), self.value, dtype=np.uint16))
+
+    class KeepFrame(CountingEncoder):
+        def encode(self, frame, seq=-1, timestamp=None):
+            self.frame = frame.copy()
+            return super().encode(frame, seq, timestamp)
+
+    encoder = KeepFrame()
+    publisher = FramePublisher(DevicePool("camera", CountingCamera), encoder,
+                               averager=FrameAverager("mean", window=4))
+    mailbox = publisher.subscribe()
+    try:
+        for _ in range(10):
+            mailbox.get(timeout=2.0)
+        # The average of four consecutive counts is not an integer
+        assert encoder.frame.dtype == np.float32
+        assert encoder.frame[0, 0] % 1 == 0.5
+        assert publisher.subscribers == 1 and not publisher._listeners
+    finally:
+        publisher.stop()
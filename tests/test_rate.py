@@ -0,0 +1,66 @@
+# Path: guailit/tests/test_rate.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the adaptive frame-rate controller.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import time
+
+import pytest
+
+from guailit.rate import RateController
+
+
+def test_fresh_frames_are_not_dropped():
+    rate = RateController(latency_target=0.1)
+    assert not rate.should_drop(time.time())
+    assert not rate.should_drop(None)
+
+def test_stale_frames_are_dropped_but_not_forever():
+    rate = RateController(latency_target=0.1, min_fps=1.0)
+    now = time.time()
+    rate.frame_shown(0.01, 0.05)
+    assert rate.should_drop(now - 1.0, now=now)
+    assert rate.frames_dropped == 1
+    rate._last_shown -= 2.0 # Nothing shown for 2 s: show even a late frame
+    assert not rate.should_drop(now - 1.0, now=now)
+
+def test_stale_frames_do_not_freeze_the_view():
+    # Every frame is older than the target, e.g. large frames slow to encode
+    rate = RateController(latency_target=0.1, min_fps=1.0)
+    now = time.time()
+    assert not rate.should_drop(now - 1.0, now=now) # The first frame is shown
+    rate.frame_shown(0.5, 1.0)
+    shown = sum(not rate.should_drop(now - 1.0, now=now) for _ in range(50))
+    assert shown == 0 and rate.frames_dropped == 50
+
+def test_rate_backs_off_when_latency_exceeds_target():
+    rate = RateController(max_fps=30, latency_target=0.1)
+    for _ in range(10):
+        rate.frame_shown(0.001, 0.5)
+    assert rate.target_fps < 30
+    slow_fps = rate.target_fps
+    for _ in range(50):
+        rate.frame_shown(0.001, 0.01)
+    assert rate.target_fps > slow_fps
+    assert rate.target_fps <= 30
+
+def test_rate_never_exceeds_pipeline_throughput():
+    rate = RateController(max_fps=100, latency_target=10.0)
+    for _ in range(20):
+        rate.frame_shown(0.05, 0.01)
+    assert rate.target_fps == pytest.approx(20, rel=0.05)
+
+def test_next_delay_respects_target_rate():
+    rate = RateController(max_fps=10)
+    assert rate.next_delay() == 0.0
+    rate.frame_shown(0.0, 0.0)
+    assert 0.0 < rate.next_delay() <= 0.1
+
+def test_invalid_max_fps():
+    with pytest.raises(ValueError):
+        RateController(max_fps=0)
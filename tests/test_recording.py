@@ -0,0 +1,83 @@
+# Path: guailit/tests/test_recording.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for memory-mapped frame recording.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import time
+
+import numpy as np
+import pytest
+
+from guailit.grabber import FrameGrabber
+from guailit.recording import FrameRecorder, RecordingReader
+from guailit.simulated import SimulatedCamera
+
+
+def test_record_and_read_back(tmp_path):
+    path = str(tmp_path / "run")
+    positions = iter([1.0, 2.0, None])
+    recorder = FrameRecorder(path, max_frames=5, motor_position=lambda: next(positions))
+    for i in range(3):
+        assert recorder.submit(i, 100.0 + i, np.full((4, 6), i * 1000, dtype=np.uint16))
+    recorder.close()
+
+    reader = RecordingReader(path)
+    assert len(reader) == 3
+    assert reader.shape == (4, 6) and reader.dtype == np.uint16
+    assert isinstance(reader.frames, np.memmap)
+    assert np.all(reader[2] == 2000) # Full bit depth is kept
+    assert reader[1:3].shape == (2, 4, 6)
+    assert list(reader.seqs) == [0, 1, 2]
+    assert list(reader.timestamps) == [100.0, 101.0, 102.0]
+    assert reader.motor_positions[1] == 2.0
+    assert np.isnan(reader.motor_positions[2])
+
+def test_recorder_stops_when_full(tmp_path):
+    recorder = FrameRecorder(str(tmp_path / "run"), max_frames=2)
+    frame = np.zeros((2, 2), dtype=np.uint8)
+    assert recorder.submit(0, 0.0, frame)
+    assert recorder.submit(1, 0.0, frame)
+    assert recorder.is_full
+    assert not recorder.submit(2, 0.0, frame)
+    recorder.close()
+    assert len(RecordingReader(str(tmp_path / "run"))) == 2
+
+def test_recorder_rejects_format_change(tmp_path):
+    recorder = FrameRecorder(str(tmp_path / "run"), max_frames=4)
+    recorder.submit(0, 0.0, np.zeros((2, 2), dtype=np.uint8))
+    recorder.submit(1, 0.0, np.zeros((3, 3), dtype=np.uint8))
+    recorder.close()
+    assert isinstance(recorder.error, ValueError)
+    assert recorder.frames_written == 1
+
+def test_reader_without_metadata_uses_index(tmp_path):
+    path = str(tmp_path / "run")
+    recorder = FrameRecorder(path, max_frames=4)
+    recorder.submit(0, 0.0, np.zeros((2, 2), dtype=np.uint8))
+    recorder.close()
+    (tmp_path / "run.json").unlink()
+    assert len(RecordingReader(path)) == 1
+
+def test_record_from_grabber_listener(tmp_path):
+    path = str(tmp_path / "run")
+    recorder = FrameRecorder(path, max_frames=5)
+    grabber = FrameGrabber(SimulatedCamera(width=16, height=8, bit_depth=12, fps=500.0))
+    grabber.listeners.append(recorder)
+    grabber.start()
+    deadline = time.monotonic() + 2.0
+    while not recorder.is_full and time.monotonic() < deadline:
+        time.sleep(0.01)
+    grabber.stop()
+    recorder.close()
+    reader = RecordingReader(path)
+    assert len(reader) == 5
+    assert np.all(np.diff(reader.seqs) == 1)
+
+def test_recorder_needs_frames():
+    with pytest.raises(ValueError):
+        FrameRecorder("unused", max_frames=0)
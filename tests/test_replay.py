@@ -0,0 +1,88 @@
+# Path: guailit/tests/test_replay.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the replay of recorded sessions.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import time
+
+import numpy as np
+import pytest
+
+from guailit.grabber import FrameGrabber
+from guailit.recording import FrameRecorder
+from guailit.replay import ReplayMotor, ReplaySession, parse_replay_speed
+
+
+def record(path, count: int = 5, interval: float = 0.02, positions=True):
+    recorder = FrameRecorder(path, max_frames=count)
+    for i in range(count):
+        recorder.submit(i, 1000.0 + i * interval, np.full((4, 6), i, dtype=np.uint16),
+                        motor_position=float(i * 10) if positions else None)
+    recorder.close()
+    return path
+
+def test_parse_replay_speed():
+    assert parse_replay_speed("1") == 1.0
+    assert parse_replay_speed("2.5x") == 2.5
+    assert parse_replay_speed("max") is None
+    with pytest.raises(ValueError):
+        parse_replay_speed("-1")
+
+def test_max_speed_replays_every_frame_in_order(tmp_path):
+    session = ReplaySession(record(str(tmp_path / "run")), speed=None)
+    camera = session.get_pysilico_camera_sync()
+    start = time.monotonic()
+    frames = [camera.getFutureFrames(1) for _ in range(7)]
+    assert time.monotonic() - start < 0.05 # No pacing
+    assert [int(f.toNumpyArray()[0, 0]) for f in frames] == [0, 1, 2, 3, 4, 0, 1] # Loops
+    assert isinstance(frames[0].toNumpyArray(), np.memmap) # Zero-copy view
+    assert frames[1].recorded_timestamp == pytest.approx(1000.02)
+    assert camera.getFutureFrames(3).toNumpyArray().shape == (4, 6, 3)
+
+def test_replay_without_loop_ends(tmp_path):
+    session = ReplaySession(record(str(tmp_path / "run"), count=2), speed=None, loop=False)
+    camera = session.get_pysilico_camera_sync()
+    camera.getFutureFrames(2)
+    with pytest.raises(EOFError):
+        camera.getFutureFrames(1)
+
+def test_paced_replay_follows_recorded_rate(tmp_path):
+    session = ReplaySession(record(str(tmp_path / "run"), count=5, interval=0.05), speed=2.0)
+    camera = session.get_pysilico_camera_sync()
+    start = time.monotonic()
+    for _ in range(4):
+        camera.getFutureFrames(1)
+    # Three 50 ms intervals at twice real time
+    assert 0.06 <= time.monotonic() - start < 0.2
+    time.sleep(0.1) # A slow reader misses frames, like with a live camera
+    camera.getFutureFrames(1)
+    assert camera.frames_skipped > 0
+
+def test_replay_motor_follows_frames(tmp_path):
+    session = ReplaySession(record(str(tmp_path / "run")), speed=None)
+    camera = session.get_pysilico_camera_sync()
+    motor = ReplayMotor(session)
+    camera.getFutureFrames(1)
+    camera.getFutureFrames(1)
+    camera.getFutureFrames(1)
+    assert motor.get_motor_position() == 20.0
+    motor.move_motor(5.0)
+    assert motor.commands_ignored == 1
+    no_positions = ReplaySession(record(str(tmp_path / "bare"), positions=False), speed=None)
+    with pytest.raises(RuntimeError):
+        ReplayMotor(no_positions).get_motor_position()
+
+def test_replay_feeds_frame_grabber(tmp_path):
+    session = ReplaySession(record(str(tmp_path / "run")), speed=None)
+    grabber = FrameGrabber(session.get_pysilico_camera_sync())
+    grabber.start()
+    try:
+        grabbed = grabber.buffer.wait_for_newer(-1, timeout=2.0)
+        assert grabbed is not None and grabbed.frame.shape == (4, 6)
+    finally:
+        grabber.stop()
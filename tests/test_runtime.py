@@ -0,0 +1,109 @@
+# Path: guailit/tests/test_runtime.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the persistent device runtime and the async device facades.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from guailit.connections import DevicePool
+from guailit.motor_queue import MotorCommandQueue
+from guailit.runtime import AsyncCamera, AsyncMotor, DeviceRuntime
+from guailit.simulated import SimulatedCamera, SimulatedMotor
+
+
+class SlowCameraModule:
+    """
+    Stand-in for fastlabio.camera with slow settings calls.
+    """
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.exposure = None
+        self.gain = None
+        self.active = 0
+        self.max_active = 0
+
+    def _call(self):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        self.active -= 1
+
+    def set_exposure(self, value):
+        self._call()
+        self.exposure = value
+
+    def set_gain(self, value):
+        self._call()
+        self.gain = value
+
+
+@pytest.fixture
+def runtime():
+    runtime = DeviceRuntime(max_workers=4)
+    yield runtime
+    runtime.stop()
+
+def test_runtime_keeps_one_loop_thread(runtime):
+    async def loop_thread():
+        return threading.current_thread().name
+    assert runtime.run(loop_thread()) == "guailit-runtime"
+    assert runtime.run(loop_thread()) == "guailit-runtime"
+    assert runtime.is_running
+
+def test_exposure_overlaps_with_motor_move(runtime):
+    module = SlowCameraModule(delay=0.2)
+    camera = AsyncCamera(runtime, lambda: module, DevicePool("camera", SimulatedCamera))
+    motor = AsyncMotor(MotorCommandQueue(lambda: SimulatedMotor(command_latency=0.2), debounce=0.0))
+    start = time.monotonic()
+    results = runtime.run_all(camera.set_exposure(500.0), motor.move(1.0))
+    assert time.monotonic() - start < 0.35
+    assert not any(isinstance(r, Exception) for r in results)
+    assert module.exposure == 500.0
+
+def test_camera_settings_are_serialized(runtime):
+    module = SlowCameraModule(delay=0.05)
+    camera = AsyncCamera(runtime, lambda: module, DevicePool("camera", SimulatedCamera))
+    runtime.run_all(camera.set_exposure(1.0), camera.set_gain(2.0))
+    assert module.max_active == 1
+    assert (module.exposure, module.gain) == (1.0, 2.0)
+
+def test_grabs_lease_pooled_connections(runtime):
+    pool = DevicePool("camera", lambda: SimulatedCamera(32, 24, bit_depth=12, fps=1000))
+    camera = AsyncCamera(runtime, lambda: None, pool)
+    frame = runtime.run(camera.grab_frame())
+    average = runtime.run(camera.grab_average(4))
+    assert frame.shape == (24, 32) and frame.dtype == np.uint16
+    assert average.dtype == np.float32
+    assert pool.open_handles == 1 # Reused, not reconnected
+
+def test_errors_and_timeouts_reach_the_caller(runtime):
+    class Broken(SlowCameraModule):
+        def set_gain(self, value):
+            raise ValueError("gain out of range")
+
+    camera = AsyncCamera(runtime, lambda: Broken(), DevicePool("camera", SimulatedCamera))
+    with pytest.raises(ValueError):
+        runtime.run(camera.set_gain(99.0))
+    with pytest.raises(concurrent.futures.TimeoutError):
+        runtime.run(asyncio.sleep(1.0), timeout=0.05)
+
+def test_a_timed_out_position_read_leaves_the_other_callers_alone(runtime):
+    motor = SimulatedMotor(position=4.0, speed=0.0, command_latency=0.3)
+    async_motor = AsyncMotor(MotorCommandQueue(lambda: motor, debounce=0.0))
+    async_motor.command_queue.move(5.0) # The read waits for the move to be sent
+    patient = runtime.submit(async_motor.get_position())
+    with pytest.raises(concurrent.futures.TimeoutError):
+        runtime.run(async_motor.get_position(), timeout=0.05)
+    assert patient.result(timeout=5) == 4.0 # Not cancelled with the shared read
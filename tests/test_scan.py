@@ -0,0 +1,72 @@
+# Path: guailit/tests/test_scan.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the pipelined scan engine.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import time
+
+import numpy as np
+import pytest
+
+from guailit.scan import ScanEngine, scan_positions
+from guailit.simulated import SimulatedCamera, SimulatedMotor
+
+
+def test_scan_positions():
+    assert np.allclose(scan_positions(0.0, 1.0, 0.25), [0.0, 0.25, 0.5, 0.75, 1.0])
+    assert np.allclose(scan_positions(1.0, 0.0, 0.5), [1.0, 0.5, 0.0])
+    assert np.allclose(scan_positions(0.0, 1.0, 0.3), [0.0, 0.3, 0.6, 0.9])
+    with pytest.raises(ValueError):
+        scan_positions(0.0, 1.0, 0.0)
+
+def test_scan_settles_within_tolerance_and_keeps_order():
+    motor = SimulatedMotor(speed=50.0, command_latency=0.0)
+    camera = SimulatedCamera(width=8, height=8, fps=1000.0)
+    positions = scan_positions(0.0, 1.0, 0.25)
+    results = ScanEngine(motor, camera, positions, tolerance=1e-6,
+                         process=lambda i, target, position, ts, frame: frame.sum()).run()
+    assert [r.index for r in results] == list(range(len(positions)))
+    assert np.allclose([r.position for r in results], positions)
+    assert all(r.output is not None for r in results)
+
+def test_scan_overlaps_processing_with_motion():
+    # Moving + settling and processing each take ~20 ms per point
+    motor = SimulatedMotor(speed=1.0 / 0.02, command_latency=0.0)
+    camera = SimulatedCamera(width=8, height=8, fps=1000.0)
+    positions = np.arange(1, 11, dtype=float)
+
+    def process(index, target, position, timestamp, frame):
+        time.sleep(0.02)
+
+    engine = ScanEngine(motor, camera, positions, tolerance=1e-6, poll_interval=0.001, process=process)
+    engine.run()
+    sequential = len(positions) * (0.02 + 0.02)
+    assert engine.points_done == len(positions)
+    assert engine.elapsed < 0.8 * sequential
+
+def test_scan_time_delay_settle_and_errors():
+    motor = SimulatedMotor(command_latency=0.0)
+
+    class BrokenCamera:
+        def getFutureFrames(self, n):
+            raise RuntimeError("camera disconnected")
+
+    engine = ScanEngine(motor, BrokenCamera(), [0.0, 1.0], settle_time=0.001)
+    with pytest.raises(RuntimeError):
+        engine.run()
+
+def test_scan_can_be_cancelled():
+    motor = SimulatedMotor(speed=1.0, command_latency=0.0)
+    camera = SimulatedCamera(width=8, height=8, fps=1000.0)
+    engine = ScanEngine(motor, camera, [0.0, 100.0, 200.0], tolerance=1e-6).start()
+    time.sleep(0.05)
+    engine.cancel()
+    engine.wait(2.0)
+    assert not engine.is_running
+    assert engine.points_done < 3
+    assert engine.error is None
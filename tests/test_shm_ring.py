@@ -0,0 +1,126 @@
+# Path: guailit/tests/test_shm_ring.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the shared-memory frame rings and the acquisition process.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import functools
+import time
+
+import numpy as np
+import pytest
+
+from guailit.replay import open_replay_camera
+from guailit.shm_ring import ProcessFramePublisher, SharedFrameRing
+from guailit.simulated import SimulatedCamera
+
+
+@pytest.fixture
+def ring():
+    ring = SharedFrameRing.create(slots=3, slot_bytes=4 * 6 * 2)
+    yield ring
+    ring.close()
+
+def test_ring_round_trip_without_copies(ring):
+    reader = SharedFrameRing.attach(ring.name)
+    try:
+        assert reader.latest() is None
+        frame = np.arange(24, dtype=np.uint16).reshape(4, 6)
+        assert ring.write(frame, 100.0, frame_seq=7) == 0
+        read = reader.latest()
+        assert read.seq == 0 and read.frame_seq == 7 and read.timestamp == 100.0
+        assert read.data.dtype == np.uint16 and np.array_equal(read.data, frame)
+        assert np.shares_memory(read.data, reader._data) # A view, not a copy
+        assert reader.is_current(read)
+        del read
+    finally:
+        reader.close()
+
+def test_ring_detects_overwritten_slots(ring):
+    ring.write(np.zeros(4, dtype=np.uint8), 0.0)
+    first = ring.read(0)
+    for i in range(1, 4):
+        ring.write(np.full(4, i, dtype=np.uint8), float(i))
+    assert ring.last_seq == 3
+    assert not ring.is_current(first) # Slot 0 now holds frame 3
+    assert ring.read(0) is None
+    assert ring.wait_for_newer(3, timeout=0.01) is None
+    assert ring.wait_for_newer(2, timeout=0.01).seq == 3
+
+def test_ring_stores_encoded_bytes_and_drops_oversized(ring):
+    ring.write(b"\xff\xd8jpeg", 1.0, 5, "JPEG", 640, 480, 2.5)
+    read = ring.latest()
+    assert read.data.tobytes() == b"\xff\xd8jpeg"
+    assert (read.format, read.width, read.height, read.encode_ms) == ("JPEG", 640, 480, 2.5)
+    assert ring.write(np.zeros(1000, dtype=np.uint8), 2.0) == -1
+    assert ring.frames_dropped == 1
+
+def test_process_publisher_streams_and_feeds_listeners():
+    pytest.importorskip("cv2")
+    connect = functools.partial(SimulatedCamera, 64, 48, 12, 100.0)
+    publisher = ProcessFramePublisher(connect, ("JPEG", 85, None, 1, 0, None, None, None), idle_timeout=0.2)
+    mailbox = publisher.subscribe()
+    raw = []
+    publisher.add_frame_listener(lambda seq, timestamp, frame: raw.append(frame))
+    try:
+        encoded = [mailbox.get(2.0) for _ in range(5)]
+        assert all(e is not None and e.format == "JPEG" and e.data[:2] == b"\xff\xd8" for e in encoded)
+        assert isinstance(encoded[-1].data, memoryview) and encoded[-1].data.readonly
+        deadline = time.monotonic() + 2.0
+        while publisher.latest_raw() is None and time.monotonic() < deadline:
+            mailbox.get(0.1)
+        assert publisher.latest_raw().data.shape == (48, 64)
+        assert publisher.raw_snapshot().frame.shape == (48, 64)
+        time.sleep(0.2)
+        assert raw and raw[-1].dtype == np.uint16
+        assert np.shares_memory(raw[-1], publisher.raw_ring._data) # Listeners get views
+    finally:
+        publisher.remove_frame_listener(publisher._listeners[0])
+        publisher.unsubscribe(mailbox)
+    deadline = time.monotonic() + 10.0
+    while publisher.is_running and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not publisher.is_running # Stopped once idle
+    assert publisher.error is None
+
+def test_process_publisher_writes_raw_frames_on_demand():
+    pytest.importorskip("cv2")
+    connect = functools.partial(SimulatedCamera, 64, 48, 12, 100.0)
+    publisher = ProcessFramePublisher(connect, ("JPEG", 85, None, 1, 0, None, None, None), idle_timeout=0.2)
+    mailbox = publisher.subscribe()
+    try:
+        for _ in range(5):
+            assert mailbox.get(2.0) is not None
+        assert publisher.raw_ring is None # Nobody reads raw frames
+        deadline = time.monotonic() + 2.0
+        while publisher.latest_raw() is None and time.monotonic() < deadline:
+            mailbox.get(0.1)
+        assert publisher.latest_raw() is not None
+    finally:
+        publisher.unsubscribe(mailbox)
+        publisher.stop()
+
+def test_process_publisher_caps_acquisition_at_the_viewer_rate():
+    pytest.importorskip("cv2")
+    connect = functools.partial(SimulatedCamera, 64, 48, 12, 1000.0)
+    publisher = ProcessFramePublisher(connect, ("JPEG", 85, None, 1, 0, None, None, None), idle_timeout=0.2)
+    mailbox = publisher.subscribe(20.0)
+    try:
+        assert mailbox.get(2.0) is not None
+        start, acquired = time.monotonic(), publisher.frames_acquired
+        while time.monotonic() - start < 1.0:
+            mailbox.get(0.1)
+        rate = (publisher.frames_acquired - acquired) / (time.monotonic() - start)
+        assert 5.0 < rate < 40.0 # Not the 1000 fps of the camera
+    finally:
+        publisher.unsubscribe(mailbox)
+        publisher.stop()
+
+def test_process_publisher_reports_connection_failure(tmp_path):
+    publisher = ProcessFramePublisher(functools.partial(open_replay_camera, str(tmp_path / "missing")))
+    with pytest.raises(ConnectionError):
+        publisher.subscribe()
@@ -0,0 +1,42 @@
+# Path: guailit/tests/test_startup.py
+# -*- coding: utf-8 -*-
+"""
+Cold start budget of guailit.app: importing it must stay cheap and must
+not pull in the device backends or the image codecs.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import json
+import subprocess
+import sys
+
+# Seconds allowed for importing guailit.app on top of Streamlit itself
+# (about 0.1 s on a development laptop, mostly numpy)
+APP_IMPORT_BUDGET = 1.0
+# Modules that must only be imported when a device or codec is first used
+LAZY_MODULES = ("fastlabio", "cv2", "PIL")
+
+PROBE = """
+import json, sys, time
+import streamlit
+start = time.perf_counter()
+import guailit.app
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+
+def _measure_import() -> dict:
+    # A fresh interpreter, so that nothing is already imported
+    output = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True,
+                            check=True, timeout=60).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def test_app_import_is_lazy_and_within_budget():
+    # Best of three, to ignore a cold disk cache
+    results = [_measure_import() for _ in range(3)]
+    assert results[0]["loaded"] == []
+    assert min(r["elapsed"] for r in results) < APP_IMPORT_BUDGET
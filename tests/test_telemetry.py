@@ -0,0 +1,69 @@
+# Path: guailit/tests/test_telemetry.py
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the motor telemetry poller and time-series helpers.
+"""
+
+__author__ = "Marco Bonaglia"
+__version__ = "0.1.0"
+__date__ = "2026-10-16"
+
+import time
+
+import numpy as np
+import pytest
+
+from guailit.telemetry import MotorPoller, TimeSeriesBuffer, minmax_decimate
+
+
+def test_time_series_buffer_wraps_in_order():
+    buffer = TimeSeriesBuffer(capacity=4)
+    assert buffer.latest() is None
+    for i in range(6):
+        buffer.append(float(i), 10.0 * i)
+    t, y = buffer.snapshot()
+    assert len(buffer) == 4
+    assert list(t) == [2.0, 3.0, 4.0, 5.0]
+    assert list(y) == [20.0, 30.0, 40.0, 50.0]
+    assert buffer.latest() == (5.0, 50.0)
+
+def test_time_series_buffer_rejects_empty_capacity():
+    with pytest.raises(ValueError):
+        TimeSeriesBuffer(capacity=0)
+
+def test_minmax_decimate_keeps_extremes():
+    t = np.arange(10_000, dtype=np.float64)
+    y = np.sin(t / 100.0)
+    y[5_000] = 7.0 # A single spike must survive decimation
+    td, yd = minmax_decimate(t, y, buckets=100)
+    assert len(yd) == 200
+    assert yd.max() == 7.0
+    assert yd.min() == y.min()
+    assert np.all(np.diff(td) >= 0)
+
+def test_minmax_decimate_short_series_unchanged():
+    t = np.arange(10.0)
+    td, yd = minmax_decimate(t, t, buckets=100)
+    assert td is t and yd is t
+
+def test_motor_poller_collects_samples():
+    positions = iter(range(1000))
+    poller = MotorPoller(lambda: next(positions), rate_hz=200.0)
+    poller.start()
+    time.sleep(0.1)
+    poller.stop()
+    t, y = poller.buffer.snapshot()
+    assert len(y) >= 5
+    assert list(y[:3]) == [0.0, 1.0, 2.0]
+    assert poller.errors == 0
+
+def test_motor_poller_survives_read_errors():
+    def read_position():
+        raise RuntimeError("motor server down")
+    poller = MotorPoller(read_position, rate_hz=200.0)
+    poller.start()
+    time.sleep(0.05)
+    assert poller.is_running
+    poller.stop()
+    assert poller.errors > 0
+    assert isinstance(poller.last_error, RuntimeError)